@@ -0,0 +1,133 @@
+"""
+Benchmark: org concurrency admission in CrawlOperator.can_start_new
+
+Simulates one resync round for an org with many queued crawl jobs, where
+each crawl job's sync calls can_start_new() with the same related
+CrawlJob list, comparing the previous per-crawl walk of all related
+crawl jobs with the per-org admission index.
+
+    python -m benchmarks.bench_admission --num-crawls 1000 --max-crawls 5
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+from btrixcloud.models import NON_RUNNING_STATES, StorageRef
+from btrixcloud.operator.crawls import CrawlOperator
+from btrixcloud.operator.models import CJS, CrawlSpec, CrawlStatus, MCSyncData
+
+
+# ============================================================================
+def make_crawljobs(num_crawls, num_finished):
+    """related CrawlJobs for one org, in reverse creation order"""
+    start = datetime(2024, 1, 1)
+    crawljobs = {}
+    for i in reversed(range(num_crawls)):
+        name = f"crawljob-{i:05}"
+        state = "complete" if i < num_finished else "waiting_org_limit"
+        crawljobs[name] = {
+            "metadata": {
+                "name": name,
+                "creationTimestamp": (start + timedelta(seconds=i)).isoformat() + "Z",
+            },
+            "status": {"state": state},
+        }
+
+    return crawljobs
+
+
+# ============================================================================
+def prev_can_start(name, crawljobs, max_crawls):
+    """previous behavior: walk all related crawl jobs for each crawl"""
+    i = 0
+    for crawl_sorted in crawljobs.values():
+        if crawl_sorted.get("status", {}).get("state") in NON_RUNNING_STATES:
+            continue
+
+        if crawl_sorted.get("metadata").get("name") == name:
+            return i < max_crawls
+
+        i += 1
+
+    return False
+
+
+# ============================================================================
+async def main():
+    """run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-crawls", type=int, default=1000)
+    parser.add_argument("--num-finished", type=int, default=100)
+    parser.add_argument("--max-crawls", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    oid = uuid4()
+    crawljobs = make_crawljobs(args.num_crawls, args.num_finished)
+
+    async def get_max_concurrent_crawls(_):
+        return args.max_crawls
+
+    async def set_state(*_, **__):
+        return True
+
+    operator = object.__new__(CrawlOperator)
+    operator.admission_index = {}
+    operator.org_ops = SimpleNamespace(
+        get_max_concurrent_crawls=get_max_concurrent_crawls
+    )
+    operator.set_state = set_state
+
+    syncs = []
+    for name, crawljob in crawljobs.items():
+        data = MCSyncData(
+            parent={"metadata": crawljob["metadata"]},
+            controller={},
+            children={},
+            related={CJS: crawljobs},
+        )
+        crawl = CrawlSpec(
+            id=name,
+            cid=uuid4(),
+            oid=oid,
+            storage=StorageRef(name="default"),
+            started=crawljob["metadata"]["creationTimestamp"],
+            crawler_channel="default",
+        )
+        syncs.append((name, crawl, data))
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        prev_started = sum(
+            prev_can_start(name, crawljobs, args.max_crawls) for name, _, _ in syncs
+        )
+    prev_secs = (time.perf_counter() - start) / args.rounds
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        operator.admission_index = {}
+        started = 0
+        for _, crawl, data in syncs:
+            started += await operator.can_start_new(crawl, data, CrawlStatus())
+    index_secs = (time.perf_counter() - start) / args.rounds
+
+    print(
+        f"{args.num_crawls} crawl jobs in org, max {args.max_crawls} concurrent, "
+        f"{args.num_finished} finished"
+    )
+    print(
+        f"previous walk:   {prev_secs * 1000:.2f} ms per resync round, "
+        f"{prev_started} admitted (in dict order)"
+    )
+    print(
+        f"admission index: {index_secs * 1000:.2f} ms per resync round, "
+        f"{started} admitted (in creation order)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+"""
+Benchmark: streaming collection download, with and without prefetching
+the next WACZ files
+
+Streams a multi-WACZ download of many small WACZ files, through
+StorageOps.download_streaming_wacz(), from a local S3 stand-in that adds
+latency to each request and limits the bandwidth of each connection,
+reporting time, throughput and max requests in flight for each number
+of files prefetched. The output is checked to be a valid zip.
+
+    python -m benchmarks.bench_collection_download --files 300 --size-kb 200
+"""
+
+import argparse
+import asyncio
+import io
+import time
+import zipfile
+import zlib
+
+from contextlib import asynccontextmanager
+
+from btrixcloud.models import CrawlFileOut
+from btrixcloud.storages import StorageOps
+
+
+# ============================================================================
+class LatencyBody:
+    """streaming body, limited to bandwidth per connection"""
+
+    def __init__(self, data, bandwidth):
+        self.data = data
+        self.bandwidth = bandwidth
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self):
+        await asyncio.sleep(len(self.data) / self.bandwidth)
+        return self.data
+
+    async def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            chunk = self.data[i : i + chunk_size]
+            await asyncio.sleep(len(chunk) / self.bandwidth)
+            yield chunk
+
+
+# ============================================================================
+# pylint: disable=too-few-public-methods
+class LatencyS3Client:
+    """in-memory S3 stand-in for get_object, with latency per request
+    and bandwidth limit per connection"""
+
+    def __init__(self, objects, latency, bandwidth):
+        self.objects = objects
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    # pylint: disable=invalid-name, unused-argument
+    async def get_object(self, Bucket, Key):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        return {"Body": LatencyBody(self.objects[Key], self.bandwidth)}
+
+
+# ============================================================================
+class LatencyStorageOps(StorageOps):
+    """StorageOps downloading from LatencyS3Client"""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, client):
+        self.client = client
+        self.download_prefetch_members = 0
+        self.download_prefetch_bytes = 4 * 1024 * 1024
+
+    def get_org_primary_storage(self, org):
+        return None
+
+    @asynccontextmanager
+    async def get_s3_client(self, storage, use_access=False):
+        yield self.client, "bucket", ""
+
+
+# ============================================================================
+def make_files(num_files, size):
+    """objects and crawl files for collection of small WACZs"""
+    objects = {}
+    files = []
+    for index in range(num_files):
+        name = f"crawl-{index}.wacz"
+        data = bytes([index % 256]) * size
+        objects[name] = data
+        files.append(
+            CrawlFileOut(
+                name=name,
+                path="",
+                hash="",
+                crc32=zlib.crc32(data),
+                size=size,
+            )
+        )
+
+    return objects, files
+
+
+async def run(client, files, prefetch_members):
+    """stream download, report throughput"""
+    storage_ops = LatencyStorageOps(client)
+    client.max_in_flight = 0
+
+    buff = io.BytesIO()
+
+    start = time.perf_counter()
+    async for chunk in storage_ops.download_streaming_wacz(
+        None, files, prefetch_members
+    ):
+        buff.write(chunk)
+    elapsed = time.perf_counter() - start
+
+    with zipfile.ZipFile(buff) as zip_file:
+        assert zip_file.testzip() is None
+        assert len(zip_file.namelist()) == len(files) + 1
+
+    size = buff.tell()
+
+    print(
+        f"{prefetch_members} files prefetched: {elapsed:.2f}s, "
+        f"{size / elapsed / 1024 / 1024:.1f} MB/s, "
+        f"{len(files) / elapsed:.0f} files/s, "
+        f"max requests in flight {client.max_in_flight}"
+    )
+
+
+async def main():
+    """run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size-kb", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--bandwidth-mb", type=float, default=50)
+    parser.add_argument("--prefetch", default="0,1,2,4")
+    args = parser.parse_args()
+
+    objects, files = make_files(args.files, args.size_kb * 1024)
+    client = LatencyS3Client(
+        objects, args.latency_ms / 1000, args.bandwidth_mb * 1024 * 1024
+    )
+
+    print(
+        f"{args.files} WACZs of {args.size_kb} KB, {args.latency_ms} ms latency, "
+        f"{args.bandwidth_mb} MB/s per connection"
+    )
+
+    for prefetch_members in args.prefetch.split(","):
+        await run(client, files, int(prefetch_members))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
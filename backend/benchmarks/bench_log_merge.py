@@ -0,0 +1,209 @@
+"""
+Benchmark: merged crawl log download, serial vs read-ahead
+
+Builds synthetic WACZs for several crawler instances in memory, each with
+a deflated logs/crawl.log, and serves them from a local S3 stand-in that
+adds latency to each request and to each chunk read. Logs are then streamed
+through StorageOps.stream_wacz_logs(), merged by timestamp, with read-ahead
+disabled and enabled, reporting time and throughput for each.
+
+    python -m benchmarks.bench_log_merge --instances 4 --waczs 10 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+import zipfile
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from btrixcloud.models import CrawlFile, StorageRef
+from btrixcloud.storages import StorageOps
+from btrixcloud.zip import fetch_zip_index
+
+
+# ============================================================================
+class LatencyBody:
+    """streaming body, sleeping before each chunk read"""
+
+    def __init__(self, data, chunk_latency):
+        self.data = data
+        self.chunk_latency = chunk_latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self):
+        await asyncio.sleep(self.chunk_latency)
+        return self.data
+
+    async def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            await asyncio.sleep(self.chunk_latency)
+            yield self.data[i : i + chunk_size]
+
+
+# ============================================================================
+class LatencyS3Client:
+    """in-memory S3 stand-in, with latency for each request"""
+
+    def __init__(self, objects, request_latency, chunk_latency):
+        self.objects = objects
+        self.request_latency = request_latency
+        self.chunk_latency = chunk_latency
+        self.num_requests = 0
+
+    # pylint: disable=invalid-name, unused-argument
+    async def head_object(self, Bucket, Key):
+        self.num_requests += 1
+        await asyncio.sleep(self.request_latency)
+        return {"ContentLength": len(self.objects[Key])}
+
+    # pylint: disable=invalid-name, unused-argument
+    async def get_object(self, Bucket, Key, Range):
+        self.num_requests += 1
+        await asyncio.sleep(self.request_latency)
+        data = self.objects[Key]
+        start, end = Range[len("bytes=") :].split("-")
+        if not start:
+            start = max(len(data) - int(end), 0)
+            end = len(data) - 1
+
+        return {
+            "Body": LatencyBody(data[int(start) : int(end) + 1], self.chunk_latency),
+            "ContentRange": f"bytes {start}-{end}/{len(data)}",
+        }
+
+
+# ============================================================================
+class LatencyStorageOps(StorageOps):
+    """StorageOps reading from LatencyS3Client"""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, client, log_read_ahead_bytes):
+        self.client = client
+        self.log_read_ahead_bytes = log_read_ahead_bytes
+
+    def get_org_primary_storage(self, org):
+        return None
+
+    @asynccontextmanager
+    async def get_s3_client(self, storage, use_access=False):
+        yield self.client, "bucket", ""
+
+
+# ============================================================================
+def make_wacz(instance, index, num_lines, start):
+    """make WACZ with log lines for one instance"""
+    rng = random.Random(instance * 1000 + index)
+    lines = []
+    for i in range(num_lines):
+        timestamp = start + timedelta(milliseconds=i * 10 + instance)
+        lines.append(
+            json.dumps(
+                {
+                    "timestamp": timestamp.isoformat(timespec="milliseconds") + "Z",
+                    "logLevel": "info",
+                    "context": "general",
+                    "message": "Page Finished",
+                    "details": {"url": f"https://example.com/{rng.random()}"},
+                }
+            )
+            + "\n"
+        )
+
+    buff = io.BytesIO()
+    with zipfile.ZipFile(buff, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("datapackage.json", "{}")
+        zip_file.writestr("logs/crawl.log", "".join(lines))
+
+    return buff.getvalue()
+
+
+async def make_files(args, client):
+    """make WACZs for each instance, with stored zip index"""
+    wacz_files = []
+    start = datetime(year=2024, month=1, day=1)
+    for index in range(args.waczs):
+        for instance in range(args.instances):
+            filename = f"crawl-20240101{index:06d}-{instance}.wacz"
+            client.objects[filename] = make_wacz(instance, index, args.lines, start)
+            wacz_files.append(
+                CrawlFile(
+                    filename=filename,
+                    hash="",
+                    size=len(client.objects[filename]),
+                    storage=StorageRef(name="default"),
+                )
+            )
+
+        start += timedelta(milliseconds=args.lines * 10)
+
+    if not args.no_index:
+        for wacz_file in wacz_files:
+            wacz_file.zipIndex = await fetch_zip_index(
+                client, "bucket", wacz_file.filename
+            )
+
+    return wacz_files
+
+
+async def run(name, storage_ops, wacz_files, total_size):
+    """stream merged logs, report throughput"""
+    storage_ops.client.num_requests = 0
+    start = time.perf_counter()
+    count = 0
+    async for _ in storage_ops.stream_wacz_logs(None, list(wacz_files), [], []):
+        count += 1
+
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name}: {elapsed:.2f}s, {count / elapsed:,.0f} lines/s, "
+        f"{total_size / elapsed / 1024 / 1024:.1f} MB/s compressed, "
+        f"{storage_ops.client.num_requests} requests"
+    )
+    return count
+
+
+async def main():
+    """run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instances", type=int, default=4)
+    parser.add_argument("--waczs", type=int, default=10)
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--chunk-latency-ms", type=float, default=25)
+    parser.add_argument("--read-ahead-mb", type=int, default=16)
+    parser.add_argument("--no-index", action="store_true")
+    args = parser.parse_args()
+
+    client = LatencyS3Client({}, args.latency_ms / 1000, args.chunk_latency_ms / 1000)
+    wacz_files = await make_files(args, client)
+    total_size = sum(wacz_file.size for wacz_file in wacz_files)
+
+    print(
+        f"{args.instances} instances x {args.waczs} WACZs, "
+        f"{total_size / 1024 / 1024:.1f} MB, {args.latency_ms} ms request latency, "
+        f"{args.chunk_latency_ms} ms chunk latency"
+    )
+
+    serial = await run("serial", LatencyStorageOps(client, 0), wacz_files, total_size)
+    read_ahead = await run(
+        f"read-ahead {args.read_ahead_mb} MB",
+        LatencyStorageOps(client, args.read_ahead_mb * 1024 * 1024),
+        wacz_files,
+        total_size,
+    )
+    assert serial == read_ahead == args.instances * args.waczs * args.lines
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
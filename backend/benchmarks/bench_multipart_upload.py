@@ -0,0 +1,144 @@
+"""
+Benchmark: streaming multipart upload, one part vs several parts in flight
+
+Streams a synthetic upload, in chunks as received from the client, through
+StorageOps.do_upload_multipart() to a local S3 stand-in that adds latency
+to each request and limits the upload bandwidth of each connection,
+reporting time, throughput and max parts in flight for each setting.
+
+    python -m benchmarks.bench_multipart_upload --size-mb 200 --in-flight 1,4,8
+"""
+
+import argparse
+import asyncio
+import time
+
+from contextlib import asynccontextmanager
+
+from btrixcloud.storages import StorageOps
+from btrixcloud.uploads import MIN_UPLOAD_PART_SIZE
+
+
+# ============================================================================
+class LatencyS3Client:
+    """in-memory S3 stand-in for multipart uploads, with latency per request
+    and bandwidth limit per connection"""
+
+    def __init__(self, latency, bandwidth):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.parts = {}
+        self.completed = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    # pylint: disable=invalid-name, unused-argument
+    async def create_multipart_upload(self, ACL, Bucket, Key):
+        await asyncio.sleep(self.latency)
+        self.parts[Key] = {}
+        return {"UploadId": Key}
+
+    # pylint: disable=invalid-name, unused-argument, too-many-arguments
+    async def upload_part(self, Bucket, Body, UploadId, PartNumber, Key):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency + len(Body) / self.bandwidth)
+        finally:
+            self.in_flight -= 1
+
+        self.parts[Key][PartNumber] = len(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    # pylint: disable=invalid-name, unused-argument
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        await asyncio.sleep(self.latency)
+        part_numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert part_numbers == list(range(1, len(part_numbers) + 1))
+        self.completed[Key] = sum(self.parts[Key].values())
+
+    # pylint: disable=invalid-name, unused-argument
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        await asyncio.sleep(self.latency)
+        self.parts.pop(Key, None)
+
+
+# ============================================================================
+class LatencyStorageOps(StorageOps):
+    """StorageOps uploading to LatencyS3Client"""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, client):
+        self.client = client
+        self.upload_parts_in_flight = 1
+
+    def get_org_primary_storage(self, org):
+        return None
+
+    @asynccontextmanager
+    async def get_s3_client(self, storage, use_access=False):
+        yield self.client, "bucket", ""
+
+
+# ============================================================================
+async def stream_upload(size, chunk_size):
+    """stream of upload chunks, as from request.stream()"""
+    chunk = b"x" * chunk_size
+    sent = 0
+    while sent < size:
+        yield chunk[: size - sent]
+        sent += chunk_size
+        # yield to event loop, as when receiving from network
+        await asyncio.sleep(0)
+
+
+async def run(client, size, chunk_size, parts_in_flight):
+    """upload stream, report throughput"""
+    storage_ops = LatencyStorageOps(client)
+    client.max_in_flight = 0
+    filename = f"upload-{parts_in_flight}.wacz"
+
+    start = time.perf_counter()
+    assert await storage_ops.do_upload_multipart(
+        None,
+        filename,
+        stream_upload(size, chunk_size),
+        MIN_UPLOAD_PART_SIZE,
+        parts_in_flight,
+    )
+    elapsed = time.perf_counter() - start
+
+    assert client.completed[filename] == size
+
+    print(
+        f"{parts_in_flight} parts in flight: {elapsed:.2f}s, "
+        f"{size / elapsed / 1024 / 1024:.1f} MB/s, "
+        f"max in flight {client.max_in_flight}, "
+        f"max buffered {parts_in_flight * MIN_UPLOAD_PART_SIZE / 1024 / 1024:.0f} MB"
+    )
+
+
+async def main():
+    """run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--bandwidth-mb", type=float, default=50)
+    parser.add_argument("--in-flight", default="1,2,4,8")
+    args = parser.parse_args()
+
+    client = LatencyS3Client(args.latency_ms / 1000, args.bandwidth_mb * 1024 * 1024)
+    size = args.size_mb * 1024 * 1024
+
+    print(
+        f"{args.size_mb} MB upload, {MIN_UPLOAD_PART_SIZE / 1000 / 1000:.0f} MB parts, "
+        f"{args.latency_ms} ms latency, {args.bandwidth_mb} MB/s per connection"
+    )
+
+    for parts_in_flight in args.in_flight.split(","):
+        await run(client, size, args.chunk_kb * 1024, int(parts_in_flight))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
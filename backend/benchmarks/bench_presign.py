@@ -0,0 +1,152 @@
+"""
+Benchmark: presigning crawl file urls, s3 client vs offline batch
+
+Presigns the files of a page of crawls, as when listing crawls with
+resources or collection resources, with:
+
+- a new s3 client per file, as previously created by get_s3_client()
+- a single pooled s3 client, calling generate_presigned_url() per file
+- StorageOps.get_presigned_urls(), signing all files locally in one batch
+
+No s3 requests are made by any of these.
+
+    python -m benchmarks.bench_presign --crawls 1000 --files 2
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiobotocore.session
+
+from btrixcloud.models import CrawlFile, S3Storage, StorageRef
+from btrixcloud.storages import StorageOps
+
+
+# ============================================================================
+# pylint: disable=too-few-public-methods
+class LocalStorageOps(StorageOps):
+    """StorageOps with single default storage"""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, storage):
+        self.default_storages = {"default": storage}
+        self.presigners = {}
+
+
+# ============================================================================
+def make_storage(local_minio):
+    """storage as configured for local minio or remote s3"""
+    if local_minio:
+        return S3Storage(
+            access_key="ADMIN",
+            secret_key="PASSW0RD",
+            region="",
+            endpoint_url="http://local-minio.default:9000/btrix-data/",
+            endpoint_no_bucket_url="http://local-minio.default:9000/",
+            access_endpoint_url="/data/",
+            use_access_for_presign=False,
+        )
+
+    return S3Storage(
+        access_key="ACCESS_KEY",
+        secret_key="SECRET_KEY",
+        region="us-east-1",
+        endpoint_url="https://s3.us-east-1.amazonaws.com/btrix-data/",
+        endpoint_no_bucket_url="https://s3.us-east-1.amazonaws.com/",
+        access_endpoint_url="https://s3.us-east-1.amazonaws.com/btrix-data/",
+        use_access_for_presign=True,
+    )
+
+
+def make_files(num_crawls, num_files):
+    """crawl files for page of crawls"""
+    return [
+        CrawlFile(
+            filename=f"org/crawl-{crawl}/crawl-20240101000000-{index}.wacz",
+            hash="",
+            size=1000,
+            storage=StorageRef(name="default"),
+        )
+        for crawl in range(num_crawls)
+        for index in range(num_files)
+    ]
+
+
+def create_client(session, storage):
+    """create s3 client for storage endpoint, without bucket"""
+    endpoint_url = storage.endpoint_no_bucket_url.rstrip("/")
+    return session.create_client(
+        "s3",
+        region_name=storage.region,
+        endpoint_url=endpoint_url,
+        aws_access_key_id=storage.access_key,
+        aws_secret_access_key=storage.secret_key,
+    )
+
+
+# ============================================================================
+async def presign_new_client(storage, files, duration):
+    """new client per file"""
+    session = aiobotocore.session.get_session()
+    for file_ in files:
+        async with create_client(session, storage) as client:
+            await client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": "btrix-data", "Key": file_.filename},
+                ExpiresIn=duration,
+            )
+
+
+async def presign_pooled_client(storage, files, duration):
+    """single client, presign per file"""
+    session = aiobotocore.session.get_session()
+    async with create_client(session, storage) as client:
+        for file_ in files:
+            await client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": "btrix-data", "Key": file_.filename},
+                ExpiresIn=duration,
+            )
+
+
+async def presign_offline(storage, files, duration):
+    """local batch signing"""
+    LocalStorageOps(storage).get_presigned_urls(None, files, duration)
+
+
+async def run(name, func, storage, files):
+    """run presign func, report time per file"""
+    start = time.perf_counter()
+    await func(storage, files, 3600)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name}: {elapsed:.3f}s, {elapsed / len(files) * 1_000_000:.1f} us/file, "
+        f"{len(files) / elapsed:,.0f} files/s"
+    )
+
+
+async def main():
+    """run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--crawls", type=int, default=1000)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--local-minio", action="store_true")
+    parser.add_argument("--skip-new-client", action="store_true")
+    args = parser.parse_args()
+
+    storage = make_storage(args.local_minio)
+    files = make_files(args.crawls, args.files)
+
+    print(f"{args.crawls} crawls x {args.files} files")
+
+    if not args.skip_new_client:
+        await run("new client per file", presign_new_client, storage, files)
+
+    await run("pooled client", presign_pooled_client, storage, files)
+    await run("offline batch", presign_offline, storage, files)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
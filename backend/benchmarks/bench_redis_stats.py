@@ -0,0 +1,126 @@
+"""
+Microbenchmark: per-sync redis round-trips for crawl stats
+
+Compares reading crawl status, page and size stats, added files and redis
+INFO with one await per command (previous operator behavior) against the
+single pipelined snapshot used by CrawlOperator.
+
+Requires a local redis-server, eg:
+
+    redis-server --port 6379 &
+    python -m benchmarks.bench_redis_stats --redis-url redis://localhost:6379/15
+
+The target db is flushed before and after the run.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from redis import asyncio as aioredis
+
+from btrixcloud.operator.crawls import CrawlOperator
+
+
+CRAWL_ID = "bench-crawl"
+
+
+# ============================================================================
+async def populate(redis, scale):
+    """add representative crawl keys"""
+    await redis.flushdb()
+    for i in range(scale):
+        await redis.hset(f"{CRAWL_ID}:status", f"crawl-{CRAWL_ID}-{i}", "running")
+        await redis.hset(f"{CRAWL_ID}:size", f"crawl-{CRAWL_ID}-{i}", 1000000 * i)
+
+    await redis.set(f"{CRAWL_ID}:d", 5000)
+    await redis.sadd(
+        f"{CRAWL_ID}:s", *[f"https://example.com/{i}" for i in range(10000)]
+    )
+    await redis.set("filesAdded", 3)
+    await redis.set("filesAddedSize", 300000000)
+
+
+# ============================================================================
+async def sequential_stats(redis):
+    """previous behavior: one round-trip per command"""
+    results = {}
+    results["info"] = await redis.info("persistence")
+    results["info"].update(await redis.info("memory"))
+    results["filesAdded"] = int(await redis.get("filesAdded") or 0)
+    results["filesAddedSize"] = int(await redis.get("filesAddedSize") or 0)
+    results["status"] = await redis.hgetall(f"{CRAWL_ID}:status")
+    results["done"] = int(await redis.get(f"{CRAWL_ID}:d") or 0)
+    results["found"] = await redis.scard(f"{CRAWL_ID}:s")
+    results["sizes"] = await redis.hgetall(f"{CRAWL_ID}:size")
+    return results
+
+
+# ============================================================================
+async def timed(func, iterations):
+    """return per-call latencies in ms"""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+# ============================================================================
+def report(name, latencies):
+    """print latency summary"""
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<12} mean {statistics.mean(latencies):.3f} ms, "
+        f"p50 {statistics.median(latencies):.3f} ms, p99 {p99:.3f} ms"
+    )
+
+
+# ============================================================================
+async def main():
+    """run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--scale", type=int, default=3)
+    args = parser.parse_args()
+
+    redis = aioredis.from_url(args.redis_url, decode_responses=True)
+    await populate(redis, args.scale)
+
+    # only the k8s pod metrics flag is used to build the snapshot
+    operator = object.__new__(CrawlOperator)
+    operator.k8s = SimpleNamespace(has_pod_metrics=False)
+
+    async def snapshot():
+        return await operator.get_redis_crawl_snapshot(redis, CRAWL_ID)
+
+    async def sequential():
+        return await sequential_stats(redis)
+
+    # warm up
+    await timed(sequential, 100)
+    await timed(snapshot, 100)
+
+    seq = await timed(sequential, args.iterations)
+    pipe = await timed(snapshot, args.iterations)
+
+    print(f"{args.iterations} syncs, crawl scale {args.scale}")
+    report("sequential", seq)
+    report("pipelined", pipe)
+    print(
+        "round-trips per sync: 9 -> 1, "
+        f"saved {statistics.mean(seq) - statistics.mean(pipe):.3f} ms per sync"
+    )
+
+    await redis.flushdb()
+    await redis.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
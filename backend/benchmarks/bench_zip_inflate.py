@@ -0,0 +1,146 @@
+"""
+Benchmark: streaming inflate and line splitting of deflated WACZ members
+
+Writes a synthetic raw-deflated jsonl member (as stored in a WACZ) to a
+temp file, then streams it back in 256 KB chunks, as read from object
+storage, through iter_lines(), reporting throughput and peak RSS.
+
+With --compare, the same inflated stream is also split with the previous
+'pending + chunk' splitter.
+
+    python -m benchmarks.bench_zip_inflate --size-mb 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+import zlib
+
+from btrixcloud.zip import CHUNK_SIZE, inflate_chunks, iter_lines
+
+
+# ============================================================================
+def write_member(fh, size_mb):
+    """write raw deflated jsonl of size_mb uncompressed, return num lines"""
+    rng = random.Random(0)
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    size = 0
+    num_lines = 0
+    while size < size_mb * 1024 * 1024:
+        batch = b"".join(
+            json.dumps(
+                {
+                    "timestamp": "2024-01-01T00:00:00.000Z",
+                    "logLevel": "info",
+                    "context": "general",
+                    "message": "Page Finished",
+                    "details": {"url": f"https://example.com/{rng.random()}"},
+                }
+            ).encode()
+            + b"\n"
+            for _ in range(1000)
+        )
+        fh.write(compressor.compress(batch))
+        size += len(batch)
+        num_lines += 1000
+
+    fh.write(compressor.flush())
+    return size, num_lines
+
+
+# ============================================================================
+async def read_chunks(filename):
+    """read file in chunks, as from object storage"""
+    with open(filename, "rb") as fh:
+        while True:
+            chunk = fh.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+# ============================================================================
+async def prev_iter_lines(chunk_iter, keepends=True):
+    """previous line splitting, concatenating pending data to each chunk"""
+    pending = b""
+    async for chunk in chunk_iter:
+        lines = (pending + chunk).splitlines(True)
+        for line in lines[:-1]:
+            yield line.splitlines(keepends)[0]
+        pending = lines[-1]
+    if pending:
+        yield pending.splitlines(keepends)[0]
+
+
+# ============================================================================
+def get_max_rss_mb():
+    """max rss of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ============================================================================
+async def run(name, line_iter, size, num_lines):
+    """consume lines, report throughput"""
+    start = time.perf_counter()
+    count = 0
+    async for _ in line_iter:
+        count += 1
+    elapsed = time.perf_counter() - start
+
+    assert count == num_lines, f"{name}: got {count} lines, expected {num_lines}"
+
+    print(
+        f"{name}: {size / elapsed / 1024 / 1024:.1f} MB/s, "
+        f"{count / elapsed:,.0f} lines/s, max rss {get_max_rss_mb():.1f} MB"
+    )
+
+
+# ============================================================================
+def main():
+    """run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--compare", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".deflate", delete=False) as fh:
+        size, num_lines = write_member(fh, args.size_mb)
+        filename = fh.name
+
+    try:
+        compressed_mb = os.path.getsize(filename) / 1024 / 1024
+        print(
+            f"member: {size / 1024 / 1024:.0f} MB uncompressed, "
+            f"{compressed_mb:.0f} MB deflated, {num_lines:,} lines"
+        )
+        print(f"max rss before read: {get_max_rss_mb():.1f} MB")
+
+        asyncio.run(
+            run(
+                "inflate + iter_lines",
+                iter_lines(read_chunks(filename), decompress=True),
+                size,
+                num_lines,
+            )
+        )
+
+        if args.compare:
+            asyncio.run(
+                run(
+                    "inflate + prev iter_lines",
+                    prev_iter_lines(inflate_chunks(read_chunks(filename))),
+                    size,
+                    num_lines,
+                )
+            )
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+Offline load test for the crawl operator sync path
+
+Builds a CrawlOperator against a stubbed K8sOpAPI, in-memory stand-ins for
+the db-backed ops (optionally writing pages to a local MongoDB) and a
+redis-server, then replays synthetic metacontroller MCSyncData payloads for
+N crawls x M crawler pods, with redis queues pre-filled with pages, files
+and errors before each round. Each round syncs all crawls concurrently,
+passing the returned status back in as the next parent status, as
+metacontroller does.
+
+By default, starts its own redis-server on a free port, which must be
+installed, eg:
+
+    python -m benchmarks.operator_load_test --crawls 200 --scale 2 --rounds 10
+
+Note: crawls are spread across the 16 redis dbs, which are flushed before
+and after the run, so an existing redis can only be used by also passing
+--flush, eg. --redis-url redis://localhost:6379 --flush. As with a real
+crawl's redis, 'crawls-done' and 'filesAdded' are shared by all crawls
+using the same db.
+
+Exits with an error if any pages, files or errors were not drained, so can
+also be run as a smoke test.
+"""
+
+# stand-ins implement only the ops methods called by the operator
+# pylint: disable=missing-function-docstring, unused-argument
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+from fastapi.templating import Jinja2Templates
+from motor.motor_asyncio import AsyncIOMotorClient
+from redis import asyncio as aioredis
+
+from btrixcloud.k8sapi import RedisClientRegistry
+from btrixcloud.operator.baseoperator import K8sOpAPI
+from btrixcloud.operator.crawls import CrawlOperator
+from btrixcloud.operator.models import CJS, CMAP, POD, PVC, MCSyncData
+from btrixcloud.pages import PageOps
+from btrixcloud.utils import dt_now, to_k8s_date
+
+
+CHART_TEMPLATES = os.path.join(
+    os.path.dirname(__file__), "..", "..", "chart", "app-templates"
+)
+
+NUM_REDIS_DBS = 16
+
+# defaults from chart values.yaml, as provided to the operator in config.yaml
+SHARED_PARAMS = {
+    "namespace": "crawlers",
+    "termination_grace_secs": "600",
+    "volume_storage_class": "",
+    "redis_image": "redis",
+    "redis_image_pull_policy": "IfNotPresent",
+    "redis_cpu": "10m",
+    "redis_memory": "200Mi",
+    "redis_storage": "3Gi",
+    "crawler_image_pull_policy": "IfNotPresent",
+    "crawler_cpu_base": "900m",
+    "crawler_memory_base": "1024Mi",
+    "crawler_extra_cpu_per_browser": "600m",
+    "crawler_extra_memory_per_browser": "768Mi",
+    "crawler_browser_instances": "2",
+    "crawler_cpu": "",
+    "crawler_memory": "",
+    "crawler_storage": "22Gi",
+    "crawler_liveness_port": "6065",
+    "crawler_socks_proxy_host": "",
+    "crawler_socks_proxy_port": "",
+    "crawler_node_type": "",
+    "redis_node_type": "",
+    "signing_secret": "",
+}
+
+
+# ============================================================================
+class StubK8sOpAPI(K8sOpAPI):
+    """K8sOpAPI without a cluster: templates are loaded from the chart,
+    each crawl's redis is a db on a local redis-server"""
+
+    # pylint: disable=super-init-not-called, too-many-instance-attributes
+    def __init__(self, redis_url):
+        self.namespace = "crawlers"
+        self.custom_resources = {}
+        self.templates = Jinja2Templates(directory=CHART_TEMPLATES)
+        self.redis_clients = RedisClientRegistry()
+
+        self.shared_params = dict(SHARED_PARAMS)
+        self.has_pod_metrics = False
+        self.compute_crawler_resources()
+
+        self.redis_url = redis_url.rstrip("/")
+        self.redis_dbs = {}
+
+    def get_redis_url(self, crawl_id):
+        return f"{self.redis_url}/{self.redis_dbs[crawl_id]}"
+
+    async def delete_crawl_job(self, crawl_id):
+        return {"success": True}
+
+    async def print_pod_logs(self, pod_names, lines=100):
+        pass
+
+
+# ============================================================================
+class MemCrawlOps:
+    """in-memory stand-in for CrawlOps, as used by the operator"""
+
+    def __init__(self):
+        self.crawls = {}
+
+    def _get(self, crawl_id):
+        return self.crawls.setdefault(
+            crawl_id,
+            {"state": "running", "finished": None, "errors": 0, "files": 0},
+        )
+
+    async def update_crawl_state_if_allowed(
+        self, crawl_id, state, allowed_from, **kwargs
+    ):
+        crawl = self._get(crawl_id)
+        if allowed_from and crawl["state"] not in allowed_from:
+            return False
+
+        crawl["state"] = state
+        crawl["finished"] = kwargs.get("finished")
+        return True
+
+    async def get_crawl_state(self, crawl_id):
+        crawl = self._get(crawl_id)
+        return crawl["state"], crawl["finished"]
+
+    async def update_running_crawl_stats(self, crawl_id, stats):
+        self._get(crawl_id)["stats"] = stats
+
+    async def add_crawl_errors(self, crawl_id, errors):
+        self._get(crawl_id)["errors"] += len(errors)
+
+    async def add_crawl_file(self, crawl_id, crawl_file, size):
+        self._get(crawl_id)["files"] += 1
+        return True
+
+    async def inc_crawl_exec_time(self, crawl_id, exec_time, last_updated_time):
+        return True
+
+    async def delete_crawl_files(self, crawl_id, oid):
+        pass
+
+
+# ============================================================================
+class MemPageOps:
+    """in-memory stand-in for PageOps"""
+
+    def __init__(self):
+        self.num_pages = 0
+
+    async def add_pages_to_db(self, page_dicts, crawl_id, oid, raise_errors=False):
+        self.num_pages += len(page_dicts)
+        return len(page_dicts)
+
+    async def delete_crawl_pages(self, crawl_id, oid=None):
+        pass
+
+
+# ============================================================================
+class MemOrgOps:
+    """in-memory stand-in for OrgOps, no quotas"""
+
+    async def get_max_concurrent_crawls(self, oid):
+        return 0
+
+    async def storage_quota_reached(self, oid):
+        return False
+
+    async def exec_mins_quota_reached(self, oid, include_extra=True):
+        return False
+
+    async def get_org_by_id(self, oid):
+        return SimpleNamespace(id=oid)
+
+    async def inc_org_time_stats(self, oid, duration, is_exec_time=False):
+        pass
+
+    async def inc_org_bytes_stored(self, oid, size, type_="crawl"):
+        return False
+
+
+# ============================================================================
+class MemOutbox:
+    """in-memory stand-in for OperatorOutbox, recording tasks enqueued
+    for finished crawls without running them"""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def register(self, task_type, handler):
+        pass
+
+    # pylint: disable=too-many-arguments
+    async def enqueue(self, task_type, group, steps, params, final_step=None):
+        for step in steps:
+            self.tasks[f"{group}:{step}"] = params
+
+
+# ============================================================================
+class NoopOps:
+    """stand-in for ops where results are not used, eg. webhooks"""
+
+    user_manager = None
+
+    def __getattr__(self, name):
+        async def noop(*_, **__):
+            return None
+
+        return noop
+
+    def get_channel_crawler_image(self, _):
+        return "docker.io/webrecorder/browsertrix-crawler:latest"
+
+    def get_org_relative_path(self, _, __, filename):
+        return filename
+
+
+# ============================================================================
+def make_pod(name, role, crawl_id):
+    """running pod, as returned by metacontroller in children"""
+    return {
+        "metadata": {"name": name, "labels": {"role": role, "crawl": crawl_id}},
+        "spec": {
+            "containers": [{"resources": {"requests": {"memory": "1Gi", "cpu": "1"}}}]
+        },
+        "status": {
+            "phase": "Running",
+            "containerStatuses": [
+                {"state": {"running": {"startedAt": to_k8s_date(dt_now())}}}
+            ],
+        },
+    }
+
+
+# ============================================================================
+def make_sync_data(crawl_id, cid, oid, scale):
+    """synthetic MCSyncData payload for a running crawl"""
+    pods = {f"redis-{crawl_id}": make_pod(f"redis-{crawl_id}", "redis", crawl_id)}
+    for i in range(scale):
+        name = f"crawl-{crawl_id}-{i}"
+        pods[name] = make_pod(name, "crawler", crawl_id)
+
+    return {
+        "parent": {
+            "metadata": {
+                "name": f"crawljob-{crawl_id}",
+                "creationTimestamp": to_k8s_date(dt_now()),
+            },
+            "spec": {
+                "id": crawl_id,
+                "cid": str(cid),
+                "oid": str(oid),
+                "userid": str(uuid4()),
+                "storageName": "default",
+                "crawlerChannel": "default",
+                "scale": scale,
+                "manual": "1",
+            },
+            "status": {
+                "state": "running",
+                "initRedis": True,
+                "lastUpdatedTime": to_k8s_date(dt_now()),
+            },
+        },
+        "controller": {},
+        "children": {POD: pods, PVC: {}},
+        "related": {
+            CMAP: {
+                f"crawl-config-{cid}": {
+                    "data": {"PROFILE_FILENAME": "", "STORE_FILENAME": "@ts.wacz"}
+                }
+            },
+            CJS: {},
+        },
+    }
+
+
+# ============================================================================
+async def fill_redis(redis, crawl_id, scale, args):
+    """pre-fill crawl redis with pending pages, files and errors"""
+    async with redis.pipeline(transaction=False) as pipe:
+        if args.pages:
+            pipe.rpush(
+                f"{crawl_id}:pages",
+                *[
+                    json.dumps(
+                        {
+                            "id": str(uuid4()),
+                            "url": f"https://example.com/{i}",
+                            "title": f"Page {i}",
+                            "loadState": 4,
+                            "ts": to_k8s_date(dt_now()),
+                        }
+                    )
+                    for i in range(args.pages)
+                ],
+            )
+        if args.errors:
+            pipe.rpush(
+                f"{crawl_id}:e",
+                *[
+                    json.dumps({"logLevel": "error", "message": f"error {i}"})
+                    for i in range(args.errors)
+                ],
+            )
+        for i in range(args.files):
+            pipe.rpush(
+                "crawls-done",
+                json.dumps(
+                    {
+                        "id": crawl_id,
+                        "user": f"crawl-{crawl_id}-0",
+                        "filename": f"{crawl_id}-{i}.wacz",
+                        "size": 1000000,
+                        "hash": "sha256:0",
+                        "crc32": 0,
+                    }
+                ),
+            )
+        for i in range(scale):
+            pipe.hset(f"{crawl_id}:status", f"crawl-{crawl_id}-{i}", "running")
+            pipe.hset(f"{crawl_id}:size", f"crawl-{crawl_id}-{i}", 1000000)
+
+        pipe.incrby(f"{crawl_id}:d", args.pages)
+        pipe.sadd(f"{crawl_id}:s", *[f"https://example.com/{i}" for i in range(10)])
+        await pipe.execute()
+
+
+# ============================================================================
+def start_redis_server():
+    """start scratch redis-server on a free port, without persistence"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    proc = subprocess.Popen(  # pylint: disable=consider-using-with
+        ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+    )
+
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    return proc, f"redis://127.0.0.1:{port}"
+
+
+# ============================================================================
+# pylint: disable=too-many-locals, too-many-statements, too-many-branches
+async def main():
+    """run load test"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--redis-url", help="existing redis to use, else start a scratch redis-server"
+    )
+    parser.add_argument(
+        "--flush",
+        action="store_true",
+        help="allow flushing all dbs of redis at --redis-url",
+    )
+    parser.add_argument(
+        "--mongo-url", help="if set, write pages to this MongoDB, else in-memory"
+    )
+    parser.add_argument("--crawls", type=int, default=100)
+    parser.add_argument("--scale", type=int, default=1, help="crawler pods per crawl")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=100, help="per crawl per round")
+    parser.add_argument("--errors", type=int, default=10, help="per crawl per round")
+    parser.add_argument("--files", type=int, default=0, help="per crawl per round")
+    args = parser.parse_args()
+
+    redis_proc = None
+    if not args.redis_url:
+        redis_proc, args.redis_url = start_redis_server()
+    elif not args.flush:
+        parser.error("--flush is required with --redis-url, as all dbs are flushed")
+
+    k8s = StubK8sOpAPI(args.redis_url)
+
+    mongo_client = None
+    if args.mongo_url:
+        mongo_client = AsyncIOMotorClient(args.mongo_url, uuidRepresentation="standard")
+        mdb = mongo_client[f"btrix-load-test-{uuid4().hex}"]
+        page_ops = PageOps(mdb, None, None, None)
+    else:
+        page_ops = MemPageOps()
+
+    crawl_ops = MemCrawlOps()
+    noop = NoopOps()
+
+    operator = CrawlOperator(
+        k8s, noop, crawl_ops, MemOrgOps(), noop, noop, noop, noop, page_ops
+    )
+    outbox = MemOutbox()
+    operator.init_outbox(outbox)
+
+    oid = uuid4()
+    payloads = {}
+    for i in range(args.crawls):
+        crawl_id = f"load-test-{i}"
+        k8s.redis_dbs[crawl_id] = i % NUM_REDIS_DBS
+        payloads[crawl_id] = make_sync_data(crawl_id, uuid4(), oid, args.scale)
+
+    dbs = [
+        aioredis.from_url(f"{k8s.redis_url}/{db}", decode_responses=True)
+        for db in range(NUM_REDIS_DBS)
+    ]
+    for redis in dbs:
+        await redis.flushdb()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def sync_one(crawl_id):
+        async with semaphore:
+            start = time.perf_counter()
+            resp = await operator.sync_crawls(MCSyncData(**payloads[crawl_id]))
+            latencies.append(time.perf_counter() - start)
+            payloads[crawl_id]["parent"]["status"] = resp["status"]
+
+    total_secs = 0.0
+    for _ in range(args.rounds):
+        for crawl_id in payloads:
+            redis = dbs[k8s.redis_dbs[crawl_id]]
+            await fill_redis(redis, crawl_id, args.scale, args)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[sync_one(crawl_id) for crawl_id in payloads])
+        total_secs += time.perf_counter() - start
+
+    latencies.sort()
+    num_syncs = len(latencies)
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(
+        f"{args.crawls} crawls x {args.scale} crawler pods, {args.rounds} rounds, "
+        f"{args.pages} pages / {args.errors} errors / {args.files} files "
+        "per crawl per round"
+    )
+    print(f"syncs:      {num_syncs} in {total_secs:.2f} s")
+    print(f"syncs/sec:  {num_syncs / total_secs:.1f}")
+    p99 = latencies[min(int(num_syncs * 0.99), num_syncs - 1)]
+    print(
+        f"latency:    p50 {statistics.median(latencies) * 1000:.1f} ms, "
+        f"p99 {p99 * 1000:.1f} ms"
+    )
+    print(f"max rss:    {max_rss_mb:.1f} MB")
+    print(
+        "drained:    "
+        f"{sum(crawl['errors'] for crawl in crawl_ops.crawls.values())} errors, "
+        f"{sum(crawl['files'] for crawl in crawl_ops.crawls.values())} files, "
+        f"states {set(crawl['state'] for crawl in crawl_ops.crawls.values())}"
+    )
+    print(f"redis:      {k8s.redis_clients.get_stats()}")
+    print(f"outbox:     {len(outbox.tasks)} tasks enqueued for finished crawls")
+
+    # all entries should have been drained in last round
+    pending = 0
+    for crawl_id, db in k8s.redis_dbs.items():
+        pending += await dbs[db].llen(f"{crawl_id}:pages")
+        pending += await dbs[db].llen(f"{crawl_id}:e")
+
+    for redis in dbs:
+        pending += await redis.llen("crawls-done")
+
+    for redis in dbs:
+        await redis.flushdb()
+        await redis.close()
+
+    await k8s.redis_clients.close_all()
+
+    if mongo_client:
+        await mongo_client.drop_database(mdb.name)
+        mongo_client.close()
+
+    if redis_proc:
+        redis_proc.terminate()
+        redis_proc.wait()
+
+    if pending:
+        print(f"error: {pending} entries not drained from redis")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,7 @@
 """k8s background jobs"""
 
 import asyncio
+import secrets
 from datetime import datetime
 from typing import Optional, Tuple, Union, List, Dict, TYPE_CHECKING, cast
 from uuid import UUID
@@ -9,22 +10,28 @@ from urllib.parse import urlsplit
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from .storages import StorageOps
+from .storages import StorageOps, DELETE_OBJECTS_MAX_KEYS
 from .crawlmanager import CrawlManager
+from .operator.outbox import OperatorOutbox
 
 from .models import (
     BaseFile,
+    CrawlFile,
     Organization,
     BackgroundJob,
     BgJobType,
     CreateReplicaJob,
     DeleteReplicaJob,
+    DeleteFilesJob,
+    DeleteFileError,
+    IngestPagesJob,
     PaginatedResponse,
     AnyJob,
     StorageRef,
     User,
 )
 from .pagination import DEFAULT_PAGE_SIZE, paginated_format
+from .utils import dt_now
 
 if TYPE_CHECKING:
     from .orgs import OrgOps
@@ -34,8 +41,13 @@ else:
     OrgOps = CrawlManager = BaseCrawlOps = ProfileOps = object
 
 
+# outbox task types for jobs run in operator
+INGEST_PAGES_TASK = "ingest_pages"
+DELETE_FILES_TASK = "delete_files"
+
+
 # ============================================================================
-# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-instance-attributes, too-many-public-methods
 class BackgroundJobOps:
     """k8s background job management"""
 
@@ -51,6 +63,9 @@ class BackgroundJobOps:
     def __init__(self, mdb, email, user_manager, org_ops, crawl_manager, storage_ops):
         self.jobs = mdb["jobs"]
 
+        # for enqueuing jobs run in operator
+        self.outbox = OperatorOutbox(mdb)
+
         self.email = email
         self.user_manager = user_manager
 
@@ -72,6 +87,12 @@ class BackgroundJobOps:
         self.base_crawl_ops = base_crawl_ops
         self.profile_ops = profile_ops
 
+    def init_outbox(self, outbox: OperatorOutbox) -> None:
+        """run jobs from operator outbox, in operator"""
+        self.outbox = outbox
+        outbox.register(INGEST_PAGES_TASK, self.run_ingest_pages_step)
+        outbox.register(DELETE_FILES_TASK, self.run_delete_files_step)
+
     def strip_bucket(self, endpoint_url: str) -> tuple[str, str]:
         """split the endpoint_url into the origin and return rest of endpoint as bucket path"""
         parts = urlsplit(endpoint_url)
@@ -268,6 +289,188 @@ class BackgroundJobOps:
                 status_code=400, detail=f"Error starting background job: {exc}"
             )
 
+    async def create_ingest_pages_job(
+        self,
+        org: Organization,
+        upload_id: str,
+        existing_job_id: Optional[str] = None,
+    ) -> str:
+        """Create job to add pages from uploaded WACZs to db, run in operator.
+        If retrying existing job, resume from position saved in job"""
+        if existing_job_id:
+            job = await self._get_job_for_retry(existing_job_id, org.id)
+        else:
+            # remove any pages from previous files, if upload was replaced
+            await self.base_crawl_ops.page_ops.delete_crawl_pages(upload_id, org.id)
+
+            job_type = BgJobType.INGEST_PAGES.value
+            job = IngestPagesJob(
+                id=f"{job_type}-{upload_id}-{secrets.token_hex(5)}",
+                oid=org.id,
+                started=dt_now(),
+                object_id=upload_id,
+            )
+
+        return await self._run_job_in_operator(job, INGEST_PAGES_TASK, "ingest")
+
+    async def _get_job_for_retry(self, job_id: str, oid: UUID):
+        """Return existing job, with previous run added to previous attempts"""
+        job = await self.get_background_job(job_id, oid)
+        previous_attempt = {"started": job.started, "finished": job.finished}
+        job.previousAttempts = (job.previousAttempts or []) + [previous_attempt]
+        job.started = dt_now()
+        job.finished = None
+        job.success = None
+        return job
+
+    async def _run_job_in_operator(
+        self, job: BackgroundJob, task_type: str, step: str
+    ) -> str:
+        """Save job and enqueue outbox task to run step of job, then
+        final step to finish job, once step has succeeded or failed all attempts.
+        Handler is called with step and with "finish" for final step"""
+        await self.jobs.find_one_and_update(
+            {"_id": job.id}, {"$set": job.to_dict()}, upsert=True
+        )
+
+        attempt = len(job.previousAttempts or [])
+        await self.outbox.enqueue(
+            task_type,
+            f"{job.id}-{attempt}",
+            [step],
+            {"job_id": job.id, "oid": job.oid},
+            final_step="finish",
+        )
+
+        return job.id
+
+    async def run_ingest_pages_step(self, step: str, job_id: str, oid: UUID):
+        """Run ingest step, retried from outbox on failure, resuming from
+        last saved position. Job is finished by final step once ingest step
+        has succeeded or failed all attempts"""
+        job = await self.get_background_job(job_id, oid)
+        if not isinstance(job, IngestPagesJob) or job.finished:
+            return
+
+        org = await self.org_ops.get_org_by_id(oid)
+        wacz_files = await self._get_ingest_pages_files(job, org)
+
+        if step != "finish":
+            if wacz_files:
+                await self.base_crawl_ops.page_ops.ingest_wacz_pages(
+                    job, org, wacz_files, self.save_ingest_pages_progress
+                )
+            return
+
+        success = wacz_files is not None and job.filesDone >= len(wacz_files)
+        print(
+            f"Ingest pages job {job_id} finished, success: {success}, "
+            f"{job.pagesAdded} pages added",
+            flush=True,
+        )
+        await self.job_finished(job_id, job.type, oid, success, dt_now())
+
+    async def _get_ingest_pages_files(
+        self, job: IngestPagesJob, org: Organization
+    ) -> Optional[List[CrawlFile]]:
+        """Return WACZ files of upload, or None if upload was deleted"""
+        try:
+            upload = await self.base_crawl_ops.get_crawl_raw(job.object_id, org)
+        except HTTPException:
+            return None
+
+        return [CrawlFile(**data) for data in upload.get("files", [])]
+
+    async def save_ingest_pages_progress(self, job: IngestPagesJob) -> None:
+        """Save position in files and pages added so far"""
+        await self.jobs.find_one_and_update(
+            {"_id": job.id},
+            {
+                "$set": {
+                    "filesDone": job.filesDone,
+                    "membersDone": job.membersDone,
+                    "recordsDone": job.recordsDone,
+                    "pagesAdded": job.pagesAdded,
+                }
+            },
+        )
+
+    async def create_delete_files_job(
+        self,
+        org: Organization,
+        files: List[BaseFile],
+        object_type: str,
+        object_ids: List[str],
+        existing_job_id: Optional[str] = None,
+    ) -> str:
+        """Create job to delete files of deleted crawls or uploads from
+        storage in bulk, run in operator. If retrying existing job,
+        all files are deleted again"""
+        if existing_job_id:
+            job = await self._get_job_for_retry(existing_job_id, org.id)
+            job.filesDone = 0
+            job.errors = []
+        else:
+            job_type = BgJobType.DELETE_FILES.value
+            job = DeleteFilesJob(
+                id=f"{job_type}-{object_type}-{secrets.token_hex(5)}",
+                oid=org.id,
+                started=dt_now(),
+                object_type=object_type,
+                object_ids=object_ids,
+                files=files,
+            )
+
+        return await self._run_job_in_operator(job, DELETE_FILES_TASK, "delete")
+
+    async def run_delete_files_step(self, step: str, job_id: str, oid: UUID):
+        """Delete files in batches of up to DELETE_OBJECTS_MAX_KEYS, saving
+        files done and any errors after each batch. Job is finished by final
+        step, successful if all files were deleted"""
+        job = await self.get_background_job(job_id, oid)
+        if not isinstance(job, DeleteFilesJob) or job.finished:
+            return
+
+        if step != "finish":
+            org = await self.org_ops.get_org_by_id(oid)
+            await self.delete_job_files(job, org)
+            return
+
+        success = job.filesDone >= len(job.files) and not job.errors
+        print(
+            f"Delete files job {job_id} finished, success: {success}, "
+            f"{len(job.files) - len(job.errors)} of {len(job.files)} files deleted",
+            flush=True,
+        )
+        await self.job_finished(job_id, job.type, oid, success, dt_now())
+
+    async def delete_job_files(self, job: DeleteFilesJob, org: Organization):
+        """Delete files of job from storage, resuming from files done"""
+        while job.filesDone < len(job.files):
+            files = job.files[job.filesDone : job.filesDone + DELETE_OBJECTS_MAX_KEYS]
+            errors = await self.storage_ops.delete_file_objects(org, files)
+
+            job.errors.extend(
+                DeleteFileError(
+                    filename=file_.filename,
+                    storage=file_.storage,
+                    error=errors[file_.filename],
+                )
+                for file_ in files
+                if file_.filename in errors
+            )
+            job.filesDone += len(files)
+
+            await self.jobs.find_one_and_update(
+                {"_id": job.id},
+                {
+                    "$set": {
+                        "filesDone": job.filesDone,
+                        "errors": [error.dict() for error in job.errors],
+                    }
+                },
+            )
+
     async def job_finished(
         self,
         job_id: str,
@@ -312,7 +515,7 @@ class BackgroundJobOps:
 
     async def get_background_job(
         self, job_id: str, oid: UUID
-    ) -> Union[CreateReplicaJob, DeleteReplicaJob]:
+    ) -> Union[CreateReplicaJob, DeleteReplicaJob, IngestPagesJob, DeleteFilesJob]:
         """Get background job"""
         query: dict[str, object] = {"_id": job_id, "oid": oid}
         res = await self.jobs.find_one(query)
@@ -326,6 +529,12 @@ class BackgroundJobOps:
         if data["type"] == BgJobType.CREATE_REPLICA:
             return CreateReplicaJob.from_dict(data)
 
+        if data["type"] == BgJobType.INGEST_PAGES:
+            return IngestPagesJob.from_dict(data)
+
+        if data["type"] == BgJobType.DELETE_FILES:
+            return DeleteFilesJob.from_dict(data)
+
         return DeleteReplicaJob.from_dict(data)
 
         # return BackgroundJob.from_dict(data)
@@ -426,6 +635,18 @@ class BackgroundJobOps:
         if job.success:
             raise HTTPException(status_code=400, detail="job_already_succeeded")
 
+        if job.type == BgJobType.INGEST_PAGES:
+            await self.create_ingest_pages_job(
+                org, job.object_id, existing_job_id=job_id
+            )
+            return {"success": True}
+
+        if job.type == BgJobType.DELETE_FILES:
+            await self.create_delete_files_job(
+                org, job.files, job.object_type, job.object_ids, existing_job_id=job_id
+            )
+            return {"success": True}
+
         file = await self.get_replica_job_file(job, org)
 
         if job.type == BgJobType.CREATE_REPLICA:
@@ -1,7 +1,7 @@
 """ base crawl type """
 
 import os
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Optional, List, Union, Dict, Any, Type, TYPE_CHECKING, cast
 from uuid import UUID
 import urllib.parse
@@ -9,8 +9,11 @@ import contextlib
 
 import asyncio
 from fastapi import HTTPException, Depends
+from pymongo import UpdateOne
+from redis import asyncio as exceptions
 
 from .models import (
+    BaseFile,
     CrawlFile,
     CrawlFileOut,
     BaseCrawl,
@@ -79,6 +82,7 @@ class BaseCrawlOps:
         background_job_ops: BackgroundJobOps,
     ):
         self.crawls = mdb["crawls"]
+        self.crawl_log_indexes = mdb["crawl_log_indexes"]
         self.crawl_manager = crawl_manager
         self.crawl_configs = crawl_configs
         self.user_manager = users
@@ -97,6 +101,10 @@ class BaseCrawlOps:
             min(presign_duration_minutes, PRESIGN_MINUTES_MAX) * 60
         )
 
+        # (crawl id, filename) -> (presigned url, expire at) for urls refreshed
+        # but not yet saved, reused by concurrent requests
+        self.presign_refreshes: dict[tuple[str, str], tuple[str, datetime]] = {}
+
     def set_page_ops(self, page_ops):
         """set page ops reference"""
         self.page_ops = page_ops
@@ -129,7 +137,8 @@ class BaseCrawlOps:
             return []
 
         crawl_files = [CrawlFile(**data) for data in files]
-        return await self._resolve_signed_urls(crawl_files, org, crawlid)
+        resources = await self._resolve_signed_urls({crawlid: crawl_files}, org)
+        return resources[crawlid]
 
     async def get_crawl(
         self,
@@ -320,6 +329,7 @@ class BaseCrawlOps:
         cids_to_update: dict[str, dict[str, int]] = {}
 
         size = 0
+        crawls_to_delete = []
 
         for crawl_id in delete_list.crawl_ids:
             crawl = await self.get_crawl_raw(crawl_id, org)
@@ -341,10 +351,14 @@ class BaseCrawlOps:
                         status_code=400, detail=f"Error Stopping Crawl: {exc}"
                     )
 
+            # pages are also ingested from uploads
+            await self.page_ops.delete_crawl_pages(crawl_id, org.id)
+
             if type_ == "crawl":
-                await self.page_ops.delete_crawl_pages(crawl_id, org.id)
+                await self.crawl_log_indexes.delete_one({"_id": crawl_id})
 
-            crawl_size = await self._delete_crawl_files(crawl, org)
+            crawls_to_delete.append(crawl)
+            crawl_size = sum(file_["size"] for file_ in crawl.get("files", []))
             size += crawl_size
 
             cid = crawl.get("cid")
@@ -370,6 +384,8 @@ class BaseCrawlOps:
                     )
                 )
 
+        await self._delete_crawl_files(crawls_to_delete, org)
+
         query = {"_id": {"$in": delete_list.crawl_ids}, "oid": org.id, "type": type_}
         res = await self.crawls.delete_many(query)
 
@@ -377,32 +393,38 @@ class BaseCrawlOps:
 
         return res.deleted_count, cids_to_update, quota_reached
 
-    async def _delete_crawl_files(self, crawl_raw: Dict[str, Any], org: Organization):
-        """Delete files associated with crawl from storage."""
-        crawl = BaseCrawl.from_dict(crawl_raw)
-        size = 0
-        for file_ in crawl.files:
-            size += file_.size
-            if not await self.storage_ops.delete_crawl_file_object(org, file_):
-                raise HTTPException(status_code=400, detail="file_deletion_error")
-            await self.background_job_ops.create_delete_replica_jobs(
-                org, file_, crawl.id, crawl.type
+    async def _delete_crawl_files(
+        self, crawls_raw: List[Dict[str, Any]], org: Organization
+    ) -> int:
+        """Delete files associated with crawls from storage, in bulk in a
+        background job. Returns total size of files"""
+        crawls = [BaseCrawl.from_dict(crawl_raw) for crawl_raw in crawls_raw]
+        files: List[BaseFile] = []
+        for crawl in crawls:
+            for file_ in crawl.files:
+                files.append(BaseFile(**file_.dict(exclude={"zipIndex"})))
+                await self.background_job_ops.create_delete_replica_jobs(
+                    org, file_, crawl.id, crawl.type
+                )
+
+        if files:
+            await self.background_job_ops.create_delete_files_job(
+                org, files, crawls[0].type, [crawl.id for crawl in crawls]
             )
 
-        return size
+        return sum(file_.size for file_ in files)
 
     async def delete_crawl_files(self, crawl_id: str, oid: UUID):
         """Delete crawl files"""
         crawl_raw = await self.get_crawl_raw(crawl_id)
         org = await self.orgs.get_org_by_id(oid)
-        return await self._delete_crawl_files(crawl_raw, org)
+        return await self._delete_crawl_files([crawl_raw], org)
 
     async def _resolve_crawl_refs(
         self,
         crawl: Union[CrawlOut, CrawlOutWithResources],
         org: Optional[Organization],
         add_first_seed: bool = True,
-        files: Optional[list[dict]] = None,
     ):
         """Resolve running crawl data"""
         # pylint: disable=too-many-branches
@@ -422,76 +444,124 @@ class BaseCrawlOps:
                 crawl.profileid, org
             )
 
-        if (
-            files
-            and crawl.state in SUCCESSFUL_STATES
-            and isinstance(crawl, CrawlOutWithResources)
-        ):
-            crawl.resources = await self._files_to_resources(files, org, crawl.id)
-
         return crawl
 
-    async def _resolve_signed_urls(
-        self, files: List[CrawlFile], org: Organization, crawl_id: Optional[str] = None
+    async def _add_crawl_resources(
+        self,
+        crawls_files: List[tuple[CrawlOutWithResources, Optional[List[dict]]]],
+        org: Optional[Organization],
     ):
-        if not files:
-            print("no files")
+        """add resources to successful crawls in list, for all crawls at once"""
+        files_by_crawl = {
+            crawl.id: [CrawlFile(**data) for data in files]
+            for crawl, files in crawls_files
+            if files and crawl.state in SUCCESSFUL_STATES
+        }
+
+        if not files_by_crawl:
             return
 
-        delta = timedelta(seconds=self.presign_duration_seconds)
+        resources = await self._resolve_signed_urls(files_by_crawl, org)
 
-        out_files = []
+        for crawl, _ in crawls_files:
+            if crawl.id in resources:
+                crawl.resources = resources[crawl.id]
 
-        for file_ in files:
-            presigned_url = file_.presignedUrl
-            now = dt_now()
+    async def _resolve_signed_urls(
+        self, files_by_crawl: Dict[str, List[CrawlFile]], org: Optional[Organization]
+    ) -> Dict[str, List[CrawlFileOut]]:
+        """return resources for files of each crawl, presigning expired urls
+        in one batch and saving them with one bulk write"""
+        now = dt_now()
+        exp = now + timedelta(seconds=self.presign_duration_seconds)
+
+        expired: List[tuple[str, CrawlFile]] = []
+
+        for crawl_id, files in files_by_crawl.items():
+            for file_ in files:
+                if file_.presignedUrl and file_.expireAt and now < file_.expireAt:
+                    continue
+
+                # already refreshed by concurrent request, not yet saved
+                refreshed = self.presign_refreshes.get((crawl_id, file_.filename))
+                if refreshed:
+                    file_.presignedUrl, file_.expireAt = refreshed
+                    continue
+
+                expired.append((crawl_id, file_))
+
+        if expired:
+            presigned_urls = self.storage_ops.get_presigned_urls(
+                org,
+                [file_ for _, file_ in expired],
+                self.presign_duration_seconds,
+                now,
+            )
 
-            if not presigned_url or now >= file_.expireAt:
-                exp = now + delta
-                presigned_url = await self.storage_ops.get_presigned_url(
-                    org, file_, self.presign_duration_seconds
+            updates = []
+            for (crawl_id, file_), presigned_url in zip(expired, presigned_urls):
+                file_.presignedUrl = presigned_url
+                file_.expireAt = exp
+                self.presign_refreshes[(crawl_id, file_.filename)] = (
+                    presigned_url,
+                    exp,
                 )
-                await self.crawls.find_one_and_update(
-                    {"files.filename": file_.filename},
-                    {
-                        "$set": {
-                            "files.$.presignedUrl": presigned_url,
-                            "files.$.expireAt": exp,
-                        }
-                    },
+                updates.append(
+                    UpdateOne(
+                        {"_id": crawl_id, "files.filename": file_.filename},
+                        {
+                            "$set": {
+                                "files.$.presignedUrl": presigned_url,
+                                "files.$.expireAt": exp,
+                            }
+                        },
+                    )
                 )
-                file_.expireAt = exp
 
-            expire_at_str = ""
-            if file_.expireAt:
-                expire_at_str = file_.expireAt.isoformat()
-
-            out_files.append(
-                CrawlFileOut(
-                    name=file_.filename,
-                    path=presigned_url or "",
-                    hash=file_.hash,
-                    crc32=file_.crc32,
-                    size=file_.size,
-                    crawlId=crawl_id,
-                    numReplicas=len(file_.replicas) if file_.replicas else 0,
-                    expireAt=expire_at_str,
+            try:
+                await self.crawls.bulk_write(updates, ordered=False)
+            finally:
+                for crawl_id, file_ in expired:
+                    self.presign_refreshes.pop((crawl_id, file_.filename), None)
+
+        resources = {}
+
+        for crawl_id, files in files_by_crawl.items():
+            out_files = []
+
+            for file_ in files:
+                expire_at_str = ""
+                if file_.expireAt:
+                    expire_at_str = file_.expireAt.isoformat()
+
+                out_files.append(
+                    CrawlFileOut(
+                        name=file_.filename,
+                        path=file_.presignedUrl or "",
+                        hash=file_.hash,
+                        crc32=file_.crc32,
+                        size=file_.size,
+                        crawlId=crawl_id,
+                        numReplicas=len(file_.replicas) if file_.replicas else 0,
+                        expireAt=expire_at_str,
+                    )
                 )
-            )
 
-        return out_files
+            resources[crawl_id] = out_files
+
+        return resources
 
     @contextlib.asynccontextmanager
     async def get_redis(self, crawl_id):
-        """get redis url for crawl id"""
-        redis_url = self.crawl_manager.get_redis_url(crawl_id)
-
-        redis = await self.crawl_manager.get_redis_client(redis_url)
+        """get pooled redis client for crawl id"""
+        redis = await self.crawl_manager.get_crawl_redis(crawl_id, ping=False)
 
         try:
             yield redis
-        finally:
-            await redis.close()
+        except exceptions.ConnectionError:
+            # don't keep client around if redis not reachable
+            await self.crawl_manager.evict_crawl_redis(crawl_id)
+            raise
 
     async def add_to_collection(
         self, crawl_ids: List[str], collection_id: UUID, org: Organization
@@ -626,16 +696,20 @@ class BaseCrawlOps:
             total = 0
 
         crawls = []
+        crawls_files = []
         for res in items:
             crawl = cls_type.from_dict(res)
 
             if resources or crawl.type == "crawl":
-                # pass files only if we want to include resolved resources
-                files = res.get("files") if resources else None
-                crawl = await self._resolve_crawl_refs(crawl, org, files=files)
+                crawl = await self._resolve_crawl_refs(crawl, org)
+
+            if isinstance(crawl, CrawlOutWithResources):
+                crawls_files.append((crawl, res.get("files")))
 
             crawls.append(crawl)
 
+        await self._add_crawl_resources(crawls_files, org)
+
         return crawls, total
 
     async def delete_crawls_all_types(
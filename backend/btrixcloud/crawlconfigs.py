@@ -571,8 +571,17 @@ class CrawlConfigOps:
 
         return None
 
-    async def stats_recompute_last(self, cid: UUID, size: int, inc_crawls: int = 1):
-        """recompute stats by incrementing size counter and number of crawls"""
+    async def stats_recompute_last(
+        self,
+        cid: UUID,
+        size: int,
+        inc_crawls: int = 1,
+        applied_step: Optional[str] = None,
+    ):
+        """recompute stats by incrementing size counter and number of crawls
+
+        If applied_step is set, only update if step not already applied,
+        marking step as applied in the same update"""
         update_query: dict[str, object] = {
             "lastCrawlId": None,
             "lastCrawlStartTime": None,
@@ -605,20 +614,29 @@ class CrawlConfigOps:
             if last_crawl_finished:
                 update_query["lastRun"] = last_crawl_finished
 
-        result = await self.crawl_configs.find_one_and_update(
-            {"_id": cid, "inactive": {"$ne": True}},
-            {
-                "$set": update_query,
-                "$inc": {
-                    "totalSize": size,
-                    "crawlCount": inc_crawls,
-                    "crawlSuccessfulCount": inc_crawls,
-                },
+        query: dict[str, object] = {"_id": cid, "inactive": {"$ne": True}}
+        update: dict[str, object] = {
+            "$set": update_query,
+            "$inc": {
+                "totalSize": size,
+                "crawlCount": inc_crawls,
+                "crawlSuccessfulCount": inc_crawls,
             },
-        )
+        }
+        if applied_step:
+            query["appliedSteps"] = {"$ne": applied_step}
+            update["$addToSet"] = {"appliedSteps": applied_step}
+
+        result = await self.crawl_configs.find_one_and_update(query, update)
 
         return result is not None
 
+    async def clear_applied_step(self, cid: UUID, applied_step: str):
+        """remove applied step marker, once step can no longer be retried"""
+        await self.crawl_configs.find_one_and_update(
+            {"_id": cid}, {"$pull": {"appliedSteps": applied_step}}
+        )
+
     def _add_curr_crawl_stats(self, crawlconfig, crawl):
         """Add stats from current running crawl, if any"""
         if not crawl:
@@ -3,6 +3,7 @@
 # pylint: disable=too-many-lines
 
 import json
+import os
 import re
 import urllib.parse
 from uuid import UUID
@@ -17,6 +18,7 @@ import pymongo
 from .pagination import DEFAULT_PAGE_SIZE, paginated_format
 from .utils import dt_now, parse_jsonl_error_messages, stream_dict_list_as_csv
 from .basecrawls import BaseCrawlOps
+from .livelogs import LiveLogOps
 from .models import (
     UpdateCrawl,
     DeleteCrawlList,
@@ -26,6 +28,8 @@ from .models import (
     Crawl,
     CrawlOut,
     CrawlOutWithResources,
+    CrawlFile,
+    CrawlLogIndex,
     Organization,
     User,
     PaginatedResponse,
@@ -37,6 +41,9 @@ from .models import (
 MAX_MATCH_SIZE = 500000
 DEFAULT_RANGE_LIMIT = 50
 
+# uncompressed size of log blocks summarized in crawl log index
+LOG_INDEX_BLOCK_SIZE = int(os.environ.get("LOG_INDEX_BLOCK_SIZE") or 1024 * 1024)
+
 
 # ============================================================================
 class CrawlOps(BaseCrawlOps):
@@ -189,14 +196,16 @@ class CrawlOps(BaseCrawlOps):
             cls = CrawlOutWithResources
 
         crawls = []
+        crawls_files = []
         for result in items:
             crawl = cls.from_dict(result)
-            files = result.get("files") if resources else None
-            crawl = await self._resolve_crawl_refs(
-                crawl, org, add_first_seed=False, files=files
-            )
+            crawl = await self._resolve_crawl_refs(crawl, org, add_first_seed=False)
+            if resources:
+                crawls_files.append((crawl, result.get("files")))
             crawls.append(crawl)
 
+        await self._add_crawl_resources(crawls_files, org)
+
         return crawls, total
 
     async def delete_crawls(
@@ -232,6 +241,42 @@ class CrawlOps(BaseCrawlOps):
                 wacz_files.append(file_)
         return wacz_files
 
+    async def build_crawl_log_index(self, crawl_id: str, oid: UUID):
+        """Read logs of all WACZs of finished crawl once, storing summary of
+        each block of log lines, to be used to skip blocks in log queries"""
+        org = await self.orgs.get_org_by_id(oid)
+        wacz_files = await self.get_wacz_files(crawl_id, org)
+
+        members = await self.storage_ops.get_wacz_log_index(
+            org, wacz_files, LOG_INDEX_BLOCK_SIZE
+        )
+
+        log_index = CrawlLogIndex(
+            id=crawl_id,
+            oid=oid,
+            files=[file_.filename for file_ in wacz_files],
+            members=members,
+            blockSize=LOG_INDEX_BLOCK_SIZE,
+        )
+
+        await self.crawl_log_indexes.find_one_and_update(
+            {"_id": crawl_id}, {"$set": log_index.to_dict()}, upsert=True
+        )
+
+    async def get_crawl_log_index(
+        self, crawl_id: str, org: Organization, wacz_files: List[CrawlFile]
+    ) -> Optional[CrawlLogIndex]:
+        """Get crawl log index, if one was built for the crawl's current WACZs"""
+        res = await self.crawl_log_indexes.find_one({"_id": crawl_id, "oid": org.id})
+        log_index = CrawlLogIndex.from_dict(res)
+        if not log_index:
+            return None
+
+        if set(log_index.files) != set(file_.filename for file_ in wacz_files):
+            return None
+
+        return log_index
+
     # pylint: disable=too-many-arguments
     async def add_new_crawl(
         self,
@@ -450,21 +495,57 @@ class CrawlOps(BaseCrawlOps):
             return None, None
         return res.get("state"), res.get("finished")
 
+    async def get_pending_finished_state(self, crawl_id: str) -> Optional[str]:
+        """return final state of finished crawl if post-finish tasks
+        have not yet been enqueued, otherwise None"""
+        res = await self.crawls.find_one(
+            {"_id": crawl_id, "finished": {"$ne": None}, "finishedTasksPending": True},
+            projection=["state"],
+        )
+        return res.get("state") if res else None
+
+    async def clear_finished_tasks_pending(self, crawl_id: str):
+        """mark post-finish tasks as enqueued for crawl"""
+        await self.crawls.find_one_and_update(
+            {"_id": crawl_id}, {"$unset": {"finishedTasksPending": ""}}
+        )
+
     async def add_crawl_error(self, crawl_id: str, error: str):
         """add crawl error from redis to mongodb errors field"""
         await self.crawls.find_one_and_update(
             {"_id": crawl_id}, {"$push": {"errors": error}}
         )
 
-    async def add_crawl_file(self, crawl_id, crawl_file, size):
-        """add new crawl file to crawl"""
+    async def add_crawl_errors(self, crawl_id: str, errors: List[str]):
+        """add multiple crawl errors from redis to mongodb errors field
+        in a single update"""
+        if not errors:
+            return
+
         await self.crawls.find_one_and_update(
-            {"_id": crawl_id},
+            {"_id": crawl_id}, {"$push": {"errors": {"$each": errors}}}
+        )
+
+    async def mark_step_applied(self, crawl_id: str, step: str) -> bool:
+        """mark post-finish step as applied to crawl.
+        Returns False if step was already applied"""
+        res = await self.crawls.find_one_and_update(
+            {"_id": crawl_id, "appliedSteps": {"$ne": step}},
+            {"$addToSet": {"appliedSteps": step}},
+        )
+        return res is not None
+
+    async def add_crawl_file(self, crawl_id, crawl_file, size) -> bool:
+        """add new crawl file to crawl, unless already added.
+        Returns if file was added"""
+        res = await self.crawls.find_one_and_update(
+            {"_id": crawl_id, "files.filename": {"$ne": crawl_file.filename}},
             {
                 "$push": {"files": crawl_file.dict()},
                 "$inc": {"fileCount": 1, "fileSize": size},
             },
         )
+        return res is not None
 
     async def get_crawl_seeds(
         self,
@@ -579,6 +660,7 @@ def init_crawls_api(app, user_dep, *args):
     # pylint: disable=invalid-name, duplicate-code
 
     ops = CrawlOps(*args)
+    live_log_ops = LiveLogOps(ops)
 
     org_viewer_dep = ops.orgs.org_viewer_dep
     org_crawl_dep = ops.orgs.org_crawl_dep
@@ -872,7 +954,12 @@ def init_crawls_api(app, user_dep, *args):
         org: Organization = Depends(org_viewer_dep),
         logLevel: Optional[str] = None,
         context: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
     ):
+        """Stream logs of finished crawl. after may be a timestamp, or the
+        cursor of the last line of a previous page, included in each line
+        when limit is set"""
         crawl = await ops.get_crawl(crawl_id, org, "crawl")
 
         log_levels = []
@@ -885,8 +972,14 @@ def init_crawls_api(app, user_dep, *args):
         # If crawl is finished, stream logs from WACZ files
         if crawl.finished:
             wacz_files = await ops.get_wacz_files(crawl_id, org)
-            resp = await ops.storage_ops.sync_stream_wacz_logs(
-                org, wacz_files, log_levels, contexts
+
+            # use log index, if any, to skip blocks not matching filters
+            log_index = None
+            if log_levels or contexts or after or limit:
+                log_index = await ops.get_crawl_log_index(crawl_id, org, wacz_files)
+
+            resp = ops.storage_ops.stream_wacz_logs(
+                org, wacz_files, log_levels, contexts, after, limit, log_index
             )
             return StreamingResponse(
                 resp,
@@ -898,6 +991,32 @@ def init_crawls_api(app, user_dep, *args):
 
         raise HTTPException(status_code=400, detail="crawl_not_finished")
 
+    @app.get("/orgs/{oid}/crawls/{crawl_id}/logs/live", tags=["crawls"])
+    async def stream_live_crawl_logs(
+        crawl_id,
+        org: Organization = Depends(org_viewer_dep),
+        logLevel: Optional[str] = None,
+        context: Optional[str] = None,
+    ):
+        """Stream new log lines of running crawl as server-sent events.
+
+        Only lines the crawler writes to redis, currently errors, are
+        streamed, and they are sent once drained by the operator, so may be
+        delayed by up to the operator resync interval (OPERATOR_RESYNC_SECS).
+        For full logs, use /logs once crawl is finished"""
+        crawl = await ops.get_crawl(crawl_id, org, "crawl")
+        if crawl.finished:
+            raise HTTPException(status_code=400, detail="crawl_finished")
+
+        log_levels = logLevel.split(",") if logLevel else []
+        contexts = context.split(",") if context else []
+
+        return StreamingResponse(
+            live_log_ops.stream_live_logs(crawl_id, log_levels, contexts),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @app.get(
         "/orgs/{oid}/crawls/{crawl_id}/errors",
         tags=["crawls"],
@@ -12,7 +12,14 @@ from email.mime.multipart import MIMEMultipart
 from fastapi import HTTPException
 from fastapi.templating import Jinja2Templates
 
-from .models import CreateReplicaJob, DeleteReplicaJob, Organization, InvitePending
+from .models import (
+    CreateReplicaJob,
+    DeleteReplicaJob,
+    IngestPagesJob,
+    DeleteFilesJob,
+    Organization,
+    InvitePending,
+)
 from .utils import is_bool
 
 
@@ -160,7 +167,7 @@ class EmailSender:
 
     def send_background_job_failed(
         self,
-        job: Union[CreateReplicaJob, DeleteReplicaJob],
+        job: Union[CreateReplicaJob, DeleteReplicaJob, IngestPagesJob, DeleteFilesJob],
         org: Organization,
         finished: datetime,
         receiver_email: str,
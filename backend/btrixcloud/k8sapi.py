@@ -1,7 +1,9 @@
 """ K8S API Access """
 
 import os
+import time
 import traceback
+from typing import Optional
 
 import yaml
 
@@ -20,6 +22,110 @@ from fastapi.templating import Jinja2Templates
 from .utils import get_templates_dir, dt_now
 
 
+# ============================================================================
+class RedisClientRegistry:
+    """Registry of persistent per-crawl redis clients, each with its own
+    connection pool, reused across operator syncs and api requests"""
+
+    def __init__(self):
+        # seconds a pooled connection may be idle before it is checked
+        # with a PING on next use
+        self.health_check_interval = int(
+            os.environ.get("REDIS_HEALTH_CHECK_SECS") or 30
+        )
+
+        # seconds after which an unused client is closed and removed
+        self.max_idle_secs = int(os.environ.get("REDIS_CLIENT_IDLE_SECS") or 300)
+
+        self.clients: dict[str, tuple[aioredis.Redis, float]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._last_sweep = time.monotonic()
+
+    async def get_client(
+        self, crawl_id: str, redis_url: str, ping=True
+    ) -> Optional[aioredis.Redis]:
+        """return pooled client for crawl, creating a new one if needed.
+        if ping is set, new clients are checked for connectivity first,
+        and None returned if redis is not reachable"""
+        now = time.monotonic()
+        await self._evict_idle(now)
+
+        entry = self.clients.get(crawl_id)
+        if entry:
+            self.hits += 1
+            self.clients[crawl_id] = (entry[0], now)
+            return entry[0]
+
+        self.misses += 1
+
+        redis = aioredis.from_url(
+            redis_url,
+            decode_responses=True,
+            auto_close_connection_pool=True,
+            socket_timeout=20,
+            health_check_interval=self.health_check_interval,
+        )
+
+        if ping:
+            try:
+                await redis.ping()
+            # pylint: disable=bare-except
+            except:
+                await redis.close()
+                return None
+
+        # another task may have added a client for this crawl while pinging
+        if crawl_id in self.clients:
+            await redis.close()
+            return await self.get_client(crawl_id, redis_url, ping)
+
+        self.clients[crawl_id] = (redis, now)
+        return redis
+
+    async def evict(self, crawl_id: str) -> None:
+        """close and remove client for crawl, if any"""
+        entry = self.clients.pop(crawl_id, None)
+        if not entry:
+            return
+
+        self.evictions += 1
+        try:
+            await entry[0].close()
+        # pylint: disable=broad-except
+        except Exception as exc:
+            print(f"Error closing redis client for {crawl_id}: {exc}", flush=True)
+
+    async def close_all(self) -> None:
+        """close all clients, eg. on shutdown"""
+        for crawl_id in list(self.clients.keys()):
+            await self.evict(crawl_id)
+
+    async def _evict_idle(self, now: float) -> None:
+        """evict clients not used for max_idle_secs, checked at most
+        once every health check interval"""
+        if now - self._last_sweep < self.health_check_interval:
+            return
+
+        self._last_sweep = now
+
+        for crawl_id, (_, last_used) in list(self.clients.items()):
+            if now - last_used > self.max_idle_secs:
+                await self.evict(crawl_id)
+
+    def get_stats(self) -> dict[str, int]:
+        """return registry stats"""
+        return {
+            "clients": len(self.clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
 # ============================================================================
 # pylint: disable=too-many-instance-attributes
 class K8sAPI:
@@ -32,6 +138,8 @@ class K8sAPI:
 
         self.templates = Jinja2Templates(directory=get_templates_dir())
 
+        self.redis_clients = RedisClientRegistry()
+
         config.load_incluster_config()
         self.client = client
 
@@ -73,6 +181,17 @@ class K8sAPI:
             socket_timeout=20,
         )
 
+    async def get_crawl_redis(self, crawl_id: str, ping=True):
+        """return persistent pooled redis client for crawl id"""
+        return await self.redis_clients.get_client(
+            crawl_id, self.get_redis_url(crawl_id), ping
+        )
+
+    async def evict_crawl_redis(self, crawl_id: str):
+        """close and remove pooled redis client for crawl, eg. if crawl
+        is finished or client is in a bad state"""
+        await self.redis_clients.evict(crawl_id)
+
     # pylint: disable=too-many-arguments, too-many-locals
     def new_crawl_job_yaml(
         self,
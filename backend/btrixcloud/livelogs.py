@@ -0,0 +1,253 @@
+"""
+Live log tailing for running crawls
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from collections import deque
+from typing import Optional, AsyncGenerator, TYPE_CHECKING
+
+from redis import asyncio as exceptions
+
+if TYPE_CHECKING:
+    from .crawls import CrawlOps
+else:
+    CrawlOps = object
+
+
+# stream, per crawl, of log lines drained from redis by the operator,
+# kept in crawl redis for live viewers
+LIVE_LOGS_KEY = "logs"
+
+# key, per crawl, set while crawl has live viewers, so that operator
+# keeps draining new lines at its regular interval instead of backing off
+LIVE_LOG_VIEWERS_KEY = "logs:viewers"
+
+# viewers key expires if not refreshed, eg. if backend is restarted
+LIVE_LOG_VIEWERS_TTL_SECS = 60
+
+# max lines kept in each crawl's live log stream
+LIVE_LOG_MAX_LINES = int(os.environ.get("LIVE_LOG_MAX_LINES") or 1000)
+
+# lines from end of stream sent to each new viewer
+LIVE_LOG_BACKLOG = 100
+
+# max lines queued per viewer, oldest dropped if viewer falls behind
+VIEWER_QUEUE_SIZE = 1000
+
+# block on XREAD for up to this long, less than redis client socket timeout
+READ_BLOCK_MS = 5000
+
+READ_COUNT = 500
+
+# check if crawl is finished at most this often, while no new lines
+FINISHED_CHECK_SECS = 30
+
+# send keepalive comment to viewers at least this often
+KEEPALIVE_SECS = 15
+
+
+# ============================================================================
+class CrawlLogTail:
+    """single reader of a crawl's live log stream, fanning out new lines
+    to all viewers of the crawl"""
+
+    def __init__(self, crawl_id: str, crawl_ops: CrawlOps, on_done):
+        self.crawl_id = crawl_id
+        self.key = f"{crawl_id}:{LIVE_LOGS_KEY}"
+        self.crawl_ops = crawl_ops
+        self.on_done = on_done
+
+        self.viewers: set[asyncio.Queue] = set()
+        self.backlog: deque[tuple[dict, str]] = deque(maxlen=LIVE_LOG_BACKLOG)
+
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """add viewer queue, starting with most recent lines"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=VIEWER_QUEUE_SIZE)
+        for entry in self.backlog:
+            queue.put_nowait(entry)
+
+        self.viewers.add(queue)
+
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """remove viewer queue, reader stops after last viewer is removed"""
+        self.viewers.discard(queue)
+
+    def publish(self, line: str):
+        """parse line once and send to all viewers"""
+        try:
+            entry = (json.loads(line), line)
+        except json.JSONDecodeError:
+            return
+
+        if not isinstance(entry[0], dict):
+            return
+
+        self.backlog.append(entry)
+        for queue in self.viewers:
+            put_latest(queue, entry)
+
+    async def set_viewers(self, redis, last_set: Optional[float]) -> float:
+        """refresh viewers key for operator, if not set or close to expiring"""
+        if last_set and time.monotonic() - last_set < LIVE_LOG_VIEWERS_TTL_SECS / 2:
+            return last_set
+
+        await redis.set(
+            f"{self.crawl_id}:{LIVE_LOG_VIEWERS_KEY}",
+            len(self.viewers),
+            ex=LIVE_LOG_VIEWERS_TTL_SECS,
+        )
+        return time.monotonic()
+
+    async def run(self):
+        """read new lines from stream until no viewers remain, or crawl
+        is finished or its redis is gone"""
+        last_id = None
+        last_check = time.monotonic()
+        last_viewers_set = None
+
+        try:
+            while self.viewers:
+                async with self.crawl_ops.get_redis(self.crawl_id) as redis:
+                    last_viewers_set = await self.set_viewers(redis, last_viewers_set)
+
+                    if last_id is None:
+                        entries = await redis.xrevrange(
+                            self.key, count=LIVE_LOG_BACKLOG
+                        )
+                        entries.reverse()
+                        last_id = entries[-1][0] if entries else "0-0"
+                    else:
+                        results = await redis.xread(
+                            {self.key: last_id}, count=READ_COUNT, block=READ_BLOCK_MS
+                        )
+                        entries = results[0][1] if results else []
+
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    if fields.get("line"):
+                        self.publish(fields["line"])
+
+                if entries or time.monotonic() - last_check < FINISHED_CHECK_SECS:
+                    continue
+
+                last_check = time.monotonic()
+                _, finished = await self.crawl_ops.get_crawl_state(self.crawl_id)
+                if finished:
+                    break
+
+            if not self.viewers:
+                # new viewers start a new tail, once this one has stopped
+                self.on_done(self)
+
+                # let operator back off again
+                async with self.crawl_ops.get_redis(self.crawl_id) as redis:
+                    await redis.delete(f"{self.crawl_id}:{LIVE_LOG_VIEWERS_KEY}")
+
+        except exceptions.ConnectionError:
+            # redis gone, crawl no longer running
+            pass
+
+        # pylint: disable=broad-except
+        except Exception as exc:
+            print(f"Live log read failed for {self.crawl_id}: {exc}", flush=True)
+
+        finally:
+            for queue in self.viewers:
+                put_latest(queue, None)
+
+            self.on_done(self)
+
+
+# ============================================================================
+def put_latest(queue: asyncio.Queue, entry):
+    """add to queue, dropping oldest entry if full"""
+    if queue.full():
+        queue.get_nowait()
+
+    queue.put_nowait(entry)
+
+
+# ============================================================================
+# pylint: disable=too-few-public-methods
+class LiveLogOps:
+    """live log viewers for running crawls, sharing one reader per crawl"""
+
+    def __init__(self, crawl_ops: CrawlOps):
+        self.crawl_ops = crawl_ops
+        self.tails: dict[str, CrawlLogTail] = {}
+
+        # tasks of tails no longer accepting viewers, that are still stopping
+        self.stopping: dict[str, asyncio.Task] = {}
+
+    def _remove_tail(self, tail: CrawlLogTail):
+        if self.tails.get(tail.crawl_id) is not tail:
+            return
+
+        del self.tails[tail.crawl_id]
+
+        task = tail.task
+        if task and not task.done():
+            self.stopping[tail.crawl_id] = task
+            task.add_done_callback(lambda _: self._remove_stopping(tail.crawl_id, task))
+
+    def _remove_stopping(self, crawl_id: str, task: asyncio.Task):
+        if self.stopping.get(crawl_id) is task:
+            del self.stopping[crawl_id]
+
+    async def _get_tail(self, crawl_id: str) -> CrawlLogTail:
+        """get tail for crawl, starting a new one once any previous tail has
+        stopped, so that it doesn't clear the viewers key after new tail sets it"""
+        while crawl_id not in self.tails:
+            stopping = self.stopping.get(crawl_id)
+            if stopping and not stopping.done():
+                await asyncio.wait([stopping])
+                continue
+
+            self.tails[crawl_id] = CrawlLogTail(
+                crawl_id, self.crawl_ops, self._remove_tail
+            )
+
+        return self.tails[crawl_id]
+
+    async def stream_live_logs(
+        self, crawl_id: str, log_levels: list[str], contexts: list[str]
+    ) -> AsyncGenerator[str, None]:
+        """stream new log lines matching filters as server-sent events,
+        until crawl is finished"""
+        tail = await self._get_tail(crawl_id)
+        queue = tail.subscribe()
+
+        try:
+            while True:
+                try:
+                    entry = await asyncio.wait_for(queue.get(), KEEPALIVE_SECS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if entry is None:
+                    break
+
+                json_line, line = entry
+                if log_levels and json_line.get("logLevel") not in log_levels:
+                    continue
+                if contexts and json_line.get("context") not in contexts:
+                    continue
+
+                yield f"data: {line.strip()}\n\n"
+
+            yield "event: end\ndata: \n\n"
+
+        finally:
+            tail.unsubscribe(queue)
@@ -177,6 +177,10 @@ def main():
 
     app.include_router(org_ops.router)
 
+    @app_root.on_event("shutdown")
+    async def shutdown():
+        await storage_ops.close()
+
     @app.get("/settings")
     async def get_settings():
         if not db_inited.get("inited"):
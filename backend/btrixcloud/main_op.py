@@ -96,6 +96,7 @@ def main():
 
     return init_operator_api(
         app_root,
+        mdb,
         crawl_config_ops,
         crawl_ops,
         org_ops,
@@ -112,5 +113,6 @@ def main():
 async def startup():
     """init on startup"""
     register_exit_handler()
-    settings = main()
-    await settings.async_init()
+    k8s, outbox = main()
+    await k8s.async_init()
+    await outbox.start()
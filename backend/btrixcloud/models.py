@@ -5,6 +5,7 @@ Crawl-related models and types
 from datetime import datetime
 from enum import Enum, IntEnum
 from uuid import UUID
+import math
 import os
 
 from typing import Optional, List, Dict, Union, Literal, Any
@@ -498,6 +499,33 @@ class BaseFile(BaseModel):
     replicas: Optional[List[StorageRef]] = []
 
 
+# ============================================================================
+class ZipEntry(BaseModel):
+    """location of member in a zip file, from central directory"""
+
+    name: str
+    offset: int
+    compressSize: int
+    size: int
+    method: int = 0
+
+
+# ============================================================================
+class ZipIndex(BaseModel):
+    """parsed central directory of a zip (WACZ) file"""
+
+    cdStart: int
+    entries: List[ZipEntry] = []
+
+    def get_member_end(self, entry: ZipEntry) -> int:
+        """end of member data (incl. any data descriptor): start of next member
+        or of the central directory"""
+        return min(
+            (other.offset for other in self.entries if other.offset > entry.offset),
+            default=self.cdStart,
+        )
+
+
 # ============================================================================
 class CrawlFile(BaseFile):
     """file from a crawl"""
@@ -506,6 +534,8 @@ class CrawlFile(BaseFile):
     expireAt: Optional[datetime]
     crc32: int = 0
 
+    zipIndex: Optional[ZipIndex] = None
+
 
 # ============================================================================
 class CrawlFileOut(BaseModel):
@@ -693,6 +723,70 @@ class CrawlCompleteIn(BaseModel):
     completed: Optional[bool] = True
 
 
+# ============================================================================
+class CrawlLogBlock(BaseModel):
+    """summary of a block of whole lines in a crawl log"""
+
+    # uncompressed offset and length of block in log file
+    offset: int
+    length: int
+    lines: int
+
+    # first and last timestamp in block
+    start: str = ""
+    end: str = ""
+
+    logLevels: List[str] = []
+    contexts: List[str] = []
+
+    def matches(
+        self,
+        log_levels: List[str],
+        contexts: List[str],
+        after: Optional[str],
+        include_after: bool = False,
+    ) -> bool:
+        """return true if block may contain lines matching filters,
+        with timestamps after (or, if include_after, also at) after"""
+        if log_levels and not set(log_levels).intersection(self.logLevels):
+            return False
+        if contexts and not set(contexts).intersection(self.contexts):
+            return False
+        if after and (self.end < after if include_after else self.end <= after):
+            return False
+        return True
+
+
+# ============================================================================
+class CrawlLogMember(BaseModel):
+    """blocks of a log file in a WACZ"""
+
+    filename: str
+    name: str
+
+    blocks: List[CrawlLogBlock] = []
+
+
+# ============================================================================
+class CrawlLogIndex(BaseMongoModel):
+    """index of log blocks for all WACZs of a crawl"""
+
+    id: str
+    oid: UUID
+
+    files: List[str] = []
+    members: List[CrawlLogMember] = []
+
+    blockSize: int
+
+    def get_member(self, filename: str, name: str) -> Optional[CrawlLogMember]:
+        """get indexed log member"""
+        for member in self.members:
+            if member.filename == filename and member.name == name:
+                return member
+        return None
+
+
 # ============================================================================
 
 ### UPLOADED CRAWLS ###
@@ -1009,6 +1103,53 @@ class Organization(BaseMongoModel):
         return OrgOut.from_dict(result)
 
 
+# ============================================================================
+class OrgQuotaSnapshot(BaseMongoModel):
+    """Quota-related fields of an Organization, loaded with a projection,
+    used to make all quota decisions from a single read"""
+
+    id: UUID
+
+    # month that monthlyExecSeconds was loaded for, as YYYY-MM
+    yymm: str = ""
+
+    bytesStored: int = 0
+    monthlyExecSeconds: Dict[str, int] = {}
+    extraExecSecondsAvailable: int = 0
+    giftedExecSecondsAvailable: int = 0
+
+    quotas: Optional[OrgQuotas] = OrgQuotas()
+
+    def get_monthly_exec_seconds(self) -> int:
+        """return monthly execution seconds used in current month"""
+        return self.monthlyExecSeconds.get(self.yymm, 0)
+
+    def storage_quota_reached(self) -> bool:
+        """Return boolean indicating if storage quota is met or exceeded."""
+        quota = self.quotas.storageQuota if self.quotas else 0
+        if not quota:
+            return False
+
+        return self.bytesStored >= quota
+
+    def exec_mins_quota_reached(self, include_extra: bool = True) -> bool:
+        """Return bool for if execution minutes quota is reached"""
+        if include_extra:
+            if self.giftedExecSecondsAvailable:
+                return False
+
+            if self.extraExecSecondsAvailable:
+                return False
+
+        monthly_quota = self.quotas.maxExecMinutesPerMonth if self.quotas else 0
+        if monthly_quota:
+            monthly_exec_minutes = math.floor(self.get_monthly_exec_seconds() / 60)
+            if monthly_exec_minutes >= monthly_quota:
+                return True
+
+        return False
+
+
 # ============================================================================
 class OrgMetrics(BaseModel):
     """Organization API metrics model"""
@@ -1323,6 +1464,8 @@ class BgJobType(str, Enum):
 
     CREATE_REPLICA = "create-replica"
     DELETE_REPLICA = "delete-replica"
+    INGEST_PAGES = "ingest-pages"
+    DELETE_FILES = "delete-files"
 
 
 # ============================================================================
@@ -1361,11 +1504,56 @@ class DeleteReplicaJob(BackgroundJob):
     replica_storage: StorageRef
 
 
+# ============================================================================
+class IngestPagesJob(BackgroundJob):
+    """Model for tracking ingest of pages from uploaded WACZ files,
+    with position in files to resume from"""
+
+    type: Literal[BgJobType.INGEST_PAGES] = BgJobType.INGEST_PAGES
+    object_type: str = "upload"
+    object_id: str
+
+    filesDone: int = 0
+    membersDone: int = 0
+    recordsDone: int = 0
+
+    pagesAdded: int = 0
+
+
+# ============================================================================
+class DeleteFileError(BaseModel):
+    """File that could not be deleted from storage"""
+
+    filename: str
+    storage: StorageRef
+    error: str
+
+
+# ============================================================================
+class DeleteFilesJob(BackgroundJob):
+    """Model for tracking bulk deletion of files of deleted crawls or
+    uploads from storage"""
+
+    type: Literal[BgJobType.DELETE_FILES] = BgJobType.DELETE_FILES
+    object_type: str
+    object_ids: List[str]
+    files: List[BaseFile]
+
+    filesDone: int = 0
+    errors: List[DeleteFileError] = []
+
+
 # ============================================================================
 class AnyJob(BaseModel):
     """Union of all job types, for response model"""
 
-    __root__: Union[CreateReplicaJob, DeleteReplicaJob, BackgroundJob]
+    __root__: Union[
+        CreateReplicaJob,
+        DeleteReplicaJob,
+        IngestPagesJob,
+        DeleteFilesJob,
+        BackgroundJob,
+    ]
 
 
 # ============================================================================
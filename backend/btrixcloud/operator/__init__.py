@@ -5,24 +5,38 @@ from .bgjobs import BgJobOperator
 from .cronjobs import CronJobOperator
 from .crawls import CrawlOperator
 from .baseoperator import K8sOpAPI
+from .metrics import init_metrics_api
+from .outbox import OperatorOutbox
 
 operator_classes = [ProfileOperator, BgJobOperator, CronJobOperator, CrawlOperator]
 
 
 # ============================================================================
-def init_operator_api(app, *args):
+def init_operator_api(app, mdb, *args):
     """registers webhook handlers for metacontroller"""
 
     k8s = K8sOpAPI()
 
+    outbox = OperatorOutbox(mdb)
+
     operators = []
     for cls in operator_classes:
         oper = cls(k8s, *args)
         oper.init_routes(app)
+        oper.init_outbox(outbox)
         operators.append(oper)
 
     @app.get("/healthz", include_in_schema=False)
     async def healthz():
         return {}
 
-    return k8s
+    storage_ops = operators[0].storage_ops
+
+    init_metrics_api(app, k8s, outbox, storage_ops)
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await outbox.stop()
+        await storage_ops.close()
+
+    return k8s, outbox
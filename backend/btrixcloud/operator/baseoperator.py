@@ -7,6 +7,8 @@ from kubernetes.utils import parse_quantity
 import yaml
 from btrixcloud.k8sapi import K8sAPI
 
+from .metrics import observe_phase, observe_sync
+
 
 if TYPE_CHECKING:
     from btrixcloud.crawlconfigs import CrawlConfigOps
@@ -74,6 +76,9 @@ class K8sOpAPI(K8sAPI):
 class BaseOperator:
     """BaseOperator"""
 
+    # operator name, used as metrics label
+    name = "base"
+
     k8s: K8sOpAPI
     crawl_config_ops: CrawlConfigOps
     crawl_ops: CrawlOps
@@ -116,6 +121,17 @@ class BaseOperator:
     def init_routes(self, app):
         """init routes for this operator"""
 
+    def init_outbox(self, outbox):
+        """register handlers for durable tasks run by this operator"""
+
+    async def observe_sync(self, hook, coro):
+        """await hook handler, recording duration and errors in metrics"""
+        return await observe_sync(self.name, hook, coro)
+
+    def observe_phase(self, phase):
+        """context manager to record duration of sync phase in metrics"""
+        return observe_phase(self.name, phase)
+
     def run_task(self, func):
         """add bg tasks to set to avoid premature garbage collection"""
         task = asyncio.create_task(func)
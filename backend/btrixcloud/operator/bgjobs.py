@@ -16,6 +16,12 @@ from .baseoperator import BaseOperator
 class BgJobOperator(BaseOperator):
     """BgJobOperator"""
 
+    name = "bgjobs"
+
+    def init_outbox(self, outbox):
+        """run page ingest and file deletion jobs from outbox"""
+        self.background_job_ops.init_outbox(outbox)
+
     def init_routes(self, app):
         """init routes for this operator"""
 
@@ -26,7 +32,9 @@ class BgJobOperator(BaseOperator):
 
         @app.post("/op/backgroundjob/finalize")
         async def mc_finalize_background_jobs(data: MCDecoratorSyncData):
-            return await self.finalize_background_job(data)
+            return await self.observe_sync(
+                "finalize", self.finalize_background_job(data)
+            )
 
     async def finalize_background_job(self, data: MCDecoratorSyncData) -> dict:
         """handle finished background job"""
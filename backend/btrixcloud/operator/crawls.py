@@ -2,6 +2,7 @@
 
 import traceback
 import os
+import time
 from pprint import pprint
 from typing import Optional
 
@@ -32,10 +33,19 @@ from btrixcloud.utils import (
     dt_now,
 )
 
+from btrixcloud.livelogs import (
+    LIVE_LOGS_KEY,
+    LIVE_LOG_MAX_LINES,
+    LIVE_LOG_VIEWERS_KEY,
+)
+
 from .baseoperator import BaseOperator, Redis
+from .metrics import DRAINED_ITEMS, SYNC_ERRORS
+from .outbox import OperatorOutbox
 from .models import (
     CrawlSpec,
     CrawlStatus,
+    RedisCrawlSnapshot,
     MCBaseRequest,
     MCSyncData,
     POD,
@@ -59,13 +69,28 @@ STARTING_TIME_SECS = 60
 # how often to update execution time seconds
 EXEC_TIME_UPDATE_SECS = 60
 
+# max number of entries read from each redis list in a single round-trip
+DRAIN_BATCH_SIZE = 1000
+
+# how long an org's admission index is reused across syncs of its crawls
+ADMISSION_INDEX_SECS = 5
+
+# states in which crawl resyncs back off until pods change
+WAITING_STATES = ("waiting_capacity", "waiting_org_limit")
+
+# outbox task type for post-finish crawl tasks
+CRAWL_FINISHED_TASK = "crawl_finished"
+
 
 # pylint: disable=too-many-public-methods, too-many-locals, too-many-branches, too-many-statements
 # pylint: disable=invalid-name, too-many-lines, too-many-return-statements
+# pylint: disable=too-many-instance-attributes
 # ============================================================================
 class CrawlOperator(BaseOperator):
     """CrawlOperator Handler"""
 
+    name = "crawls"
+
     def __init__(self, *args):
         super().__init__(*args)
 
@@ -75,19 +100,38 @@ class CrawlOperator(BaseOperator):
 
         self.fast_retry_secs = int(os.environ.get("FAST_RETRY_SECS") or 0)
 
+        # resync interval for active crawls, and max interval for waiting
+        # or idle crawls, which back off exponentially up to this interval
+        self.resync_secs = int(os.environ.get("OPERATOR_RESYNC_SECS") or 10)
+        self.max_resync_secs = int(os.environ.get("OPERATOR_MAX_RESYNC_SECS") or 60)
+
         self.log_failed_crawl_lines = int(os.environ.get("LOG_FAILED_CRAWL_LINES") or 0)
 
+        self.max_drain_per_sync = int(
+            os.environ.get("OPERATOR_MAX_DRAIN_PER_SYNC") or 10000
+        )
+
+        # oid -> (time computed, num related crawljobs, crawl job name -> slot)
+        self.admission_index: dict[str, tuple[float, int, dict[str, int]]] = {}
+
+        self.outbox: Optional[OperatorOutbox] = None
+
+    def init_outbox(self, outbox):
+        """run post-finish crawl tasks from outbox"""
+        self.outbox = outbox
+        outbox.register(CRAWL_FINISHED_TASK, self.do_crawl_finished_step)
+
     def init_routes(self, app):
         """init routes for this operator"""
 
         @app.post("/op/crawls/sync")
         async def mc_sync_crawls(data: MCSyncData):
-            return await self.sync_crawls(data)
+            return await self.observe_sync("sync", self.sync_crawls(data))
 
         # reuse sync path, but distinct endpoint for better logging
         @app.post("/op/crawls/finalize")
         async def mc_sync_finalize(data: MCSyncData):
-            return await self.sync_crawls(data)
+            return await self.observe_sync("finalize", self.sync_crawls(data))
 
         @app.post("/op/crawls/customize")
         async def mc_related(data: MCBaseRequest):
@@ -96,7 +140,8 @@ class CrawlOperator(BaseOperator):
     async def sync_crawls(self, data: MCSyncData):
         """sync crawls"""
 
-        status = CrawlStatus(**data.parent.get("status", {}))
+        with self.observe_phase("status_parse"):
+            status = CrawlStatus(**data.parent.get("status", {}))
 
         spec = data.parent.get("spec", {})
         crawl_id = spec["id"]
@@ -135,7 +180,7 @@ class CrawlOperator(BaseOperator):
             )
 
         # just in case, finished but not deleted, can only get here if
-        # do_crawl_finished_tasks() doesn't reach the end or taking too long
+        # post-finish tasks in the outbox are failing or taking too long
         if status.finished:
             print(
                 f"warn crawl {crawl_id} finished but not deleted, post-finish taking too long?"
@@ -177,7 +222,7 @@ class CrawlOperator(BaseOperator):
         # just in case, handle canceled-but-not-finalizing here
         if status.state == "canceled":
             await self.k8s.delete_crawl_job(crawl.id)
-            return {"status": status.dict(exclude_none=True), "children": []}
+            return self._empty_response(status)
 
         # first, check storage quota, and fail immediately if quota reached
         if status.state in ("starting", "skipped_quota_reached"):
@@ -202,11 +247,11 @@ class CrawlOperator(BaseOperator):
             )
 
         if len(pods):
-            for pod_name, pod in pods.items():
-                self.sync_resources(status, pod_name, pod, data.children)
+            with self.observe_phase("pod_resources"):
+                for pod_name, pod in pods.items():
+                    self.sync_resources(status, pod_name, pod, data.children)
 
             status = await self.sync_crawl_state(
-                redis_url,
                 crawl,
                 status,
                 pods,
@@ -234,47 +279,52 @@ class CrawlOperator(BaseOperator):
             status.scale = crawl.scale
             status.lastUpdatedTime = to_k8s_date(dt_now())
 
-        children = self._load_redis(params, status, data.children)
+        with self.observe_phase("render_children"):
+            children = self._load_redis(params, status, data.children)
 
-        storage_path = crawl.storage.get_storage_extra_path(oid)
-        storage_secret = crawl.storage.get_storage_secret_name(oid)
+            storage_path = crawl.storage.get_storage_extra_path(oid)
+            storage_secret = crawl.storage.get_storage_secret_name(oid)
 
-        params["storage_path"] = storage_path
-        params["storage_secret"] = storage_secret
-        params["profile_filename"] = configmap["PROFILE_FILENAME"]
+            params["storage_path"] = storage_path
+            params["storage_secret"] = storage_secret
+            params["profile_filename"] = configmap["PROFILE_FILENAME"]
 
-        # only resolve if not already set
-        # not automatically updating image for existing crawls
-        if not status.crawlerImage:
-            status.crawlerImage = self.crawl_config_ops.get_channel_crawler_image(
-                crawl.crawler_channel
-            )
+            # only resolve if not already set
+            # not automatically updating image for existing crawls
+            if not status.crawlerImage:
+                status.crawlerImage = self.crawl_config_ops.get_channel_crawler_image(
+                    crawl.crawler_channel
+                )
 
-        params["crawler_image"] = status.crawlerImage
+            params["crawler_image"] = status.crawlerImage
 
-        params["storage_filename"] = configmap["STORE_FILENAME"]
-        params["restart_time"] = spec.get("restartTime")
+            params["storage_filename"] = configmap["STORE_FILENAME"]
+            params["restart_time"] = spec.get("restartTime")
 
-        params["warc_prefix"] = spec.get("warcPrefix")
+            params["warc_prefix"] = spec.get("warcPrefix")
 
-        params["redis_url"] = redis_url
+            params["redis_url"] = redis_url
 
-        if spec.get("restartTime") != status.restartTime:
-            # pylint: disable=invalid-name
-            status.restartTime = spec.get("restartTime")
-            status.resync_after = self.fast_retry_secs
-            params["force_restart"] = True
-        else:
-            params["force_restart"] = False
+            if spec.get("restartTime") != status.restartTime:
+                # pylint: disable=invalid-name
+                status.restartTime = spec.get("restartTime")
+                status.resync_after = self.fast_retry_secs
+                params["force_restart"] = True
+            else:
+                params["force_restart"] = False
 
-        for i in range(0, status.scale):
-            children.extend(self._load_crawler(params, i, status, data.children))
+            for i in range(0, status.scale):
+                children.extend(self._load_crawler(params, i, status, data.children))
 
-        return {
-            "status": status.dict(exclude_none=True),
-            "children": children,
-            "resyncAfterSeconds": status.resync_after,
-        }
+            resync_after = self.get_resync_after(status, crawl)
+
+            response = {
+                "status": status.dict(exclude_none=True),
+                "children": children,
+                "resyncAfterSeconds": resync_after,
+            }
+
+        return response
 
     def _load_redis(self, params, status, children):
         name = f"redis-{params['id']}"
@@ -474,30 +524,50 @@ class CrawlOperator(BaseOperator):
 
         name = data.parent.get("metadata", {}).get("name")
 
-        # def metadata_key(val):
-        #    return val.get("metadata").get("creationTimestamp")
+        slot = self.get_org_admission_index(crawl.oid, data.related[CJS]).get(name)
+        if slot is not None and slot < max_crawls:
+            return True
 
-        # all_crawljobs = sorted(data.related[CJS].values(), key=metadata_key)
-        # print(list(data.related[CJS].keys()))
+        await self.set_state(
+            "waiting_org_limit", status, crawl.id, allowed_from=["starting"]
+        )
+        return False
 
-        i = 0
-        for crawl_sorted in data.related[CJS].values():
-            if crawl_sorted.get("status", {}).get("state") in NON_RUNNING_STATES:
+    def get_org_admission_index(
+        self, oid: UUID, crawljobs: dict[str, dict]
+    ) -> dict[str, int]:
+        """return mapping of active crawl job name -> admission slot for org,
+        ordered by creation time. Computed once and reused for all crawls
+        of the org synced within ADMISSION_INDEX_SECS, unless the number of
+        crawl jobs changes or a crawl of the org finishes"""
+        now = time.monotonic()
+        key = str(oid)
+
+        cached = self.admission_index.get(key)
+        if cached:
+            computed, count, index = cached
+            if count == len(crawljobs) and now - computed < ADMISSION_INDEX_SECS:
+                return index
+
+        active = []
+        for crawljob in crawljobs.values():
+            if crawljob.get("status", {}).get("state") in NON_RUNNING_STATES:
                 continue
 
-            # print(i, crawl_sorted.get("metadata").get("name"))
-            if crawl_sorted.get("metadata").get("name") == name:
-                # print("found: ", name, "index", i)
-                if i < max_crawls:
-                    return True
+            metadata = crawljob.get("metadata", {})
+            active.append((metadata.get("creationTimestamp", ""), metadata.get("name")))
 
-                break
-            i += 1
+        active.sort()
 
-        await self.set_state(
-            "waiting_org_limit", status, crawl.id, allowed_from=["starting"]
-        )
-        return False
+        index = {name: i for i, (_, name) in enumerate(active)}
+
+        # remove expired entries for other orgs
+        for other in list(self.admission_index.keys()):
+            if now - self.admission_index[other][0] >= ADMISSION_INDEX_SECS:
+                del self.admission_index[other]
+
+        self.admission_index[key] = (now, len(crawljobs), index)
+        return index
 
     async def cancel_crawl(
         self,
@@ -566,11 +636,59 @@ class CrawlOperator(BaseOperator):
 
     def _empty_response(self, status):
         """done response for removing crawl"""
+        resync_after = self.get_resync_after(status)
         return {
             "status": status.dict(exclude_none=True),
             "children": [],
+            "resyncAfterSeconds": resync_after,
         }
 
+    def get_resync_after(
+        self, status: CrawlStatus, crawl: Optional[CrawlSpec] = None
+    ) -> int:
+        """get adaptive resync interval: resync sooner if more data is pending
+        in redis or crawl is close to its time or size limit, and back off
+        exponentially while crawl is waiting or has nothing new in redis.
+
+        Changes to crawl pods always trigger an immediate resync,
+        so backing off doesn't delay noticing pods starting or exiting"""
+        if status.resync_after:
+            status.idleSyncs = 0
+            return status.resync_after
+
+        if status.state in WAITING_STATES or (
+            status.state == "running"
+            and status.drained == 0
+            and not status.stopping
+            and not status.liveLogViewers
+        ):
+            resync_after = self.resync_secs * 2**status.idleSyncs
+            if resync_after < self.max_resync_secs:
+                status.idleSyncs += 1
+            else:
+                resync_after = self.max_resync_secs
+        else:
+            status.idleSyncs = 0
+            resync_after = self.resync_secs
+
+        if not crawl or status.state not in RUNNING_STATES or status.stopping:
+            return resync_after
+
+        # check time limit soon after it is reached
+        if crawl.timeout and status.lastUpdatedTime:
+            elapsed = (
+                status.elapsedCrawlTime
+                + (dt_now() - from_k8s_date(status.lastUpdatedTime)).total_seconds()
+            )
+            remaining = int(crawl.timeout - elapsed) + 1
+            resync_after = min(resync_after, max(remaining, self.fast_retry_secs, 1))
+
+        # don't back off when close to size limit
+        if crawl.max_crawl_size and status.size > crawl.max_crawl_size * 0.9:
+            resync_after = min(resync_after, self.resync_secs)
+
+        return resync_after
+
     async def finalize_response(
         self,
         crawl_id: str,
@@ -582,6 +700,11 @@ class CrawlOperator(BaseOperator):
     ):
         """ensure crawl id ready for deletion"""
 
+        if status.finished and not status.finishedTasksQueued:
+            await self.requeue_crawl_finished_tasks(
+                crawl_id, UUID(spec["cid"]), oid, status
+            )
+
         redis_pod = f"redis-{crawl_id}"
         new_children = []
 
@@ -595,6 +718,10 @@ class CrawlOperator(BaseOperator):
                 new_children = self._load_redis(params, status, children)
                 await self.increment_pod_exec_time(pods, status, crawl_id, oid)
 
+        # redis no longer needed by operator once finalizing
+        if not new_children:
+            await self.k8s.evict_crawl_redis(crawl_id)
+
         # keep pvs until pods are removed
         if new_children:
             new_children.extend(list(children[PVC].values()))
@@ -614,27 +741,15 @@ class CrawlOperator(BaseOperator):
             "status": status.dict(exclude_none=True),
             "children": new_children,
             "finalized": finalized,
+            "resyncAfterSeconds": self.resync_secs,
         }
 
-    async def _get_redis(self, redis_url: str) -> Optional[Redis]:
-        """init redis, ensure connectivity"""
-        redis = None
-        try:
-            redis = await self.k8s.get_redis_client(redis_url)
-            # test connection
-            await redis.ping()
-            return redis
-
-        # pylint: disable=bare-except
-        except:
-            if redis:
-                await redis.close()
-
-            return None
+    async def _get_redis(self, crawl_id: str) -> Optional[Redis]:
+        """get pooled redis client for crawl, ensure connectivity"""
+        return await self.k8s.get_crawl_redis(crawl_id)
 
     async def sync_crawl_state(
         self,
-        redis_url: str,
         crawl: CrawlSpec,
         status: CrawlStatus,
         pods: dict[str, dict],
@@ -642,20 +757,24 @@ class CrawlOperator(BaseOperator):
     ):
         """sync crawl state for running crawl"""
         # check if at least one crawler pod started running
-        crawler_running, redis_running, done = self.sync_pod_status(pods, status)
+        with self.observe_phase("pod_sync"):
+            crawler_running, redis_running, done = self.sync_pod_status(pods, status)
         redis = None
 
         try:
             if redis_running:
-                redis = await self._get_redis(redis_url)
-
-            await self.add_used_stats(crawl.id, status.podStatus, redis, metrics)
+                redis = await self._get_redis(crawl.id)
+            else:
+                await self.k8s.evict_crawl_redis(crawl.id)
 
             # skip if no newly exited pods
             if status.anyCrawlPodNewExit:
                 await self.log_crashes(crawl.id, status.podStatus, redis)
 
             if not crawler_running or not redis:
+                redis_info = await self.get_redis_info(redis) if redis else None
+                self.add_used_stats(crawl.id, status.podStatus, redis_info, metrics)
+
                 # if either crawler is not running or redis is inaccessible
                 if self.should_mark_waiting(status.state, crawl.started):
                     # mark as waiting (if already running)
@@ -684,8 +803,10 @@ class CrawlOperator(BaseOperator):
                     status.initRedis = True
                     status.lastActiveTime = to_k8s_date(dt_now())
 
-                # if no crawler / no redis, resync after N seconds
-                status.resync_after = self.fast_retry_secs
+                # if no crawler / no redis, resync after N seconds,
+                # unless waiting for capacity, backing off until pods change
+                if status.state not in WAITING_STATES:
+                    status.resync_after = self.fast_retry_secs
                 return status
 
             # set state to running (if not already)
@@ -703,44 +824,126 @@ class CrawlOperator(BaseOperator):
                         )
                     )
 
-            file_done = await redis.lpop(self.done_key)
-            while file_done:
-                msg = json.loads(file_done)
-                # add completed file
-                if msg.get("filename"):
-                    await self.add_file_to_crawl(msg, crawl, redis)
-                    await redis.incr("filesAdded")
-
-                # get next file done
-                file_done = await redis.lpop(self.done_key)
+            drained_all, status.drained = await self.drain_redis_lists(redis, crawl)
+            if not drained_all:
+                # more data left in redis, resync sooner to continue draining
+                status.resync_after = self.fast_retry_secs
 
-            page_crawled = await redis.lpop(f"{crawl.id}:{self.pages_key}")
-            while page_crawled:
-                page_dict = json.loads(page_crawled)
-                await self.page_ops.add_page_to_db(page_dict, crawl.id, crawl.oid)
-                page_crawled = await redis.lpop(f"{crawl.id}:{self.pages_key}")
+            with self.observe_phase("redis_stats"):
+                snapshot = await self.get_redis_crawl_snapshot(redis, crawl.id)
 
-            crawl_error = await redis.lpop(f"{crawl.id}:{self.errors_key}")
-            while crawl_error:
-                await self.crawl_ops.add_crawl_error(crawl.id, crawl_error)
-                crawl_error = await redis.lpop(f"{crawl.id}:{self.errors_key}")
+            self.add_used_stats(crawl.id, status.podStatus, snapshot.info, metrics)
 
             # ensure filesAdded and filesAddedSize always set
-            status.filesAdded = int(await redis.get("filesAdded") or 0)
-            status.filesAddedSize = int(await redis.get("filesAddedSize") or 0)
+            status.filesAdded = snapshot.filesAdded
+            status.filesAddedSize = snapshot.filesAddedSize
+            status.liveLogViewers = snapshot.liveLogViewers
 
             # update stats and get status
-            return await self.update_crawl_state(redis, crawl, status, pods, done)
+            with self.observe_phase("state_update"):
+                return await self.update_crawl_state(
+                    redis, snapshot, crawl, status, pods, done
+                )
 
         # pylint: disable=broad-except
         except Exception as exc:
             traceback.print_exc()
             print(f"Crawl get failed: {exc}, will try again")
+            SYNC_ERRORS.labels(self.name, "sync_crawl_state").inc()
+            # reconnect on next sync in case the client is in a bad state
+            await self.k8s.evict_crawl_redis(crawl.id)
             return status
 
-        finally:
-            if redis:
-                await redis.close()
+    async def drain_redis_lists(
+        self, redis: Redis, crawl: CrawlSpec
+    ) -> tuple[bool, int]:
+        """drain completed files, pages and errors from redis in batches,
+        reading up to DRAIN_BATCH_SIZE entries from each list per round-trip,
+        and up to max_drain_per_sync entries per list in total.
+
+        Entries are only removed from redis once written to the db, so if
+        a write fails, remaining entries are drained again on next sync.
+
+        Returns if all lists have been fully drained, and num entries drained"""
+        files_key = self.done_key
+        pages_key = f"{crawl.id}:{self.pages_key}"
+        errors_key = f"{crawl.id}:{self.errors_key}"
+
+        total = 0
+        drained = 0
+        while True:
+            with self.observe_phase("redis_drain"):
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key in (files_key, pages_key, errors_key):
+                        pipe.lrange(key, 0, DRAIN_BATCH_SIZE - 1)
+
+                    results = await pipe.execute()
+
+            files_done, pages_crawled, crawl_errors = results
+
+            with self.observe_phase("db_writes"):
+                # files removed one at a time, as each is added
+                for file_done in files_done:
+                    msg = self.parse_drained_entry(file_done)
+                    # add completed file
+                    if msg and msg.get("filename"):
+                        if await self.add_file_to_crawl(msg, crawl, redis):
+                            await redis.incr("filesAdded")
+
+                    await redis.ltrim(files_key, 1, -1)
+                    DRAINED_ITEMS.labels("files").inc()
+                    drained += 1
+
+                if pages_crawled:
+                    pages = [self.parse_drained_entry(page) for page in pages_crawled]
+                    await self.page_ops.add_pages_to_db(
+                        [page for page in pages if page],
+                        crawl.id,
+                        crawl.oid,
+                        raise_errors=True,
+                    )
+                    await redis.ltrim(pages_key, len(pages_crawled), -1)
+                    DRAINED_ITEMS.labels("pages").inc(len(pages_crawled))
+                    drained += len(pages_crawled)
+
+                if crawl_errors:
+                    await self.crawl_ops.add_crawl_errors(crawl.id, crawl_errors)
+                    await redis.ltrim(errors_key, len(crawl_errors), -1)
+                    DRAINED_ITEMS.labels("errors").inc(len(crawl_errors))
+                    drained += len(crawl_errors)
+
+                    await self.add_live_log_lines(redis, crawl, crawl_errors)
+
+            total += DRAIN_BATCH_SIZE
+
+            # if no list returned a full batch, all lists are drained
+            if all(len(entries) < DRAIN_BATCH_SIZE for entries in results):
+                return True, drained
+
+            if total >= self.max_drain_per_sync:
+                return False, drained
+
+    def parse_drained_entry(self, entry: str) -> Optional[dict]:
+        """parse JSON entry from redis, skipping invalid entries so they
+        are not drained again"""
+        try:
+            return json.loads(entry)
+        except json.JSONDecodeError:
+            print(f"Skipping invalid entry from redis: {entry[:100]}", flush=True)
+            return None
+
+    async def add_live_log_lines(self, redis: Redis, crawl: CrawlSpec, lines):
+        """add drained log lines to capped stream read by live log viewers"""
+        async with redis.pipeline(transaction=False) as pipe:
+            for line in lines:
+                pipe.xadd(
+                    f"{crawl.id}:{LIVE_LOGS_KEY}",
+                    {"line": line},
+                    maxlen=LIVE_LOG_MAX_LINES,
+                    approximate=True,
+                )
+
+            await pipe.execute()
 
     def sync_pod_status(self, pods: dict[str, dict], status: CrawlStatus):
         """check status of pods"""
@@ -939,23 +1142,18 @@ class CrawlOperator(BaseOperator):
 
         return False
 
-    async def add_used_stats(self, crawl_id, pod_status, redis, metrics):
+    def add_used_stats(self, crawl_id, pod_status, redis_info, metrics):
         """load current usage stats"""
-        if redis:
-            stats = await redis.info("persistence")
-            storage = int(stats.get("aof_current_size", 0)) + int(
-                stats.get("current_cow_size", 0)
+        if redis_info:
+            storage = int(redis_info.get("aof_current_size", 0)) + int(
+                redis_info.get("current_cow_size", 0)
             )
             pod_info = pod_status[f"redis-{crawl_id}"]
             pod_info.used.storage = storage
 
             # if no pod metrics, get memory estimate from redis itself
             if not self.k8s.has_pod_metrics:
-                stats = await redis.info("memory")
-                pod_info.used.memory = int(stats.get("used_memory_rss", 0))
-
-                # stats = await redis.info("cpu")
-                # pod_info.used.cpu = float(stats.get("used_cpu_sys", 0))
+                pod_info.used.memory = int(redis_info.get("used_memory_rss", 0))
 
         for name, metric in metrics.items():
             usage = metric["containers"][0]["usage"]
@@ -1024,9 +1222,15 @@ class CrawlOperator(BaseOperator):
             storage=crawl.storage,
         )
 
-        await redis.incr("filesAddedSize", filecomplete.size)
+        crawl_file.zipIndex = await self.storage_ops.get_wacz_zip_index(org, crawl_file)
+
+        # already added, if drained again after failing to remove from redis
+        if not await self.crawl_ops.add_crawl_file(
+            crawl.id, crawl_file, filecomplete.size
+        ):
+            return False
 
-        await self.crawl_ops.add_crawl_file(crawl.id, crawl_file, filecomplete.size)
+        await redis.incr("filesAddedSize", filecomplete.size)
 
         try:
             await self.background_job_ops.create_replica_jobs(
@@ -1070,33 +1274,81 @@ class CrawlOperator(BaseOperator):
 
         return None
 
-    async def get_redis_crawl_stats(self, redis: Redis, crawl_id: str):
-        """get page stats"""
-        try:
-            # crawler >0.9.0, done key is a value
-            pages_done = int(await redis.get(f"{crawl_id}:d") or 0)
-        except exceptions.ResponseError:
+    async def get_redis_info(self, redis: Redis) -> dict:
+        """get redis INFO persistence and, if needed, memory sections"""
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.info("persistence")
+            if not self.k8s.has_pod_metrics:
+                pipe.info("memory")
+
+            results = await pipe.execute()
+
+        info = {}
+        for result in results:
+            info.update(result)
+
+        return info
+
+    async def get_redis_crawl_snapshot(
+        self, redis: Redis, crawl_id: str
+    ) -> RedisCrawlSnapshot:
+        """get crawl status, page and size stats, added files and redis usage
+        in a single pipelined round-trip"""
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(f"{crawl_id}:status")
+            pipe.get(f"{crawl_id}:d")
+            pipe.scard(f"{crawl_id}:s")
+            pipe.hgetall(f"{crawl_id}:size")
+            pipe.get("filesAdded")
+            pipe.get("filesAddedSize")
+            pipe.exists(f"{crawl_id}:{LIVE_LOG_VIEWERS_KEY}")
+            pipe.info("persistence")
+            if not self.k8s.has_pod_metrics:
+                pipe.info("memory")
+
+            results = await pipe.execute(raise_on_error=False)
+
+        # raise any other error, except for done key type mismatch handled below
+        for i, result in enumerate(results):
+            if i != 1 and isinstance(result, Exception):
+                raise result
+
+        status, pages_done, pages_found, sizes, files_added, files_added_size = results[
+            :6
+        ]
+        live_log_viewers = results[6]
+
+        if isinstance(pages_done, exceptions.ResponseError):
             # crawler <=0.9.0, done key is a list
             pages_done = await redis.llen(f"{crawl_id}:d")
 
-        pages_found = await redis.scard(f"{crawl_id}:s")
-        sizes = await redis.hgetall(f"{crawl_id}:size")
-        archive_size = sum(int(x) for x in sizes.values())
-
-        stats = {"found": pages_found, "done": pages_done, "size": archive_size}
-        return stats, sizes
+        info = {}
+        for result in results[7:]:
+            info.update(result)
+
+        return RedisCrawlSnapshot(
+            status=status,
+            pagesDone=int(pages_done or 0),
+            pagesFound=pages_found,
+            sizes={key: int(value) for key, value in sizes.items()},
+            filesAdded=int(files_added or 0),
+            filesAddedSize=int(files_added_size or 0),
+            liveLogViewers=bool(live_log_viewers),
+            info=info,
+        )
 
     async def update_crawl_state(
         self,
         redis: Redis,
+        snapshot: RedisCrawlSnapshot,
         crawl: CrawlSpec,
         status: CrawlStatus,
         pods: dict[str, dict],
         done: bool,
     ) -> CrawlStatus:
         """update crawl state and check if crawl is now done"""
-        results = await redis.hgetall(f"{crawl.id}:status")
-        stats, sizes = await self.get_redis_crawl_stats(redis, crawl.id)
+        results = snapshot.status
+        stats = snapshot.get_stats()
 
         # need to add size of previously completed WACZ files as well!
         stats["size"] += status.filesAddedSize
@@ -1107,10 +1359,10 @@ class CrawlOperator(BaseOperator):
         status.size = stats["size"]
         status.sizeHuman = humanize.naturalsize(status.size)
 
-        await self.crawl_ops.update_running_crawl_stats(crawl.id, stats)
+        with self.observe_phase("db_writes"):
+            await self.crawl_ops.update_running_crawl_stats(crawl.id, stats)
 
-        for key, value in sizes.items():
-            value = int(value)
+        for key, value in snapshot.sizes.items():
             if value > 0 and status.podStatus:
                 pod_info = status.podStatus[key]
                 pod_info.used.storage = value
@@ -1204,7 +1456,8 @@ class CrawlOperator(BaseOperator):
 
         finished = dt_now()
 
-        kwargs = {"finished": finished}
+        # pending marker set with finished state, cleared once tasks enqueued
+        kwargs = {"finished": finished, "finishedTasksPending": True}
         if stats:
             kwargs["stats"] = stats
 
@@ -1225,19 +1478,39 @@ class CrawlOperator(BaseOperator):
 
         status.finished = to_k8s_date(finished)
 
+        # slot now available for next queued crawl
+        self.admission_index.pop(str(oid), None)
+
         if crawl and state in SUCCESSFUL_STATES:
             await self.inc_crawl_complete_stats(crawl, finished)
 
-        self.run_task(
-            self.do_crawl_finished_tasks(
-                crawl_id, cid, oid, status.filesAddedSize, state
-            )
+        await self.enqueue_crawl_finished_tasks(
+            crawl_id, cid, oid, status.filesAddedSize, state
         )
+        await self.crawl_ops.clear_finished_tasks_pending(crawl_id)
+        status.finishedTasksQueued = True
 
         return True
 
+    async def requeue_crawl_finished_tasks(
+        self, crawl_id: str, cid: UUID, oid: UUID, status: CrawlStatus
+    ) -> None:
+        """Enqueue post-finish tasks for crawl already marked finished in db,
+        if operator exited before they were enqueued in mark_finished.
+        Tasks already enqueued for the crawl are not added again.
+        Crawls without pending marker, including those finished before
+        the outbox was added, already had their tasks applied"""
+        state = await self.crawl_ops.get_pending_finished_state(crawl_id)
+        if state:
+            await self.enqueue_crawl_finished_tasks(
+                crawl_id, cid, oid, status.filesAddedSize, state
+            )
+            await self.crawl_ops.clear_finished_tasks_pending(crawl_id)
+
+        status.finishedTasksQueued = True
+
     # pylint: disable=too-many-arguments
-    async def do_crawl_finished_tasks(
+    async def enqueue_crawl_finished_tasks(
         self,
         crawl_id: str,
         cid: UUID,
@@ -1245,23 +1518,97 @@ class CrawlOperator(BaseOperator):
         files_added_size: int,
         state: str,
     ) -> None:
-        """Run tasks after crawl completes in asyncio.task coroutine."""
-        await self.crawl_config_ops.stats_recompute_last(cid, files_added_size, 1)
+        """Add tasks to run after crawl completes to outbox, steps are run
+        concurrently, then crawl job is deleted once all are finished.
+
+        The log index is built in a separate task, as it reads all logs of
+        the crawl, so that deleting the crawl job is not delayed by it"""
+        steps = ["config_stats"]
 
         if state in SUCCESSFUL_STATES and oid:
-            await self.org_ops.inc_org_bytes_stored(oid, files_added_size, "crawl")
-            await self.coll_ops.add_successful_crawl_to_collections(crawl_id, cid)
+            steps.extend(["org_bytes_stored", "auto_add_collections"])
 
         if state in FAILED_STATES:
+            steps.extend(["delete_files", "delete_pages"])
+
+        steps.append("webhook")
+
+        params = {
+            "crawl_id": crawl_id,
+            "cid": cid,
+            "oid": oid,
+            "files_added_size": files_added_size,
+            "state": state,
+        }
+
+        assert self.outbox
+        await self.outbox.enqueue(
+            CRAWL_FINISHED_TASK, crawl_id, steps, params, final_step="delete_job"
+        )
+
+        if state in SUCCESSFUL_STATES and oid:
+            await self.outbox.enqueue(
+                CRAWL_FINISHED_TASK, f"{crawl_id}-log-index", ["log_index"], params
+            )
+
+    # pylint: disable=too-many-arguments
+    async def do_crawl_finished_step(
+        self,
+        step: str,
+        crawl_id: str,
+        cid: UUID,
+        oid: UUID,
+        files_added_size: int,
+        state: str,
+    ) -> None:
+        """Run single post-finish step for crawl, called from outbox worker.
+
+        Steps that increment counters mark the crawl's step as applied in the
+        same update, so they are not applied twice if retried"""
+        applied_step = f"{crawl_id}:{step}"
+
+        if step == "config_stats":
+            await self.crawl_config_ops.stats_recompute_last(
+                cid, files_added_size, 1, applied_step=applied_step
+            )
+
+        elif step == "org_bytes_stored":
+            await self.org_ops.inc_org_bytes_stored(
+                oid, files_added_size, "crawl", applied_step=applied_step
+            )
+
+        elif step == "auto_add_collections":
+            await self.coll_ops.add_successful_crawl_to_collections(crawl_id, cid)
+
+        elif step == "log_index":
+            await self.crawl_ops.build_crawl_log_index(crawl_id, oid)
+
+        elif step == "delete_files":
             await self.crawl_ops.delete_crawl_files(crawl_id, oid)
+
+        elif step == "delete_pages":
             await self.page_ops.delete_crawl_pages(crawl_id, oid)
 
-        await self.event_webhook_ops.create_crawl_finished_notification(
-            crawl_id, oid, state
-        )
+        elif step == "webhook":
+            if await self.crawl_ops.mark_step_applied(crawl_id, step):
+                await self.event_webhook_ops.create_crawl_finished_notification(
+                    crawl_id, oid, state
+                )
 
-        # finally, delete job
-        await self.k8s.delete_crawl_job(crawl_id)
+        elif step == "delete_job":
+            await self.k8s.delete_crawl_job(crawl_id)
+
+            # all other steps done, markers no longer needed
+            await self.crawl_config_ops.clear_applied_step(
+                cid, f"{crawl_id}:config_stats"
+            )
+            if oid:
+                await self.org_ops.clear_applied_step(
+                    oid, f"{crawl_id}:org_bytes_stored"
+                )
+
+        else:
+            raise ValueError(f"unknown crawl finished step: {step}")
 
     async def inc_crawl_complete_stats(self, crawl, finished):
         """Increment Crawl Stats"""
@@ -1276,14 +1623,9 @@ class CrawlOperator(BaseOperator):
 
     async def mark_for_cancelation(self, crawl_id):
         """mark crawl as canceled in redis"""
-        try:
-            redis_url = self.k8s.get_redis_url(crawl_id)
-            redis = await self._get_redis(redis_url)
-            if not redis:
-                return False
+        redis = await self._get_redis(crawl_id)
+        if not redis:
+            return False
 
-            await redis.set(f"{crawl_id}:canceled", "1")
-            return True
-        finally:
-            if redis:
-                await redis.close()
+        await redis.set(f"{crawl_id}:canceled", "1")
+        return True
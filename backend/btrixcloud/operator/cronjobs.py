@@ -13,12 +13,14 @@ from .baseoperator import BaseOperator
 class CronJobOperator(BaseOperator):
     """CronJob Operator"""
 
+    name = "cronjobs"
+
     def init_routes(self, app):
         """init routes for crawl CronJob decorator"""
 
         @app.post("/op/cronjob/sync")
         async def mc_sync_cronjob_crawls(data: MCDecoratorSyncData):
-            return await self.sync_cronjob_crawl(data)
+            return await self.observe_sync("sync", self.sync_cronjob_crawl(data))
 
         @app.post("/op/cronjob/customize")
         async def mc_cronjob_related(data: MCBaseRequest):
@@ -0,0 +1,114 @@
+""" Operator sync metrics, exposed in Prometheus format on /metrics """
+
+import time
+from contextlib import contextmanager
+from typing import Awaitable, TypeVar
+
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+
+T = TypeVar("T")
+
+
+SYNC_SECONDS = Histogram(
+    "btrix_operator_sync_seconds",
+    "Time to handle a metacontroller hook request",
+    ["operator", "hook"],
+)
+
+SYNC_ERRORS = Counter(
+    "btrix_operator_sync_errors_total",
+    "Errors raised or caught while handling a metacontroller hook request",
+    ["operator", "hook"],
+)
+
+PHASE_SECONDS = Histogram(
+    "btrix_operator_sync_phase_seconds",
+    "Time spent in each phase of an operator sync (phases may be nested)",
+    ["operator", "phase"],
+)
+
+DRAINED_ITEMS = Counter(
+    "btrix_operator_drained_items_total",
+    "Files, pages and errors drained from crawl redis",
+    ["kind"],
+)
+
+OUTBOX_TASKS = Gauge(
+    "btrix_operator_outbox_tasks",
+    "Operator outbox tasks not yet completed, by state",
+    ["state"],
+)
+
+OUTBOX_QUEUE_SECONDS = Histogram(
+    "btrix_operator_outbox_queue_seconds",
+    "Time from operator outbox task being due to being claimed by a worker",
+    ["type", "step"],
+)
+
+OUTBOX_TASK_SECONDS = Histogram(
+    "btrix_operator_outbox_task_seconds",
+    "Time to run an operator outbox task",
+    ["type", "step", "result"],
+)
+
+REDIS_CLIENTS = Gauge(
+    "btrix_operator_redis_clients",
+    "Pooled per-crawl redis client registry stats",
+    ["stat"],
+)
+
+S3_CLIENTS = Gauge(
+    "btrix_operator_s3_clients",
+    "Pooled per-storage s3 client registry stats",
+    ["stat"],
+)
+
+
+# ============================================================================
+@contextmanager
+def observe_phase(operator: str, phase: str):
+    """record duration of a sync phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.labels(operator, phase).observe(time.perf_counter() - start)
+
+
+# ============================================================================
+async def observe_sync(operator: str, hook: str, coro: Awaitable[T]) -> T:
+    """await hook handler, recording duration and any errors raised"""
+    start = time.perf_counter()
+    try:
+        return await coro
+    except Exception:
+        SYNC_ERRORS.labels(operator, hook).inc()
+        raise
+    finally:
+        SYNC_SECONDS.labels(operator, hook).observe(time.perf_counter() - start)
+
+
+# ============================================================================
+def init_metrics_api(app, k8s, outbox, storage_ops):
+    """add /metrics endpoint to operator app.
+    Note: metrics are per worker process"""
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        for stat, value in k8s.redis_clients.get_stats().items():
+            REDIS_CLIENTS.labels(stat).set(value)
+
+        for stat, value in storage_ops.s3_clients.get_stats().items():
+            S3_CLIENTS.labels(stat).set(value)
+
+        await outbox.update_metrics()
+
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
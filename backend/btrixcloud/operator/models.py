@@ -1,8 +1,9 @@
 """ Operator Models """
 
 from collections import defaultdict
+from datetime import datetime
 from uuid import UUID
-from typing import Optional, DefaultDict
+from typing import Optional, DefaultDict, Any
 from pydantic import BaseModel, Field
 from kubernetes.utils import parse_quantity
 from btrixcloud.models import StorageRef
@@ -149,6 +150,38 @@ class PodInfo(BaseModel):
         return False
 
 
+# ============================================================================
+# pylint: disable=invalid-name
+class RedisCrawlSnapshot(BaseModel):
+    """crawl state and stats read from redis in a single round-trip"""
+
+    # per-crawler-instance state
+    status: dict[str, str] = {}
+
+    pagesDone: int = 0
+    pagesFound: int = 0
+
+    # per-crawler-instance size
+    sizes: dict[str, int] = {}
+
+    filesAdded: int = 0
+    filesAddedSize: int = 0
+
+    # crawl has live log viewers
+    liveLogViewers: bool = False
+
+    # combined redis INFO persistence and memory sections
+    info: dict[str, Any] = {}
+
+    def get_stats(self) -> dict[str, int]:
+        """return page and size stats, not including uploaded files"""
+        return {
+            "found": self.pagesFound,
+            "done": self.pagesDone,
+            "size": sum(self.sizes.values()),
+        }
+
+
 # ============================================================================
 # pylint: disable=invalid-name
 class CrawlStatus(BaseModel):
@@ -164,6 +197,7 @@ class CrawlStatus(BaseModel):
     filesAdded: int = 0
     filesAddedSize: int = 0
     finished: Optional[str] = None
+    finishedTasksQueued: bool = False
     stopping: bool = False
     stopReason: Optional[str] = None
     initRedis: bool = False
@@ -196,3 +230,40 @@ class CrawlStatus(BaseModel):
 
     # don't include in status, use by metacontroller
     resync_after: Optional[int] = Field(default=None, exclude=True)
+
+    # consecutive syncs with crawl waiting or idle, to back off resyncs
+    idleSyncs: int = 0
+
+    # entries drained from redis this sync, not included in status
+    drained: Optional[int] = Field(default=None, exclude=True)
+
+    # crawl has live log viewers this sync, not included in status
+    liveLogViewers: bool = Field(default=False, exclude=True)
+
+
+# ============================================================================
+# pylint: disable=invalid-name
+class OutboxTask(BaseModel):
+    """durable operator task, stored in mongo until run"""
+
+    id: str
+    type: str
+    group: str
+    step: str
+    params: dict[str, Any] = {}
+
+    # pending, blocked, running, done or failed
+    state: str = "pending"
+    attempts: int = 0
+
+    created: datetime
+    runAt: datetime
+    leaseUntil: Optional[datetime] = None
+    finished: Optional[datetime] = None
+    error: Optional[str] = None
+
+    def to_dict(self):
+        """convert to dict for mongo"""
+        res = self.dict()
+        res["_id"] = res.pop("id")
+        return res
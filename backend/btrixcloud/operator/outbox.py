@@ -0,0 +1,320 @@
+""" Durable mongo-backed outbox for operator tasks, eg. post-finish crawl tasks """
+
+import asyncio
+import os
+import time
+import traceback
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+import pymongo
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from btrixcloud.utils import dt_now
+from .metrics import OUTBOX_QUEUE_SECONDS, OUTBOX_TASK_SECONDS, OUTBOX_TASKS
+from .models import OutboxTask
+
+
+# task states
+PENDING = "pending"
+BLOCKED = "blocked"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+OutboxHandler = Callable[..., Awaitable[None]]
+
+
+# ============================================================================
+# pylint: disable=too-many-instance-attributes
+class OperatorOutbox:
+    """Tasks are enqueued in mongo and claimed by a pool of workers (in any
+    operator process) with a lease. Failed tasks are retried with exponential
+    backoff, and tasks leased by a worker that has exited are re-run, so
+    tasks are run at least once, even across operator restarts.
+
+    Tasks are enqueued in groups, eg. per crawl, which may have a final step
+    that is only run once all other steps in the group are done or failed.
+    """
+
+    def __init__(self, mdb):
+        self.tasks = mdb["operator_tasks"]
+
+        self.handlers: dict[str, OutboxHandler] = {}
+
+        self.num_workers = int(os.environ.get("OPERATOR_TASK_WORKERS") or 4)
+        self.max_attempts = int(os.environ.get("OPERATOR_TASK_MAX_ATTEMPTS") or 8)
+        self.lease_secs = int(os.environ.get("OPERATOR_TASK_LEASE_SECS") or 300)
+        self.retry_secs = int(os.environ.get("OPERATOR_TASK_RETRY_SECS") or 10)
+
+        # completed tasks removed after this many secs, failed tasks are kept
+        self.keep_done_secs = 86400
+
+        self.poll_secs = 5
+
+        self.workers: list[asyncio.Task] = []
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def register(self, task_type: str, handler: OutboxHandler):
+        """register handler, called as handler(step, **params) for each task"""
+        self.handlers[task_type] = handler
+
+    async def init_index(self):
+        """init index for tasks"""
+        await self.tasks.create_index(
+            [("state", pymongo.ASCENDING), ("runAt", pymongo.ASCENDING)]
+        )
+        await self.tasks.create_index([("group", pymongo.HASHED)])
+        await self.tasks.create_index(
+            "finished",
+            expireAfterSeconds=self.keep_done_secs,
+            partialFilterExpression={"state": DONE},
+        )
+
+    async def start(self):
+        """init index, start worker pool in this process.
+        Tasks left running by an exited worker are re-run once lease expires"""
+        await self.init_index()
+
+        self.wakeup = asyncio.Event()
+        self.workers = [
+            asyncio.create_task(self.run_worker()) for _ in range(self.num_workers)
+        ]
+        print(f"Operator outbox: {self.num_workers} workers started", flush=True)
+
+    async def stop(self):
+        """cancel workers on shutdown. Tasks being run when canceled are
+        re-run by another worker once their lease expires"""
+        for worker in self.workers:
+            worker.cancel()
+
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    # pylint: disable=too-many-arguments
+    async def enqueue(
+        self,
+        task_type: str,
+        group: str,
+        steps: list[str],
+        params: dict,
+        final_step: Optional[str] = None,
+    ):
+        """add tasks for each step to the outbox. Task ids are derived from
+        the group and step, so enqueuing the same group again is a no-op"""
+        now = dt_now()
+        tasks = [
+            OutboxTask(
+                id=f"{group}:{step}",
+                type=task_type,
+                group=group,
+                step=step,
+                params=params,
+                created=now,
+                runAt=now,
+            ).to_dict()
+            for step in steps
+        ]
+        if final_step:
+            tasks.append(
+                OutboxTask(
+                    id=f"{group}:{final_step}",
+                    type=task_type,
+                    group=group,
+                    step=final_step,
+                    params=params,
+                    state=BLOCKED if steps else PENDING,
+                    created=now,
+                    runAt=now,
+                ).to_dict()
+            )
+
+        try:
+            await self.tasks.insert_many(tasks, ordered=False)
+        except BulkWriteError as bwe:
+            if any(err.get("code") != 11000 for err in bwe.details["writeErrors"]):
+                raise
+
+        if self.wakeup:
+            self.wakeup.set()
+
+    async def claim(self) -> Optional[OutboxTask]:
+        """claim next due task, or task whose lease has expired"""
+        now = dt_now()
+        res = await self.tasks.find_one_and_update(
+            {
+                "$or": [
+                    {"state": PENDING, "runAt": {"$lte": now}},
+                    {"state": RUNNING, "leaseUntil": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "state": RUNNING,
+                    "leaseUntil": now + timedelta(seconds=self.lease_secs),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("runAt", pymongo.ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if not res:
+            return None
+
+        res["id"] = res.pop("_id")
+        return OutboxTask(**res)
+
+    async def run_worker(self):
+        """claim and run tasks until canceled"""
+        last_sweep = dt_now()
+
+        while True:
+            try:
+                task = await self.claim()
+                if task:
+                    await self.run_task(task)
+                    continue
+
+                if (dt_now() - last_sweep).total_seconds() > self.lease_secs:
+                    await self.release_stale_final_steps()
+                    last_sweep = dt_now()
+
+                assert self.wakeup
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_secs)
+                except asyncio.TimeoutError:
+                    pass
+
+            # pylint: disable=broad-exception-caught
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(self.poll_secs)
+
+    async def run_task(self, task: OutboxTask):
+        """run claimed task, then mark done or schedule retry"""
+        OUTBOX_QUEUE_SECONDS.labels(task.type, task.step).observe(
+            max((dt_now() - task.runAt).total_seconds(), 0)
+        )
+
+        start = time.monotonic()
+
+        try:
+            await self.run_handler(task)
+
+        # pylint: disable=broad-exception-caught
+        except Exception as exc:
+            # only update if still holding lease
+            query = {"_id": task.id, "state": RUNNING, "leaseUntil": task.leaseUntil}
+            traceback.print_exc()
+            OUTBOX_TASK_SECONDS.labels(task.type, task.step, "error").observe(
+                time.monotonic() - start
+            )
+
+            if task.attempts < self.max_attempts:
+                delay = self.retry_secs * 2 ** (task.attempts - 1)
+                print(
+                    f"Task {task.id} failed, attempt {task.attempts}, "
+                    f"retrying in {delay} secs",
+                    flush=True,
+                )
+                await self.tasks.find_one_and_update(
+                    query,
+                    {
+                        "$set": {
+                            "state": PENDING,
+                            "runAt": dt_now() + timedelta(seconds=delay),
+                            "error": str(exc),
+                        },
+                    },
+                )
+                return
+
+            print(f"Task {task.id} failed, giving up", flush=True)
+            await self.tasks.find_one_and_update(
+                query,
+                {"$set": {"state": FAILED, "finished": dt_now(), "error": str(exc)}},
+            )
+
+        else:
+            OUTBOX_TASK_SECONDS.labels(task.type, task.step, "success").observe(
+                time.monotonic() - start
+            )
+            await self.tasks.find_one_and_update(
+                {"_id": task.id, "state": RUNNING, "leaseUntil": task.leaseUntil},
+                {"$set": {"state": DONE, "finished": dt_now()}},
+            )
+
+        await self.release_final_step(task.group)
+
+    async def run_handler(self, task: OutboxTask):
+        """run handler for task, renewing lease until it returns, so that
+        long-running tasks are only re-run if this worker has exited"""
+        stop = asyncio.Event()
+        renew = asyncio.create_task(self.renew_lease(task, stop))
+        try:
+            await self.handlers[task.type](task.step, **task.params)
+        finally:
+            stop.set()
+            await renew
+
+    async def renew_lease(self, task: OutboxTask, stop: asyncio.Event):
+        """extend lease every third of lease period until stopped"""
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), self.lease_secs / 3)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            res = await self.tasks.find_one_and_update(
+                {"_id": task.id, "state": RUNNING, "leaseUntil": task.leaseUntil},
+                {"$set": {"leaseUntil": dt_now() + timedelta(seconds=self.lease_secs)}},
+                projection=["leaseUntil"],
+                return_document=ReturnDocument.AFTER,
+            )
+            # lease lost, eg. task re-claimed after worker was unresponsive
+            if not res:
+                return
+
+            task.leaseUntil = res["leaseUntil"]
+
+    async def release_final_step(self, group: str):
+        """make blocked final step runnable once other steps are finished"""
+        if await self.tasks.find_one(
+            {"group": group, "state": {"$in": [PENDING, RUNNING]}}, projection=["_id"]
+        ):
+            return
+
+        res = await self.tasks.update_many(
+            {"group": group, "state": BLOCKED},
+            {"$set": {"state": PENDING, "runAt": dt_now()}},
+        )
+        if res.modified_count and self.wakeup:
+            self.wakeup.set()
+
+    async def release_stale_final_steps(self):
+        """release any final steps left blocked, eg. if operator exited
+        after the last other step in the group finished"""
+        cutoff = dt_now() - timedelta(seconds=self.lease_secs)
+        groups = await self.tasks.distinct(
+            "group", {"state": BLOCKED, "created": {"$lt": cutoff}}
+        )
+        for group in groups:
+            await self.release_final_step(group)
+
+    async def update_metrics(self):
+        """update queue depth per state"""
+        counts = {PENDING: 0, BLOCKED: 0, RUNNING: 0, FAILED: 0}
+        cursor = self.tasks.aggregate(
+            [
+                {"$match": {"state": {"$in": list(counts.keys())}}},
+                {"$group": {"_id": "$state", "count": {"$sum": 1}}},
+            ]
+        )
+        async for res in cursor:
+            counts[res["_id"]] = res["count"]
+
+        for state, count in counts.items():
+            OUTBOX_TASKS.labels(state).set(count)
@@ -15,12 +15,14 @@ from .baseoperator import BaseOperator
 class ProfileOperator(BaseOperator):
     """ProfileOperator"""
 
+    name = "profiles"
+
     def init_routes(self, app):
         """init routes for this operator"""
 
         @app.post("/op/profilebrowsers/sync")
         async def mc_sync_profile_browsers(data: MCSyncData):
-            return await self.sync_profile_browsers(data)
+            return await self.observe_sync("sync", self.sync_profile_browsers(data))
 
     async def sync_profile_browsers(self, data: MCSyncData):
         """sync profile browsers"""
@@ -52,6 +54,7 @@ class ProfileOperator(BaseOperator):
         params["url"] = spec.get("startUrl", "about:blank")
         params["vnc_password"] = spec.get("vncPassword")
 
-        children = self.load_from_yaml("profilebrowser.yaml", params)
+        with self.observe_phase("render_children"):
+            children = self.load_from_yaml("profilebrowser.yaml", params)
 
         return {"status": {}, "children": children}
@@ -3,7 +3,6 @@ Organization API handling
 """
 
 # pylint: disable=too-many-lines
-import math
 import os
 import time
 import urllib.parse
@@ -21,6 +20,7 @@ from .models import (
     RUNNING_STATES,
     STARTING_STATES,
     Organization,
+    OrgQuotaSnapshot,
     StorageRef,
     OrgQuotas,
     OrgQuotaUpdate,
@@ -74,6 +74,10 @@ class OrgOps:
 
         self.invites = invites
 
+        # how long to reuse quota snapshots before reloading from db
+        self.quota_cache_secs = float(os.environ.get("ORG_QUOTA_CACHE_SECS") or 5)
+        self._quota_cache: dict[UUID, tuple[float, OrgQuotaSnapshot]] = {}
+
     def set_default_primary_storage(self, storage: StorageRef):
         """set default primary storage"""
         self.default_primary = storage
@@ -331,6 +335,8 @@ class OrgOps:
                     {"$inc": {"giftedExecSecondsAvailable": gifted_secs_diff}},
                 )
 
+        self.invalidate_quota_snapshot(org.id)
+
     async def update_event_webhook_urls(self, org: Organization, urls: OrgWebhookUrls):
         """Update organization event webhook URLs"""
         return await self.orgs.find_one_and_update(
@@ -386,102 +392,120 @@ class OrgOps:
             return org.quotas.maxPagesPerCrawl
         return 0
 
-    async def inc_org_bytes_stored(self, oid: UUID, size: int, type_="crawl"):
-        """Increase org bytesStored count (pass negative value to subtract)."""
-        if type_ == "crawl":
-            await self.orgs.find_one_and_update(
-                {"_id": oid}, {"$inc": {"bytesStored": size, "bytesStoredCrawls": size}}
-            )
-        elif type_ == "upload":
-            await self.orgs.find_one_and_update(
-                {"_id": oid},
-                {"$inc": {"bytesStored": size, "bytesStoredUploads": size}},
-            )
-        elif type_ == "profile":
-            await self.orgs.find_one_and_update(
-                {"_id": oid},
-                {"$inc": {"bytesStored": size, "bytesStoredProfiles": size}},
-            )
+    async def inc_org_bytes_stored(
+        self, oid: UUID, size: int, type_="crawl", applied_step: Optional[str] = None
+    ):
+        """Increase org bytesStored count (pass negative value to subtract).
+
+        If applied_step is set, only increase if step not already applied,
+        marking step as applied in the same update"""
+        type_fields = {
+            "crawl": "bytesStoredCrawls",
+            "upload": "bytesStoredUploads",
+            "profile": "bytesStoredProfiles",
+        }
+        if type_ in type_fields:
+            query: dict[str, object] = {"_id": oid}
+            update: dict[str, object] = {
+                "$inc": {"bytesStored": size, type_fields[type_]: size}
+            }
+            if applied_step:
+                query["appliedSteps"] = {"$ne": applied_step}
+                update["$addToSet"] = {"appliedSteps": applied_step}
+
+            await self.orgs.find_one_and_update(query, update)
+
+        self.invalidate_quota_snapshot(oid)
         return await self.storage_quota_reached(oid)
 
-    # pylint: disable=invalid-name
-    async def storage_quota_reached(self, oid: UUID) -> bool:
-        """Return boolean indicating if storage quota is met or exceeded."""
-        quota = await self.get_org_storage_quota(oid)
-        if not quota:
-            return False
+    async def clear_applied_step(self, oid: UUID, applied_step: str):
+        """remove applied step marker, once step can no longer be retried"""
+        await self.orgs.find_one_and_update(
+            {"_id": oid}, {"$pull": {"appliedSteps": applied_step}}
+        )
 
-        org = await self.orgs.find_one({"_id": oid})
-        org = Organization.from_dict(org)
+    async def get_org_quota_snapshot(self, oid: UUID) -> OrgQuotaSnapshot:
+        """Return quota fields for org, loaded with a projection and cached
+        for up to quota_cache_secs, or until next org usage update"""
+        now = time.monotonic()
+        yymm = datetime.utcnow().strftime("%Y-%m")
+
+        cached = self._quota_cache.get(oid)
+        if cached:
+            loaded, snapshot = cached
+            if now - loaded < self.quota_cache_secs and snapshot.yymm == yymm:
+                return snapshot
+
+        res = await self.orgs.find_one({"_id": oid}, self._get_quota_projection(yymm))
+        if not res:
+            # org not found, no quotas
+            return OrgQuotaSnapshot(id=oid, yymm=yymm)
+
+        return self._cache_quota_snapshot(res, yymm, now)
+
+    def _get_quota_projection(self, yymm: str) -> dict[str, int]:
+        """projection of quota fields for current month"""
+        return {
+            "bytesStored": 1,
+            f"monthlyExecSeconds.{yymm}": 1,
+            "extraExecSecondsAvailable": 1,
+            "giftedExecSecondsAvailable": 1,
+            "quotas": 1,
+        }
+
+    def _cache_quota_snapshot(
+        self, res: dict, yymm: str, now: Optional[float] = None
+    ) -> OrgQuotaSnapshot:
+        """create quota snapshot from db result and cache it"""
+        res["yymm"] = yymm
+        snapshot = OrgQuotaSnapshot.from_dict(res)
+
+        if self.quota_cache_secs > 0:
+            self._quota_cache[snapshot.id] = (now or time.monotonic(), snapshot)
 
-        if org.bytesStored >= quota:
-            return True
+        return snapshot
 
-        return False
+    def invalidate_quota_snapshot(self, oid: UUID) -> None:
+        """Remove cached quota snapshot after org quotas or usage change"""
+        self._quota_cache.pop(oid, None)
+
+    # pylint: disable=invalid-name
+    async def storage_quota_reached(self, oid: UUID) -> bool:
+        """Return boolean indicating if storage quota is met or exceeded."""
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return snapshot.storage_quota_reached()
 
     async def get_monthly_crawl_exec_seconds(self, oid: UUID) -> int:
         """Return monthlyExecSeconds for current month"""
-        org = await self.orgs.find_one({"_id": oid})
-        org = Organization.from_dict(org)
-        yymm = datetime.utcnow().strftime("%Y-%m")
-        try:
-            return org.monthlyExecSeconds[yymm]
-        except KeyError:
-            return 0
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return snapshot.get_monthly_exec_seconds()
 
     async def exec_mins_quota_reached(
         self, oid: UUID, include_extra: bool = True
     ) -> bool:
         """Return bool for if execution minutes quota is reached"""
-        if include_extra:
-            gifted_seconds = await self.get_gifted_exec_secs_available(oid)
-            if gifted_seconds:
-                return False
-
-            extra_seconds = await self.get_extra_exec_secs_available(oid)
-            if extra_seconds:
-                return False
-
-        monthly_quota = await self.get_org_exec_mins_monthly_quota(oid)
-        if monthly_quota:
-            monthly_exec_seconds = await self.get_monthly_crawl_exec_seconds(oid)
-            monthly_exec_minutes = math.floor(monthly_exec_seconds / 60)
-            if monthly_exec_minutes >= monthly_quota:
-                return True
-
-        return False
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return snapshot.exec_mins_quota_reached(include_extra)
 
     async def get_org_storage_quota(self, oid: UUID) -> int:
         """return max allowed concurrent crawls, if any"""
-        org = await self.orgs.find_one({"_id": oid})
-        if org:
-            org = Organization.from_dict(org)
-            return org.quotas.storageQuota
-        return 0
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return (snapshot.quotas.storageQuota or 0) if snapshot.quotas else 0
 
     async def get_org_exec_mins_monthly_quota(self, oid: UUID) -> int:
         """return max allowed execution mins per month, if any"""
-        org = await self.orgs.find_one({"_id": oid})
-        if org:
-            org = Organization.from_dict(org)
-            return org.quotas.maxExecMinutesPerMonth
-        return 0
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return (snapshot.quotas.maxExecMinutesPerMonth or 0) if snapshot.quotas else 0
 
     async def get_extra_exec_secs_available(self, oid: UUID) -> int:
         """return extra billable rollover seconds available, if any"""
-        org = await self.orgs.find_one({"_id": oid})
-        if org:
-            org = Organization.from_dict(org)
-            return org.extraExecSecondsAvailable
-        return 0
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return snapshot.extraExecSecondsAvailable
 
     async def get_gifted_exec_secs_available(self, oid: UUID) -> int:
         """return gifted rollover seconds available, if any"""
-        org = await self.orgs.find_one({"_id": oid})
-        if org:
-            org = Organization.from_dict(org)
-            return org.giftedExecSecondsAvailable
-        return 0
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return snapshot.giftedExecSecondsAvailable
 
     async def set_origin(self, org: Organization, request: Request):
         """Get origin from request and store in db for use in event webhooks"""
@@ -498,102 +522,159 @@ class OrgOps:
             {"_id": org.id}, {"$set": {"origin": origin}}
         )
 
-    async def inc_org_time_stats(self, oid, duration, is_exec_time=False):
+    async def inc_org_time_stats(
+        self, oid, duration, is_exec_time=False
+    ) -> Optional[OrgQuotaSnapshot]:
         """inc crawl duration stats for org
 
         Overage is applied only to crawlExecSeconds - monthlyExecSeconds,
         giftedExecSeconds, and extraExecSeconds are added to only up to quotas
+
+        For execution time, the split across monthly, gifted and extra
+        seconds is computed and applied in a single atomic pipeline update,
+        and the updated quota snapshot is returned
         """
-        # pylint: disable=too-many-return-statements
         key = "crawlExecSeconds" if is_exec_time else "usage"
         yymm = datetime.utcnow().strftime("%Y-%m")
-        await self.orgs.find_one_and_update(
-            {"_id": oid}, {"$inc": {f"{key}.{yymm}": duration}}
-        )
 
         if not is_exec_time:
-            return
+            await self.orgs.find_one_and_update(
+                {"_id": oid}, {"$inc": {f"{key}.{yymm}": duration}}
+            )
+            return None
 
-        org = await self.get_org_by_id(oid)
+        def month_field(field):
+            return f"${field}.{yymm}"
 
-        monthly_exec_secs_used = await self.get_monthly_crawl_exec_seconds(oid)
+        def non_negative(field):
+            return {"$max": [{"$ifNull": [f"${field}", 0]}, 0]}
 
-        monthly_quota_mins = await self.get_org_exec_mins_monthly_quota(oid)
-        monthly_quota_secs = monthly_quota_mins * 60
+        def inc_if_used(field, amount_field):
+            # only set if any seconds were applied, to avoid adding empty months
+            return {
+                "$cond": [
+                    {"$gt": [f"${amount_field}", 0]},
+                    {
+                        "$add": [
+                            {"$ifNull": [month_field(field), 0]},
+                            f"${amount_field}",
+                        ]
+                    },
+                    month_field(field),
+                ]
+            }
 
-        if (
-            not monthly_quota_secs
-            and not org.giftedExecSecondsAvailable
-            and not org.extraExecSecondsAvailable
-        ):
-            return
+        def dec_if_used(field, amount_field):
+            return {
+                "$cond": [
+                    {"$gt": [f"${amount_field}", 0]},
+                    {"$subtract": [non_negative(field), f"${amount_field}"]},
+                    f"${field}",
+                ]
+            }
 
-        monthly_remaining_time = monthly_quota_secs - monthly_exec_secs_used
+        monthly_quota_secs = {
+            "$multiply": [{"$ifNull": ["$quotas.maxExecMinutesPerMonth", 0]}, 60]
+        }
 
-        # If adding duration won't pass monthly quota, add duration and return
-        if duration <= monthly_remaining_time:
-            return await self.orgs.find_one_and_update(
-                {"_id": oid}, {"$inc": {f"monthlyExecSeconds.{yymm}": duration}}
-            )
+        pipeline = [
+            # use monthly quota first, up to quota
+            {
+                "$set": {
+                    "_toMonthly": {
+                        "$min": [
+                            duration,
+                            {
+                                "$max": [
+                                    {
+                                        "$subtract": [
+                                            monthly_quota_secs,
+                                            {
+                                                "$ifNull": [
+                                                    month_field("monthlyExecSeconds"),
+                                                    0,
+                                                ]
+                                            },
+                                        ]
+                                    },
+                                    0,
+                                ]
+                            },
+                        ]
+                    }
+                }
+            },
+            # then gifted seconds, if available
+            {
+                "$set": {
+                    "_toGifted": {
+                        "$min": [
+                            {"$subtract": [duration, "$_toMonthly"]},
+                            non_negative("giftedExecSecondsAvailable"),
+                        ]
+                    }
+                }
+            },
+            # then extra seconds, if available
+            {
+                "$set": {
+                    "_toExtra": {
+                        "$min": [
+                            {
+                                "$subtract": [
+                                    duration,
+                                    {"$add": ["$_toMonthly", "$_toGifted"]},
+                                ]
+                            },
+                            non_negative("extraExecSecondsAvailable"),
+                        ]
+                    }
+                }
+            },
+            {
+                "$set": {
+                    f"crawlExecSeconds.{yymm}": {
+                        "$add": [
+                            {"$ifNull": [month_field("crawlExecSeconds"), 0]},
+                            duration,
+                        ]
+                    },
+                    f"monthlyExecSeconds.{yymm}": inc_if_used(
+                        "monthlyExecSeconds", "_toMonthly"
+                    ),
+                    f"giftedExecSeconds.{yymm}": inc_if_used(
+                        "giftedExecSeconds", "_toGifted"
+                    ),
+                    "giftedExecSecondsAvailable": dec_if_used(
+                        "giftedExecSecondsAvailable", "_toGifted"
+                    ),
+                    f"extraExecSeconds.{yymm}": inc_if_used(
+                        "extraExecSeconds", "_toExtra"
+                    ),
+                    "extraExecSecondsAvailable": dec_if_used(
+                        "extraExecSecondsAvailable", "_toExtra"
+                    ),
+                }
+            },
+            {"$unset": ["_toMonthly", "_toGifted", "_toExtra"]},
+        ]
 
-        # Otherwise, add execution seconds to monthlyExecSeconds up to quota
-        await self.orgs.find_one_and_update(
+        res = await self.orgs.find_one_and_update(
             {"_id": oid},
-            {"$inc": {f"monthlyExecSeconds.{yymm}": monthly_remaining_time}},
+            pipeline,
+            projection=self._get_quota_projection(yymm),
+            return_document=ReturnDocument.AFTER,
         )
+        if not res:
+            return None
 
-        if not org.giftedExecSecondsAvailable and not org.extraExecSecondsAvailable:
-            return
-
-        secs_over_quota = duration - monthly_remaining_time
-
-        # If we've surpassed monthly base quota, use gifted and extra exec minutes
-        # in that order if available, track their usage per month, and recalculate
-        # extraExecSecondsAvailable and giftedExecSecondsAvailable as needed
-        gifted_secs_available = org.giftedExecSecondsAvailable
-        if gifted_secs_available:
-            if secs_over_quota <= gifted_secs_available:
-                return await self.orgs.find_one_and_update(
-                    {"_id": oid},
-                    {
-                        "$inc": {
-                            f"giftedExecSeconds.{yymm}": secs_over_quota,
-                            "giftedExecSecondsAvailable": -secs_over_quota,
-                        }
-                    },
-                )
-
-            # If seconds over quota is higher than gifted seconds available,
-            # use remaining gifted gifted time and then move on
-            await self.orgs.find_one_and_update(
-                {"_id": oid},
-                {
-                    "$inc": {f"giftedExecSeconds.{yymm}": gifted_secs_available},
-                    "$set": {"giftedExecSecondsAvailable": 0},
-                },
-            )
-            secs_over_quota = secs_over_quota - gifted_secs_available
-
-        # If we still have an overage, apply to extra up to quota
-        secs_to_use = min(secs_over_quota, org.extraExecSecondsAvailable)
-        if secs_to_use:
-            return await self.orgs.find_one_and_update(
-                {"_id": oid},
-                {
-                    "$inc": {
-                        f"extraExecSeconds.{yymm}": secs_to_use,
-                        "extraExecSecondsAvailable": -secs_to_use,
-                    }
-                },
-            )
+        # cache updated quota state for next quota check
+        return self._cache_quota_snapshot(res, yymm)
 
     async def get_max_concurrent_crawls(self, oid):
         """return max allowed concurrent crawls, if any"""
-        org = await self.orgs.find_one({"_id": oid})
-        if org:
-            org = Organization.from_dict(org)
-            return org.quotas.maxConcurrentCrawls
-        return 0
+        snapshot = await self.get_org_quota_snapshot(oid)
+        return (snapshot.quotas.maxConcurrentCrawls or 0) if snapshot.quotas else 0
 
     async def get_org_metrics(self, org: Organization):
         """Calculate and return org metrics"""
@@ -1,13 +1,25 @@
 """crawl pages"""
 
 from datetime import datetime
-from typing import TYPE_CHECKING, Optional, Tuple, List, Dict, Any, Union
-from uuid import UUID, uuid4
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Tuple,
+    List,
+    Dict,
+    Any,
+    Union,
+    Callable,
+    Awaitable,
+)
+from uuid import UUID, uuid4, uuid5, NAMESPACE_URL
 
 from fastapi import Depends, HTTPException
 import pymongo
 
 from .models import (
+    CrawlFile,
+    IngestPagesJob,
     Page,
     PageOut,
     PageReviewUpdate,
@@ -31,6 +43,10 @@ else:
     CrawlOps = StorageOps = OrgOps = object
 
 
+# max number of pages to add to db in a single insert
+PAGE_INSERT_BATCH_SIZE = 500
+
+
 # ============================================================================
 # pylint: disable=too-many-instance-attributes, too-many-arguments
 class PageOps:
@@ -52,8 +68,8 @@ class PageOps:
             crawl = await self.crawl_ops.get_crawl(crawl_id, None)
             org = await self.org_ops.get_org_by_id(crawl.oid)
             wacz_files = await self.crawl_ops.get_wacz_files(crawl_id, org)
-            stream = await self.storage_ops.sync_stream_pages_from_wacz(org, wacz_files)
-            for page_dict in stream:
+            stream = self.storage_ops.stream_pages_from_wacz(org, wacz_files)
+            async for page_dict in stream:
                 if not page_dict.get("url"):
                     continue
 
@@ -62,8 +78,169 @@ class PageOps:
         except Exception as err:
             print(f"Error adding pages for crawl {crawl_id} to db: {err}", flush=True)
 
+    async def ingest_wacz_pages(
+        self,
+        job: IngestPagesJob,
+        org: Organization,
+        wacz_files: List[CrawlFile],
+        save_progress: Callable[[IngestPagesJob], Awaitable[None]],
+    ):
+        """Add pages from WACZ files to db with batched inserts, streaming
+        pages.jsonl members. Resumes from position in files saved in job,
+        saving position after each batch"""
+        crawl_id = job.object_id
+
+        for file_index, wacz_file in enumerate(wacz_files):
+            if file_index < job.filesDone:
+                continue
+
+            page_dicts: List[Dict[str, Any]] = []
+            num_records = 0
+
+            stream = self.storage_ops.stream_wacz_pages(
+                org, wacz_file, job.membersDone, job.recordsDone
+            )
+            async for member_index, page_dict in stream:
+                if member_index != job.membersDone:
+                    await self._add_ingested_pages(
+                        job, page_dicts, num_records, save_progress
+                    )
+                    page_dicts = []
+                    num_records = 0
+                    job.membersDone = member_index
+                    job.recordsDone = 0
+
+                # id derived from position if missing, so pages re-added
+                # after resuming are ignored as duplicates
+                if not page_dict.get("id"):
+                    position = f"{member_index}/{job.recordsDone + num_records}"
+                    page_dict["id"] = uuid5(
+                        NAMESPACE_URL, f"{crawl_id}/{wacz_file.filename}/{position}"
+                    )
+
+                num_records += 1
+                if page_dict.get("url"):
+                    page_dicts.append(page_dict)
+
+                if num_records >= PAGE_INSERT_BATCH_SIZE:
+                    await self._add_ingested_pages(
+                        job, page_dicts, num_records, save_progress
+                    )
+                    page_dicts = []
+                    num_records = 0
+
+            await self._add_ingested_pages(job, page_dicts, num_records, save_progress)
+
+            job.filesDone = file_index + 1
+            job.membersDone = 0
+            job.recordsDone = 0
+            await save_progress(job)
+
+    async def _add_ingested_pages(
+        self,
+        job: IngestPagesJob,
+        page_dicts: List[Dict[str, Any]],
+        num_records: int,
+        save_progress: Callable[[IngestPagesJob], Awaitable[None]],
+    ):
+        """add batch of pages, then save position after records read.
+        Pages already added before resuming are counted, but not re-added.
+        Raises if pages could not be added, so that batch is retried"""
+        if not num_records:
+            return
+
+        job.pagesAdded += await self.add_pages_to_db(
+            page_dicts, job.object_id, job.oid, raise_errors=True
+        )
+        job.recordsDone += num_records
+        await save_progress(job)
+
     async def add_page_to_db(self, page_dict: Dict[str, Any], crawl_id: str, oid: UUID):
         """Add page to database"""
+        page = self._get_page_from_dict(page_dict, crawl_id, oid)
+        if not page:
+            return
+
+        try:
+            await self.pages.insert_one(
+                page.to_dict(
+                    exclude_unset=True, exclude_none=True, exclude_defaults=True
+                )
+            )
+        except pymongo.errors.DuplicateKeyError:
+            return
+        # pylint: disable=broad-except
+        except Exception as err:
+            print(
+                f"Error adding page {page.id} from crawl {crawl_id} to db: {err}",
+                flush=True,
+            )
+
+    # pylint: disable=too-many-locals
+    async def add_pages_to_db(
+        self,
+        page_dicts: List[Dict[str, Any]],
+        crawl_id: str,
+        oid: UUID,
+        batch_size: int = PAGE_INSERT_BATCH_SIZE,
+        raise_errors: bool = False,
+    ) -> int:
+        """Add multiple pages to database with unordered bulk inserts,
+        ignoring pages that were already added. Returns number of pages added,
+        including pages that were already added.
+
+        If raise_errors, errors other than duplicates are raised after
+        the rest of the batch is inserted, so that pages can be re-added"""
+        added = 0
+        for start in range(0, len(page_dicts), batch_size):
+            docs = []
+            for page_dict in page_dicts[start : start + batch_size]:
+                page = self._get_page_from_dict(page_dict, crawl_id, oid)
+                if page:
+                    docs.append(
+                        page.to_dict(
+                            exclude_unset=True, exclude_none=True, exclude_defaults=True
+                        )
+                    )
+
+            if not docs:
+                continue
+
+            try:
+                res = await self.pages.insert_many(docs, ordered=False)
+                added += len(res.inserted_ids)
+            except pymongo.errors.BulkWriteError as bwe:
+                details = bwe.details or {}
+                # ignore duplicates, eg. if pages are re-added on retry
+                write_errors = [
+                    write_error
+                    for write_error in details.get("writeErrors", [])
+                    if write_error.get("code") != 11000
+                ]
+                added += len(docs) - len(write_errors)
+                for write_error in write_errors:
+                    print(
+                        f"Error adding page from crawl {crawl_id} to db: "
+                        + str(write_error.get("errmsg")),
+                        flush=True,
+                    )
+                if write_errors and raise_errors:
+                    raise
+            # pylint: disable=broad-except
+            except Exception as err:
+                if raise_errors:
+                    raise
+                print(
+                    f"Error adding {len(docs)} pages from crawl {crawl_id} to db: {err}",
+                    flush=True,
+                )
+
+        return added
+
+    def _get_page_from_dict(
+        self, page_dict: Dict[str, Any], crawl_id: str, oid: UUID
+    ) -> Optional[Page]:
+        """Return Page object from dict as stored in redis or WACZ pages.jsonl"""
         page_id = page_dict.get("id")
         if not page_id:
             print(f'Page {page_dict.get("url")} has no id - assigning UUID', flush=True)
@@ -73,7 +250,7 @@ class PageOps:
             status = page_dict.get("status")
             if not status and page_dict.get("loadState"):
                 status = 200
-            page = Page(
+            return Page(
                 id=page_id,
                 oid=oid,
                 crawl_id=crawl_id,
@@ -87,19 +264,13 @@ class PageOps:
                     else datetime.now()
                 ),
             )
-            await self.pages.insert_one(
-                page.to_dict(
-                    exclude_unset=True, exclude_none=True, exclude_defaults=True
-                )
-            )
-        except pymongo.errors.DuplicateKeyError:
-            return
         # pylint: disable=broad-except
         except Exception as err:
             print(
                 f"Error adding page {page_id} from crawl {crawl_id} to db: {err}",
                 flush=True,
             )
+            return None
 
     async def delete_crawl_pages(self, crawl_id: str, oid: Optional[UUID] = None):
         """Delete crawl pages from db"""
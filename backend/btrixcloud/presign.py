@@ -0,0 +1,90 @@
+"""
+Offline SigV4 presigning of s3 GET urls
+"""
+
+import hashlib
+import hmac
+
+from datetime import datetime
+from typing import Optional
+from urllib.parse import quote, urlsplit
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+# ============================================================================
+# pylint: disable=too-few-public-methods, too-many-instance-attributes
+class S3Presigner:
+    """presign GET urls for objects under an s3 endpoint + bucket url locally,
+    with SigV4 query auth, as generated by botocore for path-style urls.
+    The signing key is derived once per day"""
+
+    def __init__(
+        self, endpoint_url: str, region: str, access_key: str, secret_key: str
+    ):
+        if not endpoint_url.endswith("/"):
+            endpoint_url += "/"
+
+        parts = urlsplit(endpoint_url)
+
+        self.base_url = parts.scheme + "://" + parts.netloc
+
+        # same as botocore, default port not included in signed host
+        if parts.port and DEFAULT_PORTS.get(parts.scheme) == parts.port:
+            self.host = parts.hostname or ""
+        else:
+            self.host = parts.netloc
+
+        # bucket and any key prefix, as in endpoint url
+        self.path = parts.path
+
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+
+        self._signing_date: Optional[str] = None
+        self._signing_key = b""
+
+    def _get_signing_key(self, date: str) -> bytes:
+        if date != self._signing_date:
+            key = ("AWS4" + self.secret_key).encode("utf-8")
+            for value in (date, self.region, "s3", "aws4_request"):
+                key = hmac.new(key, value.encode("utf-8"), hashlib.sha256).digest()
+
+            self._signing_key = key
+            self._signing_date = date
+
+        return self._signing_key
+
+    def presign(self, filename: str, expires: int, now: datetime) -> str:
+        """return presigned url for filename relative to endpoint url,
+        valid for expires seconds from now (utc)"""
+        path = quote(self.path + filename, safe="/~")
+
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+        scope = f"{date}/{self.region}/s3/aws4_request"
+
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(self.access_key + '/' + scope, safe='-_.~')}"
+            f"&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={expires}"
+            "&X-Amz-SignedHeaders=host"
+        )
+
+        canonical_request = (
+            f"GET\n{path}\n{query}\nhost:{self.host}\n\nhost\nUNSIGNED-PAYLOAD"
+        )
+
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n"
+            + hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+        )
+
+        signature = hmac.new(
+            self._get_signing_key(date), string_to_sign.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+        return f"{self.base_url}{path}?{query}&X-Amz-Signature={signature}"
@@ -2,53 +2,74 @@
 Storage API
 """
 
+# pylint: disable=too-many-lines
+
 from typing import (
     Optional,
-    Iterator,
-    Iterable,
     List,
     Dict,
+    AsyncGenerator,
     AsyncIterator,
     TYPE_CHECKING,
     Any,
+    Tuple,
 )
 from urllib.parse import urlsplit
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, AsyncExitStack
 
 import asyncio
-import heapq
+import base64
+import zipfile
 import zlib
 import json
-import itertools
 import os
+import time
 
 from datetime import datetime
 
 from fastapi import Depends, HTTPException
-from stream_zip import stream_zip, NO_COMPRESSION_64
 
 import aiobotocore.session
-import boto3
+from aiobotocore.config import AioConfig
 
-from mypy_boto3_s3.client import S3Client
-from mypy_boto3_s3.type_defs import CompletedPartTypeDef
+from types_aiobotocore_s3.type_defs import CompletedPartTypeDef
 from types_aiobotocore_s3 import S3Client as AIOS3Client
 
 from .models import (
+    BaseFile,
     CrawlFile,
     CrawlFileOut,
+    CrawlLogBlock,
+    CrawlLogIndex,
+    CrawlLogMember,
     Organization,
     StorageRef,
     S3Storage,
     S3StorageIn,
     OrgStorageRefs,
+    ZipIndex,
 )
 from .zip import (
-    sync_get_zip_file,
-    sync_get_filestream,
+    fetch_member_data_offset,
+    fetch_stream,
+    fetch_zip_index,
+    get_filestream,
+    get_json_records,
+    iter_member,
+    iter_offsets,
+    iter_ranges,
+    stream_stored_zip,
 )
 
-from .utils import is_bool, slug_from_name
+from .presign import S3Presigner
+from .utils import (
+    dt_now,
+    is_bool,
+    merge_sorted_async,
+    read_ahead_async,
+    slug_from_name,
+    start_read_ahead,
+)
 
 
 if TYPE_CHECKING:
@@ -59,9 +80,150 @@ else:
 
 CHUNK_SIZE = 1024 * 256
 
+# max keys in single DeleteObjects request
+DELETE_OBJECTS_MAX_KEYS = 1000
+
+
+# ============================================================================
+# pylint: disable=broad-except,raise-missing-from,too-few-public-methods
+class S3ClientEntry:
+    """pooled s3 client, with number of callers currently using it"""
+
+    def __init__(self, client: AIOS3Client, exit_stack: AsyncExitStack):
+        self.client = client
+        self.exit_stack = exit_stack
+        self.last_used = time.monotonic()
+        self.active = 0
+        self.evicted = False
+
+    async def close(self) -> None:
+        """close client and its connection pool"""
+        try:
+            await self.exit_stack.aclose()
+        except Exception as exc:
+            print(f"Error closing s3 client: {exc}", flush=True)
+
+
+# ============================================================================
+# pylint: disable=too-many-instance-attributes
+class S3ClientRegistry:
+    """Registry of persistent s3 clients, one per endpoint, region and
+    credentials, each with its own connection pool, shared by all callers"""
+
+    def __init__(self):
+        # max connections in each client's pool
+        self.max_pool_connections = int(os.environ.get("S3_MAX_POOL_CONNECTIONS") or 50)
+
+        # seconds after which an unused client is closed and removed
+        self.max_idle_secs = int(os.environ.get("S3_CLIENT_IDLE_SECS") or 600)
+
+        self.session = aiobotocore.session.get_session()
+
+        self.clients: dict[tuple[str, str, str, str], S3ClientEntry] = {}
+
+        self.lock = asyncio.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._last_sweep = time.monotonic()
+
+    @asynccontextmanager
+    async def get_client(
+        self, endpoint_url: str, region: str, access_key: str, secret_key: str
+    ) -> AsyncIterator[AIOS3Client]:
+        """use pooled client for endpoint and credentials, creating if needed"""
+        key = (endpoint_url, region, access_key, secret_key)
+
+        async with self.lock:
+            now = time.monotonic()
+            await self._evict_idle(now)
+
+            entry = self.clients.get(key)
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+                entry = await self._create_client(*key)
+                self.clients[key] = entry
+
+            entry.active += 1
+            entry.last_used = now
+
+        try:
+            yield entry.client
+        finally:
+            entry.active -= 1
+            entry.last_used = time.monotonic()
+            # evicted while in use, close once last caller is done
+            if entry.evicted and not entry.active:
+                await entry.close()
+
+    async def _create_client(
+        self, endpoint_url: str, region: str, access_key: str, secret_key: str
+    ) -> S3ClientEntry:
+        exit_stack = AsyncExitStack()
+        client = await exit_stack.enter_async_context(
+            self.session.create_client(
+                "s3",
+                region_name=region,
+                endpoint_url=endpoint_url,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                config=AioConfig(max_pool_connections=self.max_pool_connections),
+            )
+        )
+        return S3ClientEntry(client, exit_stack)
+
+    async def evict(self, access_key: str, secret_key: str) -> None:
+        """close and remove all clients using these credentials,
+        eg. when custom storage is changed or removed"""
+        for key, entry in list(self.clients.items()):
+            if key[2:] == (access_key, secret_key):
+                await self._evict(key, entry)
+
+    async def close_all(self) -> None:
+        """close all clients, eg. on shutdown"""
+        for key, entry in list(self.clients.items()):
+            await self._evict(key, entry)
+
+    async def _evict(self, key, entry: S3ClientEntry) -> None:
+        if self.clients.get(key) is not entry:
+            return
+
+        del self.clients[key]
+        self.evictions += 1
+        entry.evicted = True
+        if not entry.active:
+            await entry.close()
+
+    async def _evict_idle(self, now: float) -> None:
+        """evict clients not used for max_idle_secs, checked at most
+        once a minute"""
+        if now - self._last_sweep < 60:
+            return
+
+        self._last_sweep = now
+
+        for key, entry in list(self.clients.items()):
+            if not entry.active and now - entry.last_used > self.max_idle_secs:
+                await self._evict(key, entry)
+
+    def get_stats(self) -> dict[str, int]:
+        """return registry stats"""
+        return {
+            "clients": len(self.clients),
+            "active": sum(entry.active for entry in self.clients.values()),
+            "maxPoolConnections": self.max_pool_connections,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
 
 # ============================================================================
-# pylint: disable=broad-except,raise-missing-from
+# pylint: disable=too-many-public-methods
 class StorageOps:
     """All storage handling, download/upload operations"""
 
@@ -80,6 +242,28 @@ class StorageOps:
 
         self.is_local_minio = is_bool(os.environ.get("IS_LOCAL_MINIO"))
 
+        self.s3_clients = S3ClientRegistry()
+
+        # parts uploaded concurrently for each multipart upload
+        self.upload_parts_in_flight = int(os.environ.get("UPLOAD_PARTS_IN_FLIGHT") or 4)
+
+        # (endpoint url, region, access key, secret key) -> presigner
+        self.presigners: dict[tuple[str, str, str, str], S3Presigner] = {}
+
+        # members fetched ahead of the member being streamed, and max data
+        # buffered for each, per collection download
+        self.download_prefetch_members = int(
+            os.environ.get("DOWNLOAD_PREFETCH_MEMBERS") or 2
+        )
+        self.download_prefetch_bytes = int(
+            os.environ.get("DOWNLOAD_PREFETCH_BYTES") or 4 * 1024 * 1024
+        )
+
+        # max compressed log data read ahead per log download, across instances
+        self.log_read_ahead_bytes = int(
+            os.environ.get("LOG_READ_AHEAD_BYTES") or 16 * 1024 * 1024
+        )
+
         with open(os.environ["STORAGES_JSON"], encoding="utf-8") as fh:
             storage_list = json.loads(fh.read())
 
@@ -168,9 +352,14 @@ class StorageOps:
             use_access_for_presign=True,
         )
 
+        # start with new clients for these credentials, and don't keep
+        # clients around if not verified
+        await self.s3_clients.evict(storage.access_key, storage.secret_key)
+
         try:
             await self.verify_storage_upload(storage, ".btrix-upload-verify")
         except:
+            await self.s3_clients.evict(storage.access_key, storage.secret_key)
             raise HTTPException(
                 status_code=400,
                 detail="Could not verify custom storage. Check credentials are valid?",
@@ -210,10 +399,18 @@ class StorageOps:
         )
 
         try:
-            del org.customStorages[name]
+            storage = org.customStorages.pop(name)
         except:
             raise HTTPException(status_code=400, detail="no_such_storage")
 
+        await self.s3_clients.evict(storage.access_key, storage.secret_key)
+
+        self.presigners = {
+            key: presigner
+            for key, presigner in self.presigners.items()
+            if key[2:] != (storage.access_key, storage.secret_key)
+        }
+
         await self.org_ops.update_custom_storages(org)
 
         return {"deleted": True}
@@ -266,45 +463,14 @@ class StorageOps:
 
         endpoint_url = parts.scheme + "://" + parts.netloc
 
-        session = aiobotocore.session.get_session()
-
-        async with session.create_client(
-            "s3",
-            region_name=storage.region,
-            endpoint_url=endpoint_url,
-            aws_access_key_id=storage.access_key,
-            aws_secret_access_key=storage.secret_key,
+        async with self.s3_clients.get_client(
+            endpoint_url, storage.region, storage.access_key, storage.secret_key
         ) as client:
             yield client, bucket, key
 
-    @asynccontextmanager
-    async def get_sync_client(
-        self, org: Organization
-    ) -> AsyncIterator[tuple[S3Client, str, str]]:
-        """context manager for s3 client"""
-        storage = self.get_org_primary_storage(org)
-
-        endpoint_url = storage.endpoint_url
-
-        if not endpoint_url.endswith("/"):
-            endpoint_url += "/"
-
-        parts = urlsplit(endpoint_url)
-        bucket, key = parts.path[1:].split("/", 1)
-
-        endpoint_url = parts.scheme + "://" + parts.netloc
-
-        try:
-            client = boto3.client(
-                "s3",
-                region_name=storage.region,
-                endpoint_url=endpoint_url,
-                aws_access_key_id=storage.access_key,
-                aws_secret_access_key=storage.secret_key,
-            )
-            yield client, bucket, key
-        finally:
-            client.close()
+    async def close(self) -> None:
+        """close pooled s3 clients, eg. on shutdown"""
+        await self.s3_clients.close_all()
 
     async def verify_storage_upload(self, storage: S3Storage, filename: str) -> None:
         """Test credentials and storage endpoint by uploading an empty test file"""
@@ -338,11 +504,13 @@ class StorageOps:
             return org.storageReplicas
         return self.default_replicas
 
-    def get_org_storage_by_ref(self, org: Organization, ref: StorageRef) -> S3Storage:
+    def get_org_storage_by_ref(
+        self, org: Optional[Organization], ref: StorageRef
+    ) -> S3Storage:
         """Get a storage object from StorageRef"""
         if not ref.custom:
             s3storage = self.default_storages.get(ref.name)
-        elif not org.storage:
+        elif not org or not org.storage:
             raise KeyError(
                 f"Referencing custom org storage: {ref.name}, but no custom storage found!"
             )
@@ -377,10 +545,15 @@ class StorageOps:
         filename: str,
         file_: AsyncIterator,
         min_size: int,
+        parts_in_flight: Optional[int] = None,
     ) -> bool:
-        """do upload to specified key using multipart chunking"""
+        """do upload to specified key using multipart chunking, uploading up to
+        parts_in_flight parts concurrently while reading the next part.
+        At most parts_in_flight parts of min_size (or just over) are buffered"""
         s3storage = self.get_org_primary_storage(org)
 
+        parts_in_flight = parts_in_flight or self.upload_parts_in_flight
+
         async def get_next_chunk(file_, min_size) -> bytes:
             total = 0
             bufs = []
@@ -405,13 +578,17 @@ class StorageOps:
 
             upload_id = mup_resp["UploadId"]
 
-            parts = []
-            part_number = 1
+            # released when each part is uploaded, to read next part
+            semaphore = asyncio.Semaphore(parts_in_flight)
 
-            try:
-                while True:
-                    chunk = await get_next_chunk(file_, min_size)
+            tasks: List[asyncio.Task] = []
 
+            uploaded = 0
+
+            async def upload_part(part_number: int, chunk: bytes):
+                nonlocal uploaded
+
+                try:
                     resp = await client.upload_part(
                         Bucket=bucket,
                         Body=chunk,
@@ -419,24 +596,52 @@ class StorageOps:
                         PartNumber=part_number,
                         Key=key,
                     )
+                finally:
+                    semaphore.release()
 
-                    print(
-                        f"part added: {part_number} {len(chunk)} {upload_id}",
-                        flush=True,
-                    )
+                uploaded += len(chunk)
+
+                print(
+                    f"part added: {part_number} {len(chunk)} {upload_id}, "
+                    f"{uploaded} bytes uploaded",
+                    flush=True,
+                )
 
-                    part: CompletedPartTypeDef = {
-                        "PartNumber": part_number,
-                        "ETag": resp["ETag"],
-                    }
+                part: CompletedPartTypeDef = {
+                    "PartNumber": part_number,
+                    "ETag": resp["ETag"],
+                }
+                return part
 
-                    parts.append(part)
+            try:
+                part_number = 1
+
+                while True:
+                    await semaphore.acquire()
 
-                    part_number += 1
+                    # stop reading on first failed part
+                    for task in tasks:
+                        error = task.exception() if task.done() else None
+                        if error:
+                            raise error
+
+                    chunk = await get_next_chunk(file_, min_size)
+
+                    # skip empty last part, unless it's the only part
+                    if chunk or part_number == 1:
+                        tasks.append(
+                            asyncio.create_task(upload_part(part_number, chunk))
+                        )
+                        part_number += 1
+                    else:
+                        semaphore.release()
 
                     if len(chunk) < min_size:
                         break
 
+                # parts in part number order
+                parts = await asyncio.gather(*tasks)
+
                 await client.complete_multipart_upload(
                     Bucket=bucket,
                     Key=key,
@@ -449,6 +654,11 @@ class StorageOps:
                 return True
             # pylint: disable=broad-exception-caught
             except Exception as exc:
+                for task in tasks:
+                    task.cancel()
+
+                await asyncio.gather(*tasks, return_exceptions=True)
+
                 await client.abort_multipart_upload(
                     Bucket=bucket, Key=key, UploadId=upload_id
                 )
@@ -458,22 +668,40 @@ class StorageOps:
 
                 return False
 
-    async def get_presigned_url(
-        self, org: Organization, crawlfile: CrawlFile, duration=3600
-    ) -> str:
-        """generate pre-signed url for crawl file"""
+    def get_presigner(self, storage: S3Storage) -> S3Presigner:
+        """get cached presigner for storage endpoint used for presigning"""
+        endpoint_url = (
+            storage.access_endpoint_url
+            if storage.use_access_for_presign
+            else storage.endpoint_url
+        )
 
-        s3storage = self.get_org_storage_by_ref(org, crawlfile.storage)
+        key = (endpoint_url, storage.region, storage.access_key, storage.secret_key)
+        presigner = self.presigners.get(key)
+        if not presigner:
+            presigner = S3Presigner(*key)
+            self.presigners[key] = presigner
 
-        async with self.get_s3_client(s3storage, s3storage.use_access_for_presign) as (
-            client,
-            bucket,
-            key,
-        ):
-            key += crawlfile.filename
+        return presigner
 
-            presigned_url = await client.generate_presigned_url(
-                "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=duration
+    def get_presigned_urls(
+        self,
+        org: Optional[Organization],
+        crawlfiles: List[CrawlFile],
+        duration=3600,
+        now: Optional[datetime] = None,
+    ) -> List[str]:
+        """generate pre-signed urls for crawl files, valid for duration
+        seconds from now, signed locally without any s3 requests"""
+        now = now or dt_now()
+
+        presigned_urls = []
+
+        for crawlfile in crawlfiles:
+            s3storage = self.get_org_storage_by_ref(org, crawlfile.storage)
+
+            presigned_url = self.get_presigner(s3storage).presign(
+                crawlfile.filename, duration, now
             )
 
             if (
@@ -485,7 +713,9 @@ class StorageOps:
                     s3storage.endpoint_url, s3storage.access_endpoint_url
                 )
 
-        return presigned_url
+            presigned_urls.append(presigned_url)
+
+        return presigned_urls
 
     async def delete_crawl_file_object(
         self, org: Organization, crawlfile: CrawlFile
@@ -512,89 +742,156 @@ class StorageOps:
 
         return status_code == 204
 
-    async def sync_stream_pages_from_wacz(
+    async def delete_file_objects(
+        self, org: Optional[Organization], files: List[BaseFile]
+    ) -> Dict[str, str]:
+        """delete files from storage with DeleteObjects requests of up to
+        DELETE_OBJECTS_MAX_KEYS keys per storage.
+        Returns error for each filename that could not be deleted"""
+        files_by_storage: Dict[str, List[BaseFile]] = {}
+        for file_ in files:
+            files_by_storage.setdefault(str(file_.storage), []).append(file_)
+
+        errors: Dict[str, str] = {}
+
+        for storage_files in files_by_storage.values():
+            s3storage = self.get_org_storage_by_ref(org, storage_files[0].storage)
+
+            async with self.get_s3_client(
+                s3storage, s3storage.use_access_for_presign
+            ) as (client, bucket, key):
+                for start in range(0, len(storage_files), DELETE_OBJECTS_MAX_KEYS):
+                    filenames = [
+                        file_.filename
+                        for file_ in storage_files[
+                            start : start + DELETE_OBJECTS_MAX_KEYS
+                        ]
+                    ]
+                    try:
+                        response = await client.delete_objects(
+                            Bucket=bucket,
+                            Delete={
+                                "Objects": [
+                                    {"Key": key + filename} for filename in filenames
+                                ],
+                                "Quiet": True,
+                            },
+                        )
+                    except Exception as exc:
+                        print(f"Error deleting files: {exc}", flush=True)
+                        errors.update({filename: str(exc) for filename in filenames})
+                        continue
+
+                    # only keys that could not be deleted are returned when quiet
+                    for error in response.get("Errors", []):
+                        filename = error.get("Key", "")[len(key) :]
+                        errors[filename] = (
+                            f"{error.get('Code')}: {error.get('Message')}"
+                        )
+
+        return errors
+
+    async def get_wacz_zip_index(
+        self, org: Organization, crawlfile: CrawlFile
+    ) -> Optional[ZipIndex]:
+        """fetch central directory of WACZ to store with crawl file,
+        so that members can later be read with a single range request"""
+        s3storage = self.get_org_storage_by_ref(org, crawlfile.storage)
+
+        try:
+            async with self.get_s3_client(s3storage) as (client, bucket, key):
+                return await fetch_zip_index(client, bucket, key + crawlfile.filename)
+
+        # pylint: disable=broad-exception-caught
+        except Exception as exc:
+            print(
+                f"Error reading zip index for {crawlfile.filename}: {exc}", flush=True
+            )
+            return None
+
+    async def stream_pages_from_wacz(
         self,
         org: Organization,
         wacz_files: List[CrawlFile],
-    ) -> Iterator[Dict[Any, Any]]:
+    ) -> AsyncIterator[Dict[Any, Any]]:
         """Return stream of page dicts from last of WACZs"""
-        async with self.get_sync_client(org) as (client, bucket, key):
-            loop = asyncio.get_event_loop()
-
-            stream = await loop.run_in_executor(
-                None,
-                self._sync_get_pages,
-                wacz_files,
-                client,
-                bucket,
-                key,
-            )
-
-            return stream
+        for wacz_file in wacz_files:
+            async for _, page_dict in self.stream_wacz_pages(org, wacz_file):
+                yield page_dict
 
-    async def sync_stream_wacz_logs(
+    async def stream_wacz_pages(
         self,
         org: Organization,
-        wacz_files: List[CrawlFile],
-        log_levels: List[str],
-        contexts: List[str],
-    ) -> Iterator[bytes]:
-        """Return filtered stream of logs from specified WACZs sorted by timestamp"""
-        async with self.get_sync_client(org) as (client, bucket, key):
-            loop = asyncio.get_event_loop()
-
-            resp = await loop.run_in_executor(
-                None,
-                self._sync_get_logs,
-                wacz_files,
-                log_levels,
-                contexts,
-                client,
-                bucket,
-                key,
+        wacz_file: CrawlFile,
+        start_member: int = 0,
+        start_record: int = 0,
+    ) -> AsyncIterator[Tuple[int, Dict[Any, Any]]]:
+        """Return stream of page dicts from pages/*.jsonl members of a WACZ,
+        with index of member for each, starting from start_record of
+        start_member. Records are read from each member as a stream"""
+        s3storage = self.get_org_primary_storage(org)
+
+        async with self.get_s3_client(s3storage) as (client, bucket, key):
+            wacz_key = key + wacz_file.filename
+            zip_index = wacz_file.zipIndex or await fetch_zip_index(
+                client, bucket, wacz_key
             )
 
-            return resp
+            page_entries = [
+                entry
+                for entry in zip_index.entries
+                if entry.name.startswith("pages/") and entry.name.endswith(".jsonl")
+            ]
+            for member_index, page_entry in enumerate(page_entries):
+                if member_index < start_member:
+                    continue
 
-    def _sync_get_logs(
-        self,
-        wacz_files: List[CrawlFile],
-        log_levels: List[str],
-        contexts: List[str],
-        client,
-        bucket: str,
-        key: str,
-    ) -> Iterator[bytes]:
-        """Generate filtered stream of logs from specified WACZs sorted by timestamp"""
-
-        # pylint: disable=too-many-function-args
-        def stream_log_lines(
-            wacz_key, wacz_filename, cd_start, log_zipinfo
-        ) -> Iterator[dict]:
-            """Pass lines as json objects"""
+                skip = start_record if member_index == start_member else 0
 
-            print(
-                f"Fetching log {log_zipinfo.filename} from {wacz_filename}", flush=True
-            )
+                print(
+                    f"Fetching JSON lines from {page_entry.name} in {wacz_file.filename}",
+                    flush=True,
+                )
 
-            line_iter: Iterator[bytes] = sync_get_filestream(
-                client, bucket, wacz_key, log_zipinfo, cd_start
-            )
+                async for page_dict in get_json_records(
+                    client, bucket, wacz_key, zip_index, page_entry
+                ):
+                    if skip:
+                        skip -= 1
+                        continue
 
-            for line in line_iter:
-                yield _parse_json(line.decode("utf-8", errors="ignore"))
+                    yield member_index, page_dict
 
-        def stream_json_lines(
-            iterator: Iterable[dict], log_levels: List[str], contexts: List[str]
-        ) -> Iterator[bytes]:
-            """Yield parsed JSON dicts as JSON-lines bytes after filtering as necessary"""
-            for line_dict in iterator:
-                if log_levels and line_dict["logLevel"] not in log_levels:
-                    continue
-                if contexts and line_dict["context"] not in contexts:
-                    continue
-                json_str = json.dumps(line_dict, ensure_ascii=False) + "\n"
-                yield json_str.encode("utf-8")
+    # pylint: disable=too-many-arguments, too-many-locals, too-many-statements
+    # pylint: disable=too-many-branches
+    async def stream_wacz_logs(
+        self,
+        org: Organization,
+        wacz_files: List[CrawlFile],
+        log_levels: List[str],
+        contexts: List[str],
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        log_index: Optional[CrawlLogIndex] = None,
+    ) -> AsyncIterator[bytes]:
+        """Return filtered stream of logs from specified WACZs sorted by timestamp.
+
+        after may be a timestamp, to return lines after that time, or a cursor
+        from a previous page, to return lines after that line. If limit is
+        set, each line includes a cursor to request the next page from.
+
+        If log_index is provided, only log blocks that may match the filters
+        are read, and logs with no matching blocks are not fetched at all.
+        Blocks of uncompressed logs are fetched with range requests"""
+
+        cursor: Optional[LogLineKey] = None
+        after_ts = after
+        if after:
+            try:
+                cursor = parse_log_cursor(after)
+                after_ts = cursor[0]
+            except ValueError:
+                pass
 
         def organize_based_on_instance_number(
             wacz_files: List[CrawlFile],
@@ -612,87 +909,175 @@ class StorageOps:
                     waczs_groups[instance_number] = [file]
             return list(waczs_groups.values())
 
-        log_generators: List[Iterator[dict]] = []
-
-        waczs_groups = organize_based_on_instance_number(wacz_files)
-        for instance_list in waczs_groups:
-            wacz_log_streams: List[Iterator[dict]] = []
-
+        async def stream_instance_log_data(
+            instance_list: List[CrawlFile], client, bucket: str, key: str
+        ) -> AsyncGenerator[Tuple[str, str, int, bytes], None]:
+            """Stream uncompressed log data from each WACZ of one instance,
+            as (filename, member, offset, chunk) with offset of chunk in log"""
             for wacz_file in instance_list:
                 wacz_key = key + wacz_file.filename
-                cd_start, zip_file = sync_get_zip_file(client, bucket, wacz_key)
+                zip_index = wacz_file.zipIndex or await fetch_zip_index(
+                    client, bucket, wacz_key
+                )
 
-                log_files = [
-                    f
-                    for f in zip_file.filelist
-                    if f.filename.startswith("logs/") and not f.is_dir()
+                log_entries = [
+                    entry
+                    for entry in zip_index.entries
+                    if entry.name.startswith("logs/")
                 ]
-                log_files.sort(key=lambda log_zipinfo: log_zipinfo.filename)
+                log_entries.sort(key=lambda entry: entry.name)
 
-                for log_zipinfo in log_files:
-                    wacz_log_streams.append(
-                        stream_log_lines(
-                            wacz_key, wacz_file.filename, cd_start, log_zipinfo
-                        )
+                for log_entry in log_entries:
+                    member = (
+                        log_index.get_member(wacz_file.filename, log_entry.name)
+                        if log_index
+                        else None
                     )
 
-            log_generators.append(itertools.chain(*wacz_log_streams))
+                    data: AsyncIterator[Tuple[int, bytes]]
+                    if not member:
+                        data = iter_offsets(
+                            iter_member(client, bucket, wacz_key, zip_index, log_entry)
+                        )
+                    else:
+                        ranges = _merge_ranges(
+                            [
+                                (block.offset, block.length)
+                                for block in member.blocks
+                                if block.matches(
+                                    log_levels, contexts, after_ts, bool(cursor)
+                                )
+                            ]
+                        )
+                        if not ranges:
+                            continue
+
+                        if log_entry.method == zipfile.ZIP_STORED:
+                            data = _fetch_stored_ranges(
+                                client, bucket, wacz_key, log_entry, ranges
+                            )
+                        else:
+                            data = iter_ranges(
+                                iter_member(
+                                    client, bucket, wacz_key, zip_index, log_entry
+                                ),
+                                ranges,
+                            )
 
-        heap_iter = heapq.merge(*log_generators, key=lambda entry: entry["timestamp"])
+                    print(
+                        f"Fetching log {log_entry.name} from {wacz_file.filename}",
+                        flush=True,
+                    )
 
-        return stream_json_lines(heap_iter, log_levels, contexts)
+                    async for offset, chunk in data:
+                        yield wacz_file.filename, log_entry.name, offset, chunk
 
-    def _sync_get_pages(
-        self,
-        wacz_files: List[CrawlFile],
-        client,
-        bucket: str,
-        key: str,
-    ) -> Iterator[Dict[Any, Any]]:
-        """Generate stream of page dicts from specified WACZs"""
-
-        # pylint: disable=too-many-function-args
-        def stream_page_lines(
-            wacz_key, wacz_filename, cd_start, pagefile_zipinfo
-        ) -> Iterator[Dict[Any, Any]]:
-            """Pass lines as json objects"""
-            print(
-                f"Fetching JSON lines from {pagefile_zipinfo.filename} in {wacz_filename}",
-                flush=True,
-            )
+        s3storage = self.get_org_primary_storage(org)
 
-            line_iter: Iterator[bytes] = sync_get_filestream(
-                client, bucket, wacz_key, pagefile_zipinfo, cd_start
-            )
-            for line in line_iter:
-                yield _parse_json(line.decode("utf-8", errors="ignore"))
+        waczs_groups = organize_based_on_instance_number(wacz_files)
 
-        page_generators: List[Iterator[Dict[Any, Any]]] = []
+        # split read ahead cap between instances, each reading ahead
+        # concurrently so its next chunks are ready when the merge needs them
+        read_ahead = self.log_read_ahead_bytes // (
+            CHUNK_SIZE * max(len(waczs_groups), 1)
+        )
 
-        for wacz_file in wacz_files:
-            wacz_key = key + wacz_file.filename
-            cd_start, zip_file = sync_get_zip_file(client, bucket, wacz_key)
-
-            page_files = [
-                f
-                for f in zip_file.filelist
-                if f.filename.startswith("pages/")
-                and f.filename.endswith(".jsonl")
-                and not f.is_dir()
+        async with self.get_s3_client(s3storage) as (client, bucket, key):
+            data_streams: List[AsyncGenerator] = []
+            for instance_list in waczs_groups:
+                data = stream_instance_log_data(instance_list, client, bucket, key)
+                if read_ahead:
+                    data = read_ahead_async(data, read_ahead)
+                data_streams.append(data)
+
+            log_streams = [
+                _iter_log_records(_iter_log_lines(data)) for data in data_streams
             ]
-            for pagefile_zipinfo in page_files:
-                page_generators.append(
-                    stream_page_lines(
-                        wacz_key, wacz_file.filename, cd_start, pagefile_zipinfo
-                    )
+
+            count = 0
+
+            try:
+                # sorted by timestamp, then by position in logs
+                async for line_key, line_dict in merge_sorted_async(
+                    log_streams, key=lambda record: record[0]
+                ):
+                    if log_levels and line_dict.get("logLevel") not in log_levels:
+                        continue
+                    if contexts and line_dict.get("context") not in contexts:
+                        continue
+                    if cursor:
+                        if line_key <= cursor:
+                            continue
+                    elif after and line_key[0] <= after:
+                        continue
+
+                    if limit:
+                        line_dict["cursor"] = encode_log_cursor(line_key)
+
+                    json_str = json.dumps(line_dict, ensure_ascii=False) + "\n"
+                    yield json_str.encode("utf-8")
+
+                    count += 1
+                    if limit and count >= limit:
+                        break
+
+            finally:
+                # stop any read ahead before client is closed
+                for data in data_streams:
+                    await data.aclose()
+
+    async def get_wacz_log_index(
+        self, org: Organization, wacz_files: List[CrawlFile], block_size: int
+    ) -> List[CrawlLogMember]:
+        """Read all logs in WACZs once, summarizing each block of about
+        block_size bytes of lines"""
+        members = []
+
+        s3storage = self.get_org_primary_storage(org)
+
+        async with self.get_s3_client(s3storage) as (client, bucket, key):
+            for wacz_file in wacz_files:
+                wacz_key = key + wacz_file.filename
+                zip_index = wacz_file.zipIndex or await fetch_zip_index(
+                    client, bucket, wacz_key
                 )
 
-        return itertools.chain(*page_generators)
+                for entry in zip_index.entries:
+                    if not entry.name.startswith("logs/"):
+                        continue
+
+                    line_iter = get_filestream(
+                        client, bucket, wacz_key, zip_index, entry
+                    )
+                    members.append(
+                        CrawlLogMember(
+                            filename=wacz_file.filename,
+                            name=entry.name,
+                            blocks=await _get_log_blocks(line_iter, block_size),
+                        )
+                    )
+
+        return members
+
+    async def download_streaming_wacz(
+        self,
+        org: Organization,
+        all_files: List[CrawlFileOut],
+        prefetch_members: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """return an async iter for downloading a stream nested wacz file
+        from list of files.
+
+        Each file is read ahead while streamed, buffering up to
+        download_prefetch_bytes. The next prefetch_members files no larger
+        than that are also fetched in full while each file is streamed,
+        so that the latency of each request does not stall the download"""
+        if prefetch_members is None:
+            prefetch_members = self.download_prefetch_members
+
+        max_bytes = self.download_prefetch_bytes
+        max_chunks = max(max_bytes // CHUNK_SIZE, 1)
 
-    def _sync_dl(
-        self, all_files: List[CrawlFileOut], client: S3Client, bucket: str, key: str
-    ) -> Iterator[bytes]:
-        """generate streaming zip as sync"""
         for file_ in all_files:
             file_.path = file_.name
 
@@ -702,58 +1087,241 @@ class StorageOps:
         }
         datapackage_bytes = json.dumps(datapackage).encode("utf-8")
 
-        def get_file(name) -> Iterator[bytes]:
-            response = client.get_object(Bucket=bucket, Key=key + name)
-            return response["Body"].iter_chunks(chunk_size=CHUNK_SIZE)
+        async def get_file(
+            client, bucket: str, key: str, size: int
+        ) -> AsyncIterator[bytes]:
+            response = await client.get_object(Bucket=bucket, Key=key)
+            async with response["Body"] as body:
+                # read small files in one go, so a prefetched response
+                # is not left waiting to be read
+                if size <= max_bytes:
+                    yield await body.read()
+                    return
+
+                async for chunk in body.iter_chunks(chunk_size=CHUNK_SIZE):
+                    yield chunk
+
+        async def get_datapackage() -> AsyncIterator[bytes]:
+            yield datapackage_bytes
+
+        # file index -> (chunks, fetch task), for files being fetched
+        fetches: Dict[int, Tuple[AsyncIterator[bytes], asyncio.Task]] = {}
 
-        def member_files():
+        async def member_files(client, bucket: str, key: str):
             modified_at = datetime(year=1980, month=1, day=1)
             perms = 0o664
-            for file_ in all_files:
+            for index, file_ in enumerate(all_files):
+                # previous file fully streamed
+                fetches.pop(index - 1, None)
+
+                for ahead in range(index, index + prefetch_members + 1):
+                    if ahead >= len(all_files) or ahead in fetches:
+                        continue
+
+                    ahead_file = all_files[ahead]
+                    if ahead > index and ahead_file.size > max_bytes:
+                        continue
+
+                    fetches[ahead] = start_read_ahead(
+                        get_file(
+                            client, bucket, key + ahead_file.name, ahead_file.size
+                        ),
+                        max_chunks,
+                    )
+
                 yield (
                     file_.name,
                     modified_at,
                     perms,
-                    NO_COMPRESSION_64(file_.size, file_.crc32),
-                    get_file(file_.name),
+                    file_.size,
+                    file_.crc32,
+                    fetches[index][0],
                 )
 
             yield (
                 "datapackage.json",
                 modified_at,
                 perms,
-                NO_COMPRESSION_64(
-                    len(datapackage_bytes), zlib.crc32(datapackage_bytes)
-                ),
-                (datapackage_bytes,),
+                len(datapackage_bytes),
+                zlib.crc32(datapackage_bytes),
+                get_datapackage(),
             )
 
-        return stream_zip(member_files(), chunk_size=CHUNK_SIZE)
+        s3storage = self.get_org_primary_storage(org)
 
-    async def download_streaming_wacz(
-        self, org: Organization, files: List[CrawlFileOut]
-    ) -> Iterator[bytes]:
-        """return an iter for downloading a stream nested wacz file
-        from list of files"""
-        async with self.get_sync_client(org) as (client, bucket, key):
-            loop = asyncio.get_event_loop()
-
-            resp = await loop.run_in_executor(
-                None, self._sync_dl, files, client, bucket, key
-            )
+        async with self.get_s3_client(s3storage) as (client, bucket, key):
+            try:
+                async for chunk in stream_stored_zip(member_files(client, bucket, key)):
+                    yield chunk
+            finally:
+                # stop any fetches if download ended early, before client closed
+                tasks = [task for _, task in fetches.values()]
+                for task in tasks:
+                    task.cancel()
 
-            return resp
+                await asyncio.gather(*tasks, return_exceptions=True)
 
 
 # ============================================================================
-def _parse_json(line) -> dict:
-    """Parse JSON str into dict."""
-    parsed_json: Optional[dict] = None
+LogLineKey = Tuple[str, str, str, int]
+
+
+def encode_log_cursor(line_key: LogLineKey) -> str:
+    """encode (timestamp, filename, member, offset) of log line as cursor"""
+    return base64.urlsafe_b64encode(json.dumps(line_key).encode("utf-8")).decode()
+
+
+def parse_log_cursor(cursor: str) -> LogLineKey:
+    """parse log line cursor, raising ValueError if not a valid cursor"""
     try:
-        parsed_json = json.loads(line)
-    except json.JSONDecodeError as err:
-        print(f"Error decoding json-l line: {line}. Error: {err}", flush=True)
-    return parsed_json or {}
+        timestamp, filename, member, offset = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("utf-8"))
+        )
+        return str(timestamp), str(filename), str(member), int(offset)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("invalid_log_cursor") from exc
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """merge sorted (offset, length) ranges that are adjacent"""
+    merged: List[Tuple[int, int]] = []
+    for offset, length in ranges:
+        if merged and merged[-1][0] + merged[-1][1] == offset:
+            merged[-1] = (merged[-1][0], merged[-1][1] + length)
+        else:
+            merged.append((offset, length))
+    return merged
+
+
+async def _fetch_stored_ranges(
+    client, bucket: str, key: str, entry, ranges: List[Tuple[int, int]]
+) -> AsyncIterator[Tuple[int, bytes]]:
+    """fetch (offset, length) ranges of uncompressed member with a range
+    request each, yielding (offset, chunk) with offset of chunk in member"""
+    data_offset = await fetch_member_data_offset(client, bucket, key, entry)
+    for start, length in ranges:
+        offset = start
+        async for chunk in fetch_stream(
+            client, bucket, key, data_offset + start, length
+        ):
+            yield offset, chunk
+            offset += len(chunk)
+
+
+async def _iter_log_lines(
+    chunk_iter: AsyncIterator[Tuple[str, str, int, bytes]]
+) -> AsyncIterator[Tuple[str, str, int, bytes]]:
+    """Split stream of (filename, member, offset, chunk) into lines, yielding
+    (filename, member, offset, line) with offset of each line in its log.
+    A new line is started at the start of each log, and wherever the
+    stream skips ahead within a log"""
+    filename = member = ""
+    pos = 0
+    pending = b""
+    async for chunk_filename, chunk_member, offset, chunk in chunk_iter:
+        if (
+            chunk_filename != filename
+            or chunk_member != member
+            or offset != pos + len(pending)
+        ):
+            if pending:
+                yield filename, member, pos, pending
+
+            filename = chunk_filename
+            member = chunk_member
+            pos = offset
+            pending = b""
+
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", start) + 1
+            if not end:
+                break
+
+            yield filename, member, pos, pending[start:end]
+            pos += end - start
+            start = end
+
+        pending = pending[start:]
+
+    if pending:
+        yield filename, member, pos, pending
+
+
+async def _iter_log_records(
+    line_iter: AsyncIterator[Tuple[str, str, int, bytes]]
+) -> AsyncIterator[Tuple[LogLineKey, Dict[str, Any]]]:
+    """Parse log lines, yielding (key, line dict), keyed by timestamp
+    and position in logs"""
+    async for filename, member, offset, line in line_iter:
+        if not line.strip():
+            continue
+
+        try:
+            line_dict = json.loads(line)
+        except json.JSONDecodeError as err:
+            print(f"Error decoding json-l line: {line!r}. Error: {err}", flush=True)
+            continue
+
+        if isinstance(line_dict, dict):
+            timestamp = str(line_dict.get("timestamp", ""))
+            yield (timestamp, filename, member, offset), line_dict
+
+
+# ============================================================================
+async def _get_log_blocks(line_iter, block_size: int) -> List[CrawlLogBlock]:
+    """Split log lines into blocks of at least block_size bytes, except
+    the last, recording timestamp range, log levels and contexts of each"""
+    blocks: List[CrawlLogBlock] = []
+    offset = 0
+    length = 0
+    num_lines = 0
+    timestamps: List[str] = []
+    log_levels: Dict[str, bool] = {}
+    contexts: Dict[str, bool] = {}
+
+    def add_block():
+        blocks.append(
+            CrawlLogBlock(
+                offset=offset,
+                length=length,
+                lines=num_lines,
+                start=min(timestamps, default=""),
+                end=max(timestamps, default=""),
+                logLevels=list(log_levels),
+                contexts=list(contexts),
+            )
+        )
+
+    async for line in line_iter:
+        length += len(line)
+        num_lines += 1
+
+        try:
+            line_dict = json.loads(line)
+            if line_dict.get("timestamp"):
+                timestamps.append(line_dict["timestamp"])
+            if line_dict.get("logLevel"):
+                log_levels[line_dict["logLevel"]] = True
+            if line_dict.get("context"):
+                contexts[line_dict["context"]] = True
+        # pylint: disable=broad-exception-caught
+        except Exception:
+            pass
+
+        if length >= block_size:
+            add_block()
+            offset += length
+            length = num_lines = 0
+            timestamps = []
+            log_levels = {}
+            contexts = {}
+
+    if num_lines:
+        add_block()
+
+    return blocks
 
 
 # ============================================================================
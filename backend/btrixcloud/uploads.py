@@ -2,13 +2,15 @@
 
 import uuid
 import hashlib
+import io
 import os
 import base64
+import zlib
 from urllib.parse import unquote
 from uuid import UUID
 
 import asyncio
-from io import BufferedReader
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, List, Any
 from fastapi import Depends, UploadFile, File
 from fastapi import HTTPException
@@ -34,6 +36,15 @@ from .utils import dt_now
 
 MIN_UPLOAD_PART_SIZE = 10000000
 
+# upload data is hashed in batches of this size in HASH_EXECUTOR threads,
+# keeping sha256 and crc32 computation off the event loop
+HASH_BATCH_SIZE = 1024 * 1024
+
+HASH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("UPLOAD_HASH_THREADS") or 4),
+    thread_name_prefix="upload-hash",
+)
+
 
 # ============================================================================
 class UploadOps(BaseCrawlOps):
@@ -74,7 +85,7 @@ class UploadOps(BaseCrawlOps):
         async def stream_iter():
             """iterate over each chunk and compute and digest + total size"""
             async for chunk in stream:
-                file_prep.add_chunk(chunk)
+                await file_prep.add_chunk(chunk)
                 yield chunk
 
         print("Stream Upload Start", flush=True)
@@ -88,11 +99,11 @@ class UploadOps(BaseCrawlOps):
             print("Stream Upload Failed", flush=True)
             raise HTTPException(status_code=400, detail="upload_failed")
 
-        files = [file_prep.get_crawl_file(org.storage)]
+        files = [await file_prep.get_crawl_file(org.storage)]
 
         if prev_upload:
             try:
-                await self._delete_crawl_files(prev_upload, org)
+                await self._delete_crawl_files([prev_upload], org)
             # pylint: disable=broad-exception-caught
             except Exception as exc:
                 print("replace file deletion failed", exc)
@@ -123,12 +134,11 @@ class UploadOps(BaseCrawlOps):
 
         for upload in uploads:
             file_prep = FilePreparer(prefix, upload.filename)
-            file_reader = UploadFileReader(upload, file_prep)
 
             await self.storage_ops.do_upload_single(
-                org, file_reader.file_prep.upload_name, file_reader
+                org, file_prep.upload_name, file_prep.wrap_file(upload.file)
             )
-            files.append(file_reader.file_prep.get_crawl_file(org.storage))
+            files.append(await file_prep.get_crawl_file(org.storage))
 
         return await self._create_upload(
             files, name, description, collections, tags, str(id_), org, user
@@ -148,6 +158,9 @@ class UploadOps(BaseCrawlOps):
         now = dt_now()
         file_size = sum(file_.size or 0 for file_ in files)
 
+        for file_ in files:
+            file_.zipIndex = await self.storage_ops.get_wacz_zip_index(org, file_)
+
         collection_uuids: List[UUID] = []
         if collections:
             try:
@@ -189,6 +202,8 @@ class UploadOps(BaseCrawlOps):
         )
 
         if uploaded.files:
+            await self.background_job_ops.create_ingest_pages_job(org, crawl_id)
+
             for file in uploaded.files:
                 await self.background_job_ops.create_replica_jobs(
                     org.id, file, crawl_id, "upload"
@@ -214,24 +229,86 @@ class UploadOps(BaseCrawlOps):
 
 
 # ============================================================================
+# pylint: disable=too-many-instance-attributes
 class FilePreparer:
-    """wrapper to compute digest / name for streaming upload"""
+    """wrapper to compute digest, crc32 and name for upload. Chunks are hashed
+    in HASH_EXECUTOR, in batches, while the next chunks are read"""
 
     def __init__(self, prefix, filename):
         self.upload_size = 0
         self.upload_hasher = hashlib.sha256()
+        self.upload_crc32 = 0
         self.upload_name = prefix + self.prepare_filename(filename)
 
-    def add_chunk(self, chunk):
+        self.batch: List[bytes] = []
+        self.batch_size = 0
+        self.pending: Optional[Future] = None
+
+        self.reader: Optional[HashingReader] = None
+
+    def _hash_chunks(self, chunks: List[bytes]):
+        """update digest and crc32, run in executor"""
+        for chunk in chunks:
+            self.upload_hasher.update(chunk)
+            self.upload_crc32 = zlib.crc32(chunk, self.upload_crc32)
+
+    def _submit(self):
+        """start hashing current batch in HASH_EXECUTOR"""
+        self.pending = HASH_EXECUTOR.submit(self._hash_chunks, self.batch)
+        self.batch = []
+        self.batch_size = 0
+
+    async def _flush(self):
+        """wait for previous batch, then start hashing current batch"""
+        if self.pending:
+            await asyncio.wrap_future(self.pending)
+            self.pending = None
+
+        if self.batch:
+            self._submit()
+
+    async def add_chunk(self, chunk: bytes):
         """add chunk for file"""
         self.upload_size += len(chunk)
-        self.upload_hasher.update(chunk)
+        self.batch.append(chunk)
+        self.batch_size += len(chunk)
+
+        if self.batch_size >= HASH_BATCH_SIZE:
+            await self._flush()
+
+    def add_read_chunk(self, chunk: bytes):
+        """add chunk read from file being uploaded, possibly outside of event
+        loop, waiting for previous batch to be hashed before starting next"""
+        self.upload_size += len(chunk)
+        self.batch.append(chunk)
+        self.batch_size += len(chunk)
+
+        if self.batch_size >= HASH_BATCH_SIZE:
+            if self.pending:
+                self.pending.result()
+            self._submit()
+
+    def wrap_file(self, fh) -> "HashingReader":
+        """wrap file to upload, hashing it as it is read for upload"""
+        self.reader = HashingReader(fh, self)
+        return self.reader
+
+    async def get_crawl_file(self, storage: StorageRef):
+        """get crawl file, once all chunks are hashed"""
+        # hash any part of wrapped file not read for upload
+        if self.reader:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.reader.read_unhashed
+            )
+
+        # hash last batch, then wait for it to finish
+        await self._flush()
+        await self._flush()
 
-    def get_crawl_file(self, storage: StorageRef):
-        """get crawl file"""
         return CrawlFile(
             filename=self.upload_name,
             hash=self.upload_hasher.hexdigest(),
+            crc32=self.upload_crc32,
             size=self.upload_size,
             storage=storage,
         )
@@ -247,19 +324,52 @@ class FilePreparer:
 
 
 # ============================================================================
-class UploadFileReader(BufferedReader):
-    """Compute digest on file upload"""
-
-    def __init__(self, upload, file_prep: FilePreparer):
-        super().__init__(upload.file._file)
+class HashingReader(io.RawIOBase):
+    """file wrapper passing data to FilePreparer as it is first read for
+    upload, so the file is only read once. Data read again, eg. if upload
+    is retried, is not hashed again"""
+
+    def __init__(self, fh, file_prep: FilePreparer):
+        super().__init__()
+        self.fh = fh
         self.file_prep = file_prep
+        self.hashed = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.fh.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.fh.tell()
+
+    def _add(self, chunk: bytes):
+        self.hashed += len(chunk)
+        self.file_prep.add_read_chunk(chunk)
+
+    def read(self, size: int = -1) -> bytes:
+        pos = self.fh.tell()
+        if pos > self.hashed:
+            # skipped past data not yet hashed, hash it first
+            self.fh.seek(self.hashed)
+            self._add(self.fh.read(pos - self.hashed))
+
+        chunk = self.fh.read(size)
+        if pos + len(chunk) > self.hashed:
+            self._add(chunk[self.hashed - pos :])
 
-    def read(self, size, *args):
-        """read and digest file chunk"""
-        chunk = super().read(size, *args)
-        self.file_prep.add_chunk(chunk)
         return chunk
 
+    def read_unhashed(self):
+        """hash rest of file not read for upload, run in executor"""
+        self.fh.seek(self.hashed)
+        while self.read(HASH_BATCH_SIZE):
+            pass
+
 
 # ============================================================================
 # pylint: disable=too-many-arguments, too-many-locals, invalid-name
@@ -3,6 +3,7 @@
 import asyncio
 import atexit
 import csv
+import heapq
 import io
 import json
 import signal
@@ -10,7 +11,16 @@ import os
 import sys
 
 from datetime import datetime
-from typing import Optional, Dict, Union, List
+from typing import (
+    Optional,
+    Dict,
+    Union,
+    List,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Tuple,
+)
 
 from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
@@ -131,3 +141,80 @@ async def gather_tasks_with_concurrency(*tasks, n=5):
             return await task
 
     return await asyncio.gather(*(semaphore_task(task) for task in tasks))
+
+
+async def next_or_default(iterator: AsyncIterator, default):
+    """Return next item from async iterator, or default if exhausted,
+    as with anext() on Python 3.10+"""
+    # pylint: disable=unnecessary-dunder-call
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return default
+
+
+async def merge_sorted_async(iterators: List[AsyncIterator], key: Callable):
+    """Merge already sorted async iterators into single sorted stream,
+    as with heapq.merge()"""
+    done = object()
+    heap = []
+    for index, iterator in enumerate(iterators):
+        item = await next_or_default(iterator, done)
+        if item is not done:
+            heap.append((key(item), index, item))
+
+    heapq.heapify(heap)
+
+    while heap:
+        _, index, item = heap[0]
+        yield item
+
+        item = await next_or_default(iterators[index], done)
+        if item is done:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (key(item), index, item))
+
+
+def start_read_ahead(
+    iterator: AsyncIterator, max_items: int
+) -> Tuple[AsyncGenerator, asyncio.Task]:
+    """Start reading up to max_items ahead from iterator in a background task
+    now, before the first item is needed. Returns stream of items and the
+    task, which should be canceled if the items are not read to the end"""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_items)
+    done = object()
+
+    async def fill():
+        try:
+            async for item in iterator:
+                await queue.put((item, None))
+
+            await queue.put((done, None))
+        # pylint: disable=broad-exception-caught
+        except Exception as exc:
+            await queue.put((done, exc))
+
+    async def get_items():
+        while True:
+            item, exc = await queue.get()
+            if exc:
+                raise exc
+            if item is done:
+                break
+            yield item
+
+    return get_items(), asyncio.create_task(fill())
+
+
+async def read_ahead_async(iterator: AsyncIterator, max_items: int) -> AsyncGenerator:
+    """Read up to max_items ahead from iterator in a background task, so the
+    next items are already being fetched while the consumer processes"""
+    items, task = start_read_ahead(iterator, max_items)
+    try:
+        async for item in items:
+            yield item
+    finally:
+        # wait for read-ahead to stop, so the caller can close the source
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
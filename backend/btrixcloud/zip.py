@@ -3,15 +3,36 @@ Methods for interacting with zip/WACZ files
 """
 
 import io
+import json
+import os
+import stat
 import struct
 import zipfile
 import zlib
 
+from typing import AsyncIterator
+
+from .models import ZipEntry, ZipIndex
+
 
 # ============================================================================
 EOCD_RECORD_SIZE = 22
 ZIP64_EOCD_RECORD_SIZE = 56
 ZIP64_EOCD_LOCATOR_SIZE = 20
+LOCAL_FILE_HEADER_SIZE = 30
+
+EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_EOCD_SIGNATURE = b"PK\x06\x06"
+
+MAX_COMMENT_SIZE = 65535
+
+ZIP64_EXTRA_ID = 0x0001
+ZIP_UTF8_FLAG = 0x0800
+UNIX_VERSION_MADE_BY = 3 << 8 | 45
+
+# size of suffix range read to find central directory, 0 to read each record
+ZIP_TAIL_READ_SIZE = int(os.environ.get("ZIP_TAIL_READ_SIZE") or 65536)
 
 MAX_STANDARD_ZIP_SIZE = 4_294_967_295
 
@@ -19,48 +40,268 @@ CHUNK_SIZE = 1024 * 256
 
 
 # ============================================================================
-def sync_get_filestream(client, bucket, key, file_zipinfo, cd_start):
-    """Return uncompressed byte stream of file in WACZ"""
-    # pylint: disable=too-many-locals
-    file_head = sync_fetch(
-        client, bucket, key, cd_start + file_zipinfo.header_offset + 26, 4
-    )
-    name_len = parse_little_endian_to_int(file_head[0:2])
-    extra_len = parse_little_endian_to_int(file_head[2:4])
+def get_filestream(client, bucket, key, zip_index, entry) -> AsyncIterator[bytes]:
+    """Return uncompressed line stream of file in WACZ, read with a single
+    range request from its local file header to the start of the next member"""
+    return iter_lines(iter_member(client, bucket, key, zip_index, entry))
+
+
+def get_json_records(client, bucket, key, zip_index, entry) -> AsyncIterator[dict]:
+    """Return stream of parsed JSON records from JSON lines file in WACZ"""
+    return iter_json_records(get_filestream(client, bucket, key, zip_index, entry))
 
-    content = sync_fetch_stream(
+
+def iter_member(client, bucket, key, zip_index, entry) -> AsyncIterator[bytes]:
+    """Return stream of uncompressed data of file in WACZ"""
+    content = fetch_stream(
         client,
         bucket,
         key,
-        cd_start + file_zipinfo.header_offset + 30 + name_len + extra_len,
-        file_zipinfo.compress_size,
+        entry.offset,
+        zip_index.get_member_end(entry) - entry.offset,
+    )
+
+    data = iter_member_data(content, entry.compressSize)
+    if entry.method == zipfile.ZIP_DEFLATED:
+        return inflate_chunks(data)
+
+    return data
+
+
+async def iter_member_data(chunk_iter, compress_size):
+    """Skip local file header at start of stream, then yield member data"""
+    # no aiter() / anext() builtins on Python 3.9
+    # pylint: disable=unnecessary-dunder-call
+    chunk_iter = chunk_iter.__aiter__()
+    header = b""
+    data_start = None
+    async for chunk in chunk_iter:
+        header += chunk
+        if len(header) >= LOCAL_FILE_HEADER_SIZE:
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            data_start = LOCAL_FILE_HEADER_SIZE + name_len + extra_len
+            if len(header) >= data_start:
+                break
+
+    if data_start is None or len(header) < data_start:
+        raise ValueError("truncated local file header")
+
+    remaining = compress_size
+    chunk = header[data_start:]
+    while remaining > 0:
+        chunk = chunk[:remaining]
+        remaining -= len(chunk)
+        if chunk:
+            yield chunk
+
+        try:
+            chunk = await chunk_iter.__anext__()
+        except StopAsyncIteration:
+            break
+
+        if not chunk:
+            break
+
+
+async def iter_ranges(chunk_iter, ranges):
+    """Yield only data within sorted, non-overlapping (offset, length) ranges
+    of stream, as (offset, chunk) pairs with the stream offset of each chunk,
+    stopping once the last range has been read"""
+    ranges = iter(ranges)
+    start, length = next(ranges, (None, 0))
+    pos = 0
+    async for chunk in chunk_iter:
+        chunk_end = pos + len(chunk)
+        while start is not None and start < chunk_end:
+            end = start + length
+            if end > pos:
+                offset = max(start, pos)
+                yield offset, chunk[offset - pos : min(end, chunk_end) - pos]
+
+            if end > chunk_end:
+                break
+
+            start, length = next(ranges, (None, 0))
+
+        if start is None:
+            return
+
+        pos = chunk_end
+
+
+async def iter_offsets(chunk_iter):
+    """Yield (offset, chunk) pairs with the stream offset of each chunk"""
+    offset = 0
+    async for chunk in chunk_iter:
+        yield offset, chunk
+        offset += len(chunk)
+
+
+async def fetch_member_data_offset(client, bucket, key, entry) -> int:
+    """Read local file header of member to find offset of its data, which
+    may differ from the central directory, as extra fields may differ"""
+    header = b""
+    async for chunk in fetch_stream(
+        client, bucket, key, entry.offset, LOCAL_FILE_HEADER_SIZE
+    ):
+        header += chunk
+
+    if len(header) < LOCAL_FILE_HEADER_SIZE:
+        raise ValueError("truncated local file header")
+
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    return entry.offset + LOCAL_FILE_HEADER_SIZE + name_len + extra_len
+
+
+async def iter_json_records(line_iter):
+    """Parse JSON lines, skipping blank lines and lines that are not JSON objects"""
+    async for line in line_iter:
+        line = line.decode("utf-8", errors="ignore")
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as err:
+            print(f"Error decoding json-l line: {line}. Error: {err}", flush=True)
+            continue
+
+        if isinstance(record, dict):
+            yield record
+
+
+def get_zip_index(cd_start, zip_file):
+    """Get index of members, with absolute offsets, from parsed central dir"""
+    return ZipIndex(
+        cdStart=cd_start,
+        entries=[
+            ZipEntry(
+                name=zipinfo.filename,
+                offset=cd_start + zipinfo.header_offset,
+                compressSize=zipinfo.compress_size,
+                size=zipinfo.file_size,
+                method=zipinfo.compress_type,
+            )
+            for zipinfo in zip_file.filelist
+            if not zipinfo.is_dir()
+        ],
     )
 
-    decompress = False
-    if file_zipinfo.compress_type == zipfile.ZIP_DEFLATED:
-        decompress = True
 
-    return sync_iter_lines(content, decompress=decompress)
+async def fetch_zip_index(client, bucket, key):
+    """Fetch and parse central directory of WACZ into ZipIndex"""
+    return get_zip_index(*await get_zip_file(client, bucket, key))
 
 
-def sync_iter_lines(chunk_iter, decompress=False, keepends=True):
+async def iter_lines(chunk_iter, decompress=False, keepends=True):
     """
-    Iter by lines, adapted from botocore
+    Iter by lines, decompressing raw deflate stream first if needed.
+
+    Lines split across chunks are buffered as a list of fragments,
+    joined once when the line is complete
     """
-    pending = b""
-    for chunk in chunk_iter:
-        if decompress:
-            chunk = zlib.decompressobj(-zlib.MAX_WBITS).decompress(chunk)
-        lines = (pending + chunk).splitlines(True)
-        for line in lines[:-1]:
-            yield line.splitlines(keepends)[0]
-        pending = lines[-1]
+    if decompress:
+        chunk_iter = inflate_chunks(chunk_iter)
+
+    pending: list[bytes] = []
+    async for chunk in chunk_iter:
+        lines = chunk.splitlines(True)
+        if not lines:
+            continue
+
+        # pending line ending in \r is complete unless \r\n is split across chunks
+        if pending and pending[-1].endswith(b"\r") and not lines[0].startswith(b"\n"):
+            yield end_line(b"".join(pending), keepends)
+            pending = []
+
+        last = lines[-1]
+        complete = last.endswith(b"\n")
+        if not complete:
+            lines.pop()
+
+        for line in lines:
+            if pending:
+                pending.append(line)
+                line = b"".join(pending)
+                pending = []
+
+            yield end_line(line, keepends)
+
+        if not complete:
+            pending.append(last)
+
     if pending:
-        yield pending.splitlines(keepends)[0]
+        yield end_line(b"".join(pending), keepends)
 
 
-async def get_zip_file(client, bucket, key):
-    """Fetch enough of the WACZ file be able to read the zip filelist"""
+def end_line(line, keepends):
+    """Remove line ending, unless keepends"""
+    if keepends:
+        return line
+    if line.endswith(b"\r\n"):
+        return line[:-2]
+    if line.endswith((b"\n", b"\r")):
+        return line[:-1]
+    return line
+
+
+async def inflate_chunks(chunk_iter, max_length=CHUNK_SIZE):
+    """
+    Decompress raw deflate stream of a zip member with a single decompressor,
+    yielding at most max_length bytes of uncompressed data at a time
+    """
+    decomp = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    async for chunk in chunk_iter:
+        while chunk and not decomp.eof:
+            data = decomp.decompress(chunk, max_length)
+            if data:
+                yield data
+            chunk = decomp.unconsumed_tail
+
+        if decomp.eof:
+            break
+
+    # any output still buffered in decompressor
+    while not decomp.eof:
+        data = decomp.decompress(b"", max_length)
+        if not data:
+            break
+        yield data
+
+    data = decomp.flush()
+    if data:
+        yield data
+
+
+async def get_zip_file(client, bucket, key, tail_size=ZIP_TAIL_READ_SIZE):
+    """Fetch enough of the WACZ file be able to read the zip filelist.
+
+    If tail_size is set, read end of file with a single suffix range request,
+    which for most WACZs includes the full central directory"""
+    if tail_size:
+        tail, file_size = await fetch_tail(client, bucket, key, tail_size)
+        buf_start = file_size - len(tail)
+        try:
+            cd_start, _ = find_central_directory(tail, buf_start)
+        except zipfile.BadZipFile as exc:
+            print(f"Zip tail read failed, reading by parts: {exc}", flush=True)
+        else:
+            if cd_start < buf_start:
+                tail = (
+                    await fetch(client, bucket, key, cd_start, buf_start - cd_start)
+                    + tail
+                )
+                buf_start = cd_start
+
+            return cd_start, zipfile.ZipFile(io.BytesIO(tail[cd_start - buf_start :]))
+
+    return await get_zip_file_by_parts(client, bucket, key)
+
+
+async def get_zip_file_by_parts(client, bucket, key):
+    """Fetch enough of the WACZ file be able to read the zip filelist,
+    assuming no zip comment, with separate requests for each record"""
     file_size = await get_file_size(client, bucket, key)
     eocd_record = await fetch(
         client, bucket, key, file_size - EOCD_RECORD_SIZE, EOCD_RECORD_SIZE
@@ -101,53 +342,65 @@ async def get_zip_file(client, bucket, key):
     )
 
 
-def sync_get_zip_file(client, bucket, key):
-    """Fetch enough of the WACZ file be able to read the zip filelist"""
-    file_size = sync_get_file_size(client, bucket, key)
-    eocd_record = sync_fetch(
-        client, bucket, key, file_size - EOCD_RECORD_SIZE, EOCD_RECORD_SIZE
-    )
+def find_central_directory(tail, buf_start):
+    """Find central directory start and size from EOCD record (and zip64
+    locator and record, if present) in tail of zip file starting at buf_start.
+    Raises BadZipFile if the records are not in the tail"""
+    # search back for EOCD signature, allowing for a zip comment after it
+    min_pos = max(len(tail) - EOCD_RECORD_SIZE - MAX_COMMENT_SIZE, 0)
+    pos = len(tail) - EOCD_RECORD_SIZE
+    while True:
+        pos = tail.rfind(EOCD_SIGNATURE, min_pos, pos + 4)
+        if pos < 0:
+            raise zipfile.BadZipFile("end of central directory record not found")
 
-    if file_size <= MAX_STANDARD_ZIP_SIZE:
-        cd_start, cd_size = get_central_directory_metadata_from_eocd(eocd_record)
-        central_directory = sync_fetch(client, bucket, key, cd_start, cd_size)
-        with zipfile.ZipFile(io.BytesIO(central_directory + eocd_record)) as zip_file:
-            return (cd_start, zip_file)
+        (comment_len,) = struct.unpack("<H", tail[pos + 20 : pos + 22])
+        if pos + EOCD_RECORD_SIZE + comment_len == len(tail):
+            break
 
-    zip64_eocd_record = sync_fetch(
-        client,
-        bucket,
-        key,
-        file_size
-        - (EOCD_RECORD_SIZE + ZIP64_EOCD_LOCATOR_SIZE + ZIP64_EOCD_RECORD_SIZE),
-        ZIP64_EOCD_RECORD_SIZE,
-    )
-    zip64_eocd_locator = sync_fetch(
-        client,
-        bucket,
-        key,
-        file_size - (EOCD_RECORD_SIZE + ZIP64_EOCD_LOCATOR_SIZE),
-        ZIP64_EOCD_LOCATOR_SIZE,
-    )
-    cd_start, cd_size = get_central_directory_metadata_from_eocd64(zip64_eocd_record)
-    central_directory = sync_fetch(client, bucket, key, cd_start, cd_size)
-    with zipfile.ZipFile(
-        io.BytesIO(
-            central_directory + zip64_eocd_record + zip64_eocd_locator + eocd_record
-        )
-    ) as zip_file:
-        return (cd_start, zip_file)
+        pos -= 1
 
+    cd_size, cd_start = struct.unpack("<II", tail[pos + 12 : pos + 20])
 
-async def get_file_size(client, bucket, key):
-    """Get WACZ file size from HEAD request"""
-    head_response = await client.head_object(Bucket=bucket, Key=key)
-    return head_response["ContentLength"]
+    locator_pos = pos - ZIP64_EOCD_LOCATOR_SIZE
+    if (
+        locator_pos < 0
+        or tail[locator_pos : locator_pos + 4] != ZIP64_LOCATOR_SIGNATURE
+    ):
+        return cd_start, cd_size
+
+    (record_offset,) = struct.unpack("<Q", tail[locator_pos + 8 : locator_pos + 16])
+    record_pos = record_offset - buf_start
+    if record_pos < 0 or record_pos + ZIP64_EOCD_RECORD_SIZE > locator_pos:
+        raise zipfile.BadZipFile("zip64 end of central directory record not in tail")
+
+    record = tail[record_pos : record_pos + ZIP64_EOCD_RECORD_SIZE]
+    if record[:4] != ZIP64_EOCD_SIGNATURE:
+        raise zipfile.BadZipFile("invalid zip64 end of central directory record")
+
+    return get_central_directory_metadata_from_eocd64(record)
 
 
-def sync_get_file_size(client, bucket, key):
+async def fetch_tail(client, bucket, key, length):
+    """Fetch last length bytes of file, return bytes and total file size"""
+    response = await client.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{length}")
+    data = await response["Body"].read()
+    return data, get_size_from_content_range(response, data)
+
+
+def get_size_from_content_range(response, data):
+    """Get total size from Content-Range, eg. 'bytes 100-199/200',
+    if no range, whole file was returned"""
+    content_range = response.get("ContentRange")
+    if not content_range:
+        return len(data)
+
+    return int(content_range.rsplit("/", 1)[1])
+
+
+async def get_file_size(client, bucket, key):
     """Get WACZ file size from HEAD request"""
-    head_response = client.head_object(Bucket=bucket, Key=key)
+    head_response = await client.head_object(Bucket=bucket, Key=key)
     return head_response["ContentLength"]
 
 
@@ -160,18 +413,15 @@ async def fetch(client, bucket, key, start, length):
     return await response["Body"].read()
 
 
-def sync_fetch(client, bucket, key, start, length):
-    """Fetch a byte range from a file in object storage"""
-    end = start + length - 1
-    response = client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
-    return response["Body"].read()
-
-
-def sync_fetch_stream(client, bucket, key, start, length):
+async def fetch_stream(client, bucket, key, start, length):
     """Fetch a byte range from a file in object storage as a stream"""
     end = start + length - 1
-    response = client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
-    return response["Body"].iter_chunks(chunk_size=CHUNK_SIZE)
+    response = await client.get_object(
+        Bucket=bucket, Key=key, Range=f"bytes={start}-{end}"
+    )
+    async with response["Body"] as body:
+        async for chunk in body.iter_chunks(chunk_size=CHUNK_SIZE):
+            yield chunk
 
 
 def get_central_directory_metadata_from_eocd(eocd):
@@ -191,10 +441,117 @@ def get_central_directory_metadata_from_eocd64(eocd64):
 def parse_little_endian_to_int(little_endian_bytes):
     """Convert little endian used in zip spec to int"""
     byte_length = len(little_endian_bytes)
-    format_character = "q"
+    format_character = "Q"
     if byte_length == 4:
-        format_character = "i"
+        format_character = "I"
     elif byte_length == 2:
-        format_character = "h"
+        format_character = "H"
 
     return struct.unpack("<" + format_character, little_endian_bytes)[0]
+
+
+# ============================================================================
+def get_dos_datetime(modified_at):
+    """Get zip (MS-DOS) time and date from datetime"""
+    dos_time = (
+        modified_at.hour << 11 | modified_at.minute << 5 | modified_at.second // 2
+    )
+    dos_date = (modified_at.year - 1980) << 9 | modified_at.month << 5 | modified_at.day
+    return dos_time, dos_date
+
+
+# pylint: disable=too-many-locals
+async def stream_stored_zip(member_files) -> AsyncIterator[bytes]:
+    """Stream zip64 file of stored (uncompressed) members, with size and crc32
+    of each member known in advance.
+
+    member_files is an async iterable of
+    (name, modified_at, perms, size, crc32, async iterable of data chunks)
+    """
+    offset = 0
+    central_directory = []
+
+    async for name, modified_at, perms, size, crc32, chunk_iter in member_files:
+        name_bytes = name.encode("utf-8")
+        dos_time, dos_date = get_dos_datetime(modified_at)
+
+        # version 4.5 (zip64), utf-8 names, stored, sizes in zip64 extra field
+        fields = (45, ZIP_UTF8_FLAG, zipfile.ZIP_STORED, dos_time, dos_date, crc32)
+
+        local_header = (
+            struct.pack(
+                "<4sHHHHHIIIHH",
+                b"PK\x03\x04",
+                *fields,
+                0xFFFFFFFF,
+                0xFFFFFFFF,
+                len(name_bytes),
+                20,
+            )
+            + name_bytes
+            + struct.pack("<HHQQ", ZIP64_EXTRA_ID, 16, size, size)
+        )
+        yield local_header
+
+        written = 0
+        async for chunk in chunk_iter:
+            written += len(chunk)
+            yield chunk
+
+        if written != size:
+            raise ValueError(f"{name}: expected {size} bytes, got {written}")
+
+        central_directory.append(
+            struct.pack(
+                "<4sHHHHHHIIIHHHHHII",
+                b"PK\x01\x02",
+                UNIX_VERSION_MADE_BY,
+                *fields,
+                0xFFFFFFFF,
+                0xFFFFFFFF,
+                len(name_bytes),
+                28,
+                0,
+                0,
+                0,
+                (stat.S_IFREG | perms) << 16,
+                0xFFFFFFFF,
+            )
+            + name_bytes
+            + struct.pack("<HHQQQ", ZIP64_EXTRA_ID, 24, size, size, offset)
+        )
+
+        offset += len(local_header) + size
+
+    cd_data = b"".join(central_directory)
+    num_entries = len(central_directory)
+    zip64_eocd_start = offset + len(cd_data)
+
+    yield (
+        cd_data
+        + struct.pack(
+            "<4sQHHIIQQQQ",
+            ZIP64_EOCD_SIGNATURE,
+            ZIP64_EOCD_RECORD_SIZE - 12,
+            UNIX_VERSION_MADE_BY,
+            45,
+            0,
+            0,
+            num_entries,
+            num_entries,
+            len(cd_data),
+            offset,
+        )
+        + struct.pack("<4sIQI", ZIP64_LOCATOR_SIGNATURE, 0, zip64_eocd_start, 1)
+        + struct.pack(
+            "<4sHHHHIIH",
+            EOCD_SIGNATURE,
+            0,
+            0,
+            0xFFFF,
+            0xFFFF,
+            0xFFFFFFFF,
+            0xFFFFFFFF,
+            0,
+        )
+    )
@@ -0,0 +1,94 @@
+"""in-memory s3 and storage stand-ins shared by unit tests"""
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from btrixcloud.storages import StorageOps
+
+
+class RangeBody:
+    def __init__(self, data):
+        self.data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self):
+        return self.data
+
+    async def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i : i + chunk_size]
+
+
+class RangeClient:
+    """serve byte ranges of an in-memory object, as with s3 get_object"""
+
+    def __init__(self, data):
+        self.data = data
+        self.num_requests = 0
+        self.bytes_read = 0
+
+    async def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.data)}
+
+    async def get_object(self, Bucket, Key, Range):
+        self.num_requests += 1
+        start, end = Range[len("bytes=") :].split("-")
+        if not start:
+            start = max(len(self.data) - int(end), 0)
+            end = len(self.data) - 1
+
+        self.bytes_read += int(end) + 1 - int(start)
+
+        return {
+            "Body": RangeBody(self.data[int(start) : int(end) + 1]),
+            "ContentRange": f"bytes {start}-{end}/{len(self.data)}",
+        }
+
+
+class MultiRangeClient:
+    """serve byte ranges of multiple in-memory objects"""
+
+    def __init__(self, objects):
+        self.clients = {key: RangeClient(data) for key, data in objects.items()}
+
+    @property
+    def num_requests(self):
+        return sum(client.num_requests for client in self.clients.values())
+
+    @property
+    def bytes_read(self):
+        return sum(client.bytes_read for client in self.clients.values())
+
+    async def head_object(self, Bucket, Key):
+        return await self.clients[Key].head_object(Bucket, Key)
+
+    async def get_object(self, Bucket, Key, Range):
+        return await self.clients[Key].get_object(Bucket, Key, Range)
+
+
+class LocalStorageOps(StorageOps):
+    """storage ops using s3 stand-in for all storages, with the bucket
+    named after the storage, or "bucket" for org primary storage"""
+
+    def __init__(self, client, prefix=""):
+        self.client = client
+        self.prefix = prefix
+        self.upload_parts_in_flight = 4
+        self.log_read_ahead_bytes = 0
+        self.download_prefetch_members = 2
+        self.download_prefetch_bytes = 1000
+
+    def get_org_primary_storage(self, org):
+        return None
+
+    def get_org_storage_by_ref(self, org, ref):
+        return SimpleNamespace(bucket=ref.name, use_access_for_presign=False)
+
+    @asynccontextmanager
+    async def get_s3_client(self, storage, use_access=False):
+        yield self.client, storage.bucket if storage else "bucket", self.prefix
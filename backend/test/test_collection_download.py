@@ -0,0 +1,101 @@
+"""streaming collection download prefetch tests"""
+
+import asyncio
+import io
+import zipfile
+import zlib
+
+from btrixcloud.models import CrawlFileOut
+
+from .fakes import LocalStorageOps, RangeBody
+
+
+class SlowClient:
+    """s3 stand-in with latency per get_object, recording requests"""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_object(self, Bucket, Key):
+        self.requested.append(Key)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+
+        return {"Body": RangeBody(self.objects[Key])}
+
+
+def make_files(sizes):
+    objects = {}
+    files = []
+    for index, size in enumerate(sizes):
+        name = f"crawl-{index}.wacz"
+        objects[name] = bytes([index]) * size
+        files.append(
+            CrawlFileOut(
+                name=name,
+                path="",
+                hash="",
+                crc32=zlib.crc32(objects[name]),
+                size=size,
+            )
+        )
+    return objects, files
+
+
+def test_download_prefetch():
+    # one file too large to prefetch
+    objects, files = make_files([500] * 10 + [5000] + [500] * 10)
+    client = SlowClient(objects)
+    storage_ops = LocalStorageOps(client)
+
+    async def download():
+        return b"".join(
+            [chunk async for chunk in storage_ops.download_streaming_wacz(None, files)]
+        )
+
+    data = asyncio.run(download())
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        for name, content in objects.items():
+            assert zip_file.read(name) == content
+        assert "datapackage.json" in zip_file.namelist()
+
+    # each file requested once, up to two files ahead
+    assert sorted(client.requested) == sorted(objects)
+    assert client.max_in_flight == 3
+
+    # large file only requested once reached, next file prefetched before it
+    large = client.requested.index("crawl-10.wacz")
+    assert client.requested[large - 1] == "crawl-11.wacz"
+
+
+def test_download_prefetch_closed_early():
+    objects, files = make_files([500] * 10)
+    client = SlowClient(objects)
+    storage_ops = LocalStorageOps(client)
+
+    async def download():
+        stream = storage_ops.download_streaming_wacz(None, files)
+        await stream.__anext__()
+        await stream.aclose()
+
+        # fetches stopped once download is closed
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        assert all(task.done() for task in tasks)
+
+        # no more files fetched after download ended
+        await asyncio.sleep(0.1)
+        assert client.in_flight == 0
+
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        assert not tasks
+
+    asyncio.run(download())
+    assert len(client.requested) <= 3
@@ -0,0 +1,224 @@
+"""crawl log index and filtered log query tests"""
+
+import asyncio
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from btrixcloud.models import CrawlFile, CrawlLogIndex, StorageRef
+from btrixcloud.zip import fetch_zip_index
+
+from .fakes import LocalStorageOps, MultiRangeClient
+
+
+def make_log_lines(instance, num):
+    start = datetime(year=2024, month=1, day=1)
+    lines = []
+    for i in range(num):
+        timestamp = start + timedelta(seconds=i * 2 + instance)
+        lines.append(
+            {
+                "timestamp": timestamp.isoformat() + "Z",
+                "logLevel": "error" if i % 500 == 7 else "info",
+                "context": "general",
+                "message": f"line {i}",
+            }
+        )
+    return lines
+
+
+def make_wacz(lines, compression=zipfile.ZIP_DEFLATED):
+    buff = io.BytesIO()
+    with zipfile.ZipFile(buff, "w", compression=compression) as zip_file:
+        zip_file.writestr(
+            "logs/crawl.log", "".join(json.dumps(line) + "\n" for line in lines)
+        )
+    return buff.getvalue()
+
+
+def make_wacz_files(objects, instance_lines, compression=zipfile.ZIP_DEFLATED):
+    wacz_files = []
+    for instance, lines in enumerate(instance_lines):
+        filename = f"crawl-20240101000000-{instance}.wacz"
+        objects[filename] = make_wacz(lines, compression)
+        wacz_files.append(
+            CrawlFile(
+                filename=filename,
+                hash="",
+                size=len(objects[filename]),
+                storage=StorageRef(name="default"),
+            )
+        )
+    return wacz_files
+
+
+async def build_log_index(client, storage_ops, wacz_files, block_size=4096):
+    for wacz_file in wacz_files:
+        wacz_file.zipIndex = await fetch_zip_index(client, "bucket", wacz_file.filename)
+
+    members = await storage_ops.get_wacz_log_index(None, wacz_files, block_size)
+    return CrawlLogIndex(
+        id="crawl",
+        oid=uuid4(),
+        files=[file_.filename for file_ in wacz_files],
+        members=members,
+        blockSize=block_size,
+    )
+
+
+async def query_logs(storage_ops, wacz_files, log_index=None, **kwargs):
+    stream = storage_ops.stream_wacz_logs(
+        None,
+        list(wacz_files),
+        kwargs.get("log_levels", []),
+        kwargs.get("contexts", []),
+        kwargs.get("after"),
+        kwargs.get("limit"),
+        log_index,
+    )
+    return [json.loads(line) async for line in stream]
+
+
+async def query_pages(storage_ops, wacz_files, log_index=None, limit=100, **kwargs):
+    """query all pages of lines, each starting after cursor of last line"""
+    lines = []
+    after = None
+    while True:
+        page = await query_logs(
+            storage_ops, wacz_files, log_index, after=after, limit=limit, **kwargs
+        )
+        if not page:
+            return lines
+
+        after = page[-1]["cursor"]
+        for line in page:
+            line.pop("cursor")
+        lines.extend(page)
+
+
+def test_indexed_log_queries():
+    all_lines = []
+    instance_lines = []
+    for instance in range(2):
+        lines = make_log_lines(instance, 2000)
+        all_lines.extend(lines)
+        instance_lines.append(lines)
+
+    all_lines.sort(key=lambda line: line["timestamp"])
+
+    objects = {}
+    wacz_files = make_wacz_files(objects, instance_lines)
+
+    client = MultiRangeClient(objects)
+    storage_ops = LocalStorageOps(client)
+
+    async def query(log_index=None, **kwargs):
+        return await query_logs(storage_ops, wacz_files, log_index, **kwargs)
+
+    async def run():
+        log_index = await build_log_index(client, storage_ops, wacz_files)
+        members = log_index.members
+        assert len(members) == 2
+        assert sum(block.lines for block in members[0].blocks) == 2000
+        assert len(members[0].blocks) > 10
+
+        errors = [line for line in all_lines if line["logLevel"] == "error"]
+        assert await query(log_levels=["error"]) == errors
+        assert await query(log_index, log_levels=["error"]) == errors
+
+        # no matching blocks, logs not fetched
+        client_requests = client.num_requests
+        assert await query(log_index, log_levels=["warn"]) == []
+        assert client.num_requests == client_requests
+
+        # lines after timestamp
+        after = all_lines[1000]["timestamp"]
+        page = all_lines[1001:1101]
+        assert await query(after=after) == all_lines[1001:]
+        assert await query(log_index, after=after) == all_lines[1001:]
+
+        # pages of lines after cursor
+        page = await query(log_index, after=after, limit=100)
+        assert [line["message"] for line in page] == [
+            line["message"] for line in all_lines[1001:1101]
+        ]
+        assert await query_pages(storage_ops, wacz_files, limit=300) == all_lines
+        assert await query_pages(storage_ops, wacz_files, log_index) == all_lines
+
+        assert await query(log_index) == all_lines
+
+    asyncio.run(run())
+
+
+def test_log_pages_shared_timestamps():
+    # many lines with same timestamp, in both instances
+    instance_lines = []
+    for instance in range(2):
+        lines = make_log_lines(instance, 1000)
+        for i, line in enumerate(lines):
+            line["timestamp"] = f"2024-01-01T00:00:{i // 300:02d}Z"
+        instance_lines.append(lines)
+
+    objects = {}
+    wacz_files = make_wacz_files(objects, instance_lines)
+
+    client = MultiRangeClient(objects)
+    storage_ops = LocalStorageOps(client)
+
+    async def run():
+        all_lines = await query_logs(storage_ops, wacz_files)
+        assert len(all_lines) == 2000
+
+        log_index = await build_log_index(client, storage_ops, wacz_files)
+
+        # no lines dropped or repeated at page boundaries
+        for limit in (7, 100, 299):
+            assert (
+                await query_pages(storage_ops, wacz_files, log_index, limit)
+                == all_lines
+            )
+
+        errors = [line for line in all_lines if line["logLevel"] == "error"]
+        assert (
+            await query_pages(
+                storage_ops, wacz_files, log_index, 1, log_levels=["error"]
+            )
+            == errors
+        )
+
+    asyncio.run(run())
+
+
+def test_stored_log_range_requests():
+    instance_lines = [make_log_lines(instance, 5000) for instance in range(2)]
+
+    objects = {}
+    wacz_files = make_wacz_files(objects, instance_lines, zipfile.ZIP_STORED)
+
+    client = MultiRangeClient(objects)
+    storage_ops = LocalStorageOps(client)
+
+    async def run():
+        all_lines = await query_logs(storage_ops, wacz_files)
+        log_index = await build_log_index(client, storage_ops, wacz_files)
+
+        # only blocks with errors fetched
+        bytes_read = client.bytes_read
+        errors = [line for line in all_lines if line["logLevel"] == "error"]
+        assert (
+            await query_logs(storage_ops, wacz_files, log_index, log_levels=["error"])
+            == errors
+        )
+        assert client.bytes_read - bytes_read < sum(map(len, objects.values())) / 10
+
+        # same lines as reading whole logs
+        after = all_lines[7000]["timestamp"]
+        assert (
+            await query_logs(storage_ops, wacz_files, log_index, after=after)
+            == all_lines[7001:]
+        )
+        assert await query_pages(storage_ops, wacz_files, log_index, 900) == all_lines
+
+    asyncio.run(run())
@@ -0,0 +1,89 @@
+"""bulk file deletion job tests"""
+
+import asyncio
+from uuid import uuid4
+
+from btrixcloud.background_jobs import BackgroundJobOps
+from btrixcloud.models import BaseFile, DeleteFilesJob, StorageRef
+from btrixcloud.storages import DELETE_OBJECTS_MAX_KEYS
+
+from .fakes import LocalStorageOps
+
+
+class DeleteObjectsClient:
+    """s3 stand-in recording DeleteObjects requests, failing some keys"""
+
+    def __init__(self, failed_keys):
+        self.failed_keys = failed_keys
+        self.requests = []
+
+    async def delete_objects(self, Bucket, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        assert len(keys) <= DELETE_OBJECTS_MAX_KEYS
+        self.requests.append((Bucket, keys))
+        return {
+            "Errors": [
+                {"Key": key, "Code": "AccessDenied", "Message": "Access Denied"}
+                for key in keys
+                if key in self.failed_keys
+            ]
+        }
+
+
+class JobsCollection:
+    def __init__(self):
+        self.updates = []
+
+    async def find_one_and_update(self, query, update):
+        self.updates.append(update["$set"])
+
+
+def test_delete_files_job():
+    files = [
+        BaseFile(
+            filename=f"crawl-{i}.wacz",
+            hash="",
+            size=1,
+            storage=StorageRef(name="default" if i % 5 else "other"),
+        )
+        for i in range(2500)
+    ]
+    client = DeleteObjectsClient({"prefix/crawl-7.wacz", "prefix/crawl-10.wacz"})
+
+    ops = object.__new__(BackgroundJobOps)
+    ops.storage_ops = LocalStorageOps(client, "prefix/")
+    ops.jobs = JobsCollection()
+
+    job = DeleteFilesJob(
+        id="job",
+        oid=uuid4(),
+        started=0,
+        object_type="crawl",
+        object_ids=["crawl"],
+        files=files,
+    )
+
+    asyncio.run(ops.delete_job_files(job, None))
+
+    # batches of files grouped into DeleteObjects requests per storage
+    assert [(bucket, len(keys)) for bucket, keys in client.requests] == [
+        ("other", 200),
+        ("default", 800),
+        ("other", 200),
+        ("default", 800),
+        ("other", 100),
+        ("default", 400),
+    ]
+    assert sum(len(keys) for _, keys in client.requests) == 2500
+
+    # progress saved after each batch, with per-file errors
+    assert [update["filesDone"] for update in ops.jobs.updates] == [1000, 2000, 2500]
+    assert [(error.filename, error.storage.name) for error in job.errors] == [
+        ("crawl-7.wacz", "default"),
+        ("crawl-10.wacz", "other"),
+    ]
+    assert job.errors[0].error == "AccessDenied: Access Denied"
+
+    # nothing left to delete when resumed
+    asyncio.run(ops.delete_job_files(job, None))
+    assert len(client.requests) == 6
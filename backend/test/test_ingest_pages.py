@@ -0,0 +1,162 @@
+"""resumable page ingest from uploaded WACZ tests"""
+
+import asyncio
+import io
+import json
+import zipfile
+from uuid import uuid4
+
+import pymongo
+import pytest
+import pymongo.results
+
+from btrixcloud.models import CrawlFile, IngestPagesJob, StorageRef
+from btrixcloud.pages import PageOps, PAGE_INSERT_BATCH_SIZE
+
+from .fakes import LocalStorageOps, MultiRangeClient
+
+
+class PagesCollection:
+    """in-memory pages collection, rejecting duplicate ids"""
+
+    def __init__(self, fail_at=None):
+        self.docs = {}
+        self.num_inserts = 0
+        self.fail_at = fail_at
+
+    async def insert_many(self, docs, ordered=True):
+        self.num_inserts += 1
+        assert len(docs) <= PAGE_INSERT_BATCH_SIZE
+        if self.num_inserts == self.fail_at:
+            # one page fails to be inserted, rest of batch inserted
+            for doc in docs[1:]:
+                self.docs.setdefault(doc["_id"], doc)
+            raise pymongo.errors.BulkWriteError(
+                {"nInserted": len(docs) - 1, "writeErrors": [{"code": 2}]}
+            )
+
+        inserted = []
+        for doc in docs:
+            if doc["_id"] not in self.docs:
+                self.docs[doc["_id"]] = doc
+                inserted.append(doc["_id"])
+
+        if len(inserted) < len(docs):
+            raise pymongo.errors.BulkWriteError(
+                {"nInserted": len(inserted), "writeErrors": [{"code": 11000}]}
+            )
+
+        return pymongo.results.InsertManyResult(inserted, True)
+
+
+def make_wacz(instance, members):
+    buff = io.BytesIO()
+    with zipfile.ZipFile(buff, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for name, num in members.items():
+            lines = [json.dumps({"format": "json-pages-1.0"})]
+            for i in range(num):
+                page = {"url": f"https://example.com/{instance}/{name}/{i}"}
+                # some pages with no id
+                if i % 3:
+                    page["id"] = str(uuid4())
+                lines.append(json.dumps(page))
+
+            # invalid page, not added or counted
+            lines.append(json.dumps({"id": str(uuid4()), "url": "invalid"}))
+
+            zip_file.writestr(f"pages/{name}.jsonl", "\n".join(lines) + "\n")
+
+    return buff.getvalue()
+
+
+def get_page_ops(pages):
+    objects = {}
+    wacz_files = []
+    for instance in range(2):
+        filename = f"upload-{instance}.wacz"
+        objects[filename] = make_wacz(instance, {"pages": 1200, "extraPages": 300})
+        wacz_files.append(
+            CrawlFile(
+                filename=filename,
+                hash="",
+                size=len(objects[filename]),
+                storage=StorageRef(name="default"),
+            )
+        )
+
+    page_ops = object.__new__(PageOps)
+    page_ops.pages = pages
+    page_ops.storage_ops = LocalStorageOps(MultiRangeClient(objects))
+    return page_ops, wacz_files
+
+
+def get_job():
+    return IngestPagesJob(id="job", oid=uuid4(), started=0, object_id="upload")
+
+
+def test_ingest_pages_resume():
+    page_ops, wacz_files = get_page_ops(PagesCollection())
+    job = get_job()
+    saved = []
+
+    async def crash_after(num_saves):
+        num_calls = 0
+
+        # crash after pages added, before progress saved
+        async def save_progress(job):
+            nonlocal num_calls
+            num_calls += 1
+            if num_calls == num_saves:
+                raise ConnectionError("crashed")
+            saved.append(job.copy())
+
+        try:
+            await page_ops.ingest_wacz_pages(
+                saved[-1].copy() if saved else job, None, wacz_files, save_progress
+            )
+        except ConnectionError:
+            return False
+
+        return True
+
+    async def run():
+        # crash after each of several batches, resuming from last saved job
+        for num_saves in (2, 3, 3):
+            assert not await crash_after(num_saves)
+
+        assert await crash_after(0)
+
+    asyncio.run(run())
+
+    final = saved[-1]
+    assert final.filesDone == 2
+    assert final.pagesAdded == 3000
+
+    # each page added once, with same id for pages with no id when re-read
+    urls = sorted(doc["url"] for doc in page_ops.pages.docs.values())
+    assert len(urls) == len(set(urls)) == 3000
+
+
+def test_ingest_pages_insert_failed():
+    page_ops, wacz_files = get_page_ops(PagesCollection(fail_at=2))
+    saved = []
+
+    async def save_progress(job):
+        saved.append(job.copy())
+
+    async def run(job):
+        await page_ops.ingest_wacz_pages(job, None, wacz_files, save_progress)
+
+    # progress not saved past batch that failed to be inserted
+    with pytest.raises(pymongo.errors.BulkWriteError):
+        asyncio.run(run(get_job()))
+
+    assert len(saved) == 1
+    # first batch includes pages.jsonl header
+    assert saved[-1].pagesAdded == PAGE_INSERT_BATCH_SIZE - 1
+
+    # failed batch retried on resume, rest of batch not counted twice
+    asyncio.run(run(saved[-1].copy()))
+
+    assert saved[-1].pagesAdded == 3000
+    assert len(page_ops.pages.docs) == 3000
@@ -0,0 +1,143 @@
+"""live crawl log fan-out tests"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from btrixcloud.livelogs import LiveLogOps
+
+
+class StreamRedis:
+    """in-memory redis stream, counting reads"""
+
+    def __init__(self, delete_secs=0):
+        self.entries = []
+        self.num_reads = 0
+        self.keys = {}
+        self.added = asyncio.Event()
+        self.delete_secs = delete_secs
+
+    def xadd(self, line):
+        self.entries.append((f"{len(self.entries) + 1}-0", {"line": line}))
+        self.added.set()
+
+    async def set(self, key, value, ex):
+        self.keys[key] = value
+
+    async def delete(self, key):
+        await asyncio.sleep(self.delete_secs)
+        self.keys.pop(key, None)
+
+    async def xrevrange(self, key, count):
+        self.num_reads += 1
+        return list(reversed(self.entries[-count:]))
+
+    async def xread(self, streams, count, block):
+        self.num_reads += 1
+        last = int(list(streams.values())[0].split("-")[0])
+        if last >= len(self.entries):
+            self.added.clear()
+            try:
+                await asyncio.wait_for(self.added.wait(), block / 1000)
+            except asyncio.TimeoutError:
+                return []
+
+        return [("key", self.entries[last : last + count])]
+
+
+class LocalCrawlOps:
+    def __init__(self, redis):
+        self.redis = redis
+        self.finished = None
+
+    @asynccontextmanager
+    async def get_redis(self, crawl_id):
+        yield self.redis
+
+    async def get_crawl_state(self, crawl_id):
+        return "running", self.finished
+
+
+def log_line(i, log_level):
+    return json.dumps({"logLevel": log_level, "context": "general", "message": i})
+
+
+async def view(ops, log_levels, num):
+    events = []
+    async for event in ops.stream_live_logs("crawl", log_levels, []):
+        events.append(event)
+        if len(events) == num:
+            break
+    return events
+
+
+def test_live_log_fan_out():
+    async def run():
+        # created in running loop, for python 3.9
+        redis = StreamRedis()
+        redis.xadd(log_line(0, "error"))
+        ops = LiveLogOps(LocalCrawlOps(redis))
+
+        viewers = [
+            asyncio.create_task(view(ops, [], 4)),
+            asyncio.create_task(view(ops, [], 4)),
+            asyncio.create_task(view(ops, ["warn"], 1)),
+        ]
+        await asyncio.sleep(0.1)
+
+        # single reader for all viewers
+        assert len(ops.tails) == 1
+
+        # operator notified of viewers
+        assert redis.keys == {"crawl:logs:viewers": 3}
+
+        redis.xadd(log_line(1, "warn"))
+        redis.xadd(log_line(2, "error"))
+        redis.xadd("not json")
+        redis.xadd(log_line(3, "error"))
+
+        results = await asyncio.gather(*viewers)
+        expected = [
+            f"data: {log_line(i, level)}\n\n"
+            for i, level in enumerate(["error", "warn", "error", "error"])
+        ]
+        assert results[0] == results[1] == expected
+        assert results[2] == [expected[1]]
+
+        # one initial read, then reads shared between viewers
+        assert redis.num_reads <= 4
+
+        # reader stops once no viewers remain
+        await asyncio.sleep(0.1)
+        redis.xadd(log_line(4, "error"))
+        await asyncio.sleep(0.1)
+        assert not ops.tails
+        assert not redis.keys
+
+    asyncio.run(run())
+
+
+def test_live_log_viewer_while_stopping():
+    async def run():
+        redis = StreamRedis(delete_secs=0.1)
+        redis.xadd(log_line(0, "error"))
+        ops = LiveLogOps(LocalCrawlOps(redis))
+
+        assert await view(ops, [], 1) == [f"data: {log_line(0, 'error')}\n\n"]
+
+        # wake reader, which stops as no viewers remain
+        redis.xadd(log_line(1, "error"))
+        await asyncio.sleep(0.05)
+        assert not ops.tails
+
+        # viewer arriving while previous reader is still stopping gets new
+        # lines, not end of stream, and viewers key is set again
+        viewer = asyncio.create_task(view(ops, [], 3))
+        await asyncio.sleep(0.2)
+        assert redis.keys == {"crawl:logs:viewers": 1}
+
+        redis.xadd(log_line(2, "error"))
+        events = await viewer
+        assert events[-1] == f"data: {log_line(2, 'error')}\n\n"
+
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+"""concurrent multipart upload tests"""
+
+import asyncio
+import random
+
+from .fakes import LocalStorageOps
+
+
+class MultipartClient:
+    """in-memory multipart uploads, parts finishing out of order"""
+
+    def __init__(self, fail_part=None):
+        self.fail_part = fail_part
+        self.rng = random.Random(0)
+        self.parts = {}
+        self.data = None
+        self.aborted = False
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create_multipart_upload(self, ACL, Bucket, Key):
+        return {"UploadId": "upload"}
+
+    async def upload_part(self, Bucket, Body, UploadId, PartNumber, Key):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.rng.random() * 0.01)
+        finally:
+            self.in_flight -= 1
+
+        if PartNumber == self.fail_part:
+            raise Exception("upload failed")
+
+        self.parts[PartNumber] = Body
+        return {"ETag": str(PartNumber)}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.data = b"".join(
+            self.parts[int(part["ETag"])] for part in MultipartUpload["Parts"]
+        )
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted = True
+
+
+async def stream(data, chunk_size):
+    for i in range(0, len(data), chunk_size):
+        yield data[i : i + chunk_size]
+
+
+def test_concurrent_multipart_upload():
+    data = random.Random(1).randbytes(100_000)
+
+    for size in (100_000, 99_000, 1000):
+        client = MultipartClient()
+        storage_ops = LocalStorageOps(client)
+        assert asyncio.run(
+            storage_ops.do_upload_multipart(
+                None, "test.wacz", stream(data[:size], 100), 1000
+            )
+        )
+        assert client.data == data[:size]
+        assert client.max_in_flight == min(4, len(client.parts))
+        assert len(client.parts) == size // 1000
+
+    client = MultipartClient(fail_part=10)
+    storage_ops = LocalStorageOps(client)
+    assert not asyncio.run(
+        storage_ops.do_upload_multipart(None, "test.wacz", stream(data, 100), 1000)
+    )
+    assert client.aborted
+    assert client.data is None
+    assert len(client.parts) < 20
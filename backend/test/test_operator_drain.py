@@ -0,0 +1,201 @@
+"""batched drain of crawl data from redis tests"""
+
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+
+from btrixcloud.models import StorageRef
+from btrixcloud.operator.crawls import CrawlOperator, DRAIN_BATCH_SIZE
+from btrixcloud.operator.models import CrawlSpec
+from btrixcloud.utils import dt_now, to_k8s_date
+
+
+class FakePipeline:
+    """redis pipeline stand-in, queueing commands until executed"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def lrange(self, key, start, end):
+        self.commands.append((self.redis.lrange, (key, start, end)))
+
+    def xadd(self, key, fields, **kwargs):
+        self.commands.append((self.redis.xadd, (key, fields)))
+
+    async def execute(self):
+        return [await func(*args) for func, args in self.commands]
+
+
+class FakeRedis:
+    """in-memory redis stand-in with lists, counters and streams"""
+
+    def __init__(self, lists):
+        self.lists = lists
+        self.counters = {}
+        self.streams = {}
+        self.num_reads = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def lrange(self, key, start, end):
+        self.num_reads += 1
+        return self.lists.get(key, [])[start : end + 1]
+
+    async def ltrim(self, key, start, end):
+        assert end == -1
+        self.lists[key] = self.lists.get(key, [])[start:]
+
+    async def incr(self, key, amount=1):
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    async def xadd(self, key, fields):
+        self.streams.setdefault(key, []).append(fields["line"])
+
+
+class FakePageOps:
+    """page ops stand-in, optionally failing one insert"""
+
+    def __init__(self, fail_at=None):
+        self.pages = []
+        self.fail_at = fail_at
+        self.num_calls = 0
+
+    async def add_pages_to_db(self, pages, crawl_id, oid, raise_errors=False):
+        assert raise_errors
+        self.num_calls += 1
+        if self.num_calls == self.fail_at:
+            raise ConnectionError("insert failed")
+        self.pages.extend(pages)
+        return len(pages)
+
+
+class FakeCrawlOps:
+    def __init__(self):
+        self.errors = []
+
+    async def add_crawl_errors(self, crawl_id, errors):
+        self.errors.extend(errors)
+
+
+def get_crawl():
+    return CrawlSpec(
+        id="crawl",
+        cid=uuid4(),
+        oid=uuid4(),
+        storage=StorageRef(name="default"),
+        started=to_k8s_date(dt_now()),
+        crawler_channel="default",
+    )
+
+
+def get_operator(page_ops, max_drain_per_sync=10000, fail_file=None):
+    operator = object.__new__(CrawlOperator)
+    operator.done_key = "crawls-done"
+    operator.pages_key = "pages"
+    operator.errors_key = "e"
+    operator.max_drain_per_sync = max_drain_per_sync
+    operator.page_ops = page_ops
+    operator.crawl_ops = FakeCrawlOps()
+    operator.files = []
+
+    async def add_file_to_crawl(msg, crawl, redis):
+        if msg["filename"] == fail_file:
+            raise ConnectionError("add file failed")
+        operator.files.append(msg["filename"])
+        return True
+
+    operator.add_file_to_crawl = add_file_to_crawl
+    return operator
+
+
+def make_lists(num_pages, num_files=0, num_errors=0):
+    return {
+        "crawls-done": [
+            json.dumps({"filename": f"crawl-{i}.wacz"}) for i in range(num_files)
+        ],
+        "crawl:pages": [json.dumps({"id": str(i)}) for i in range(num_pages)],
+        "crawl:e": [f"error {i}" for i in range(num_errors)],
+    }
+
+
+def test_drain_batches():
+    redis = FakeRedis(make_lists(2500, num_files=3, num_errors=5))
+    redis.lists["crawl:pages"].insert(10, "not json")
+    operator = get_operator(FakePageOps())
+
+    drained_all, drained = asyncio.run(operator.drain_redis_lists(redis, get_crawl()))
+
+    assert drained_all
+    assert drained == 3 + 2501 + 5
+    # three batches read from each list
+    assert redis.num_reads == 3 * 3
+
+    # invalid entry skipped, everything else added once, in order
+    assert [page["id"] for page in operator.page_ops.pages] == [
+        str(i) for i in range(2500)
+    ]
+    assert operator.files == ["crawl-0.wacz", "crawl-1.wacz", "crawl-2.wacz"]
+    assert redis.counters["filesAdded"] == 3
+    assert operator.crawl_ops.errors == [f"error {i}" for i in range(5)]
+    assert redis.streams["crawl:logs"] == operator.crawl_ops.errors
+    assert not any(redis.lists.values())
+
+
+def test_drain_per_sync_cap():
+    redis = FakeRedis(make_lists(DRAIN_BATCH_SIZE * 3 + 1))
+    operator = get_operator(FakePageOps(), max_drain_per_sync=DRAIN_BATCH_SIZE * 2)
+    crawl = get_crawl()
+
+    drained_all, drained = asyncio.run(operator.drain_redis_lists(redis, crawl))
+    assert not drained_all
+    assert drained == DRAIN_BATCH_SIZE * 2
+    assert len(redis.lists["crawl:pages"]) == DRAIN_BATCH_SIZE + 1
+
+    # rest drained on next sync
+    drained_all, drained = asyncio.run(operator.drain_redis_lists(redis, crawl))
+    assert drained_all
+    assert drained == DRAIN_BATCH_SIZE + 1
+    assert len(operator.page_ops.pages) == DRAIN_BATCH_SIZE * 3 + 1
+
+
+def test_drain_failure_mid_batch():
+    redis = FakeRedis(make_lists(2500, num_files=3))
+    operator = get_operator(FakePageOps(fail_at=2), fail_file="crawl-1.wacz")
+    crawl = get_crawl()
+
+    # file that failed to be added, and files after it, left in redis
+    with pytest.raises(ConnectionError):
+        asyncio.run(operator.drain_redis_lists(redis, crawl))
+
+    assert operator.files == ["crawl-0.wacz"]
+    assert len(redis.lists["crawls-done"]) == 2
+    assert len(redis.lists["crawl:pages"]) == 2500
+
+    # batch of pages that failed to be inserted left in redis
+    operator = get_operator(operator.page_ops)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(operator.drain_redis_lists(redis, crawl))
+
+    assert operator.files == ["crawl-1.wacz", "crawl-2.wacz"]
+    assert not redis.lists["crawls-done"]
+    assert len(operator.page_ops.pages) == DRAIN_BATCH_SIZE
+    assert len(redis.lists["crawl:pages"]) == 2500 - DRAIN_BATCH_SIZE
+
+    # resumed from first page not inserted
+    drained_all, _ = asyncio.run(operator.drain_redis_lists(redis, crawl))
+    assert drained_all
+    assert [page["id"] for page in operator.page_ops.pages] == [
+        str(i) for i in range(2500)
+    ]
+    assert not any(redis.lists.values())
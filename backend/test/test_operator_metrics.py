@@ -0,0 +1,98 @@
+"""operator sync metrics tests"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from btrixcloud.operator.metrics import init_metrics_api, observe_phase, observe_sync
+from btrixcloud.operator.outbox import OperatorOutbox
+
+
+def get_sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_observe_phase():
+    labels = {"operator": "test", "phase": "drain"}
+    count = get_sample("btrix_operator_sync_phase_seconds_count", **labels)
+
+    with observe_phase("test", "drain"):
+        pass
+
+    # recorded even if phase raises
+    with pytest.raises(ValueError):
+        with observe_phase("test", "drain"):
+            raise ValueError()
+
+    assert get_sample("btrix_operator_sync_phase_seconds_count", **labels) == count + 2
+
+
+def test_observe_sync():
+    labels = {"operator": "test", "hook": "sync"}
+    count = get_sample("btrix_operator_sync_seconds_count", **labels)
+    errors = get_sample("btrix_operator_sync_errors_total", **labels)
+
+    async def sync(fail):
+        await asyncio.sleep(0.01)
+        if fail:
+            raise ValueError()
+        return {"status": {}}
+
+    async def run():
+        assert await observe_sync("test", "sync", sync(False)) == {"status": {}}
+        with pytest.raises(ValueError):
+            await observe_sync("test", "sync", sync(True))
+
+    asyncio.run(run())
+
+    assert get_sample("btrix_operator_sync_seconds_count", **labels) == count + 2
+    assert get_sample("btrix_operator_sync_errors_total", **labels) == errors + 1
+    assert get_sample("btrix_operator_sync_seconds_sum", **labels) >= 0.02
+
+
+class Clients:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def get_stats(self):
+        return self.stats
+
+
+class Registry:
+    def __init__(self, stats):
+        self.redis_clients = Clients(stats)
+        self.s3_clients = Clients(stats)
+
+
+class TasksCollection:
+    """operator tasks stand-in, returning task counts by state"""
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    async def aggregate(self, pipeline):
+        for state, count in self.counts.items():
+            yield {"_id": state, "count": count}
+
+
+def test_metrics_endpoint():
+    app = FastAPI()
+
+    outbox = object.__new__(OperatorOutbox)
+    outbox.tasks = TasksCollection({"pending": 3, "failed": 1})
+
+    init_metrics_api(app, Registry({"open": 2}), outbox, Registry({"open": 5}))
+
+    endpoint = next(route.endpoint for route in app.routes if route.path == "/metrics")
+    resp = asyncio.run(endpoint())
+
+    assert resp.media_type.startswith("text/plain")
+    lines = resp.body.decode().splitlines()
+
+    assert 'btrix_operator_redis_clients{stat="open"} 2.0' in lines
+    assert 'btrix_operator_s3_clients{stat="open"} 5.0' in lines
+    assert 'btrix_operator_outbox_tasks{state="pending"} 3.0' in lines
+    assert 'btrix_operator_outbox_tasks{state="failed"} 1.0' in lines
+    assert 'btrix_operator_outbox_tasks{state="running"} 0.0' in lines
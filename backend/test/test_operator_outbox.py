@@ -0,0 +1,267 @@
+"""operator outbox tests, run directly against mongodb
+
+Set MONGO_TEST_URL (eg. mongodb://localhost:27017) to run
+"""
+
+import asyncio
+import os
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from btrixcloud.crawlconfigs import CrawlConfigOps
+from btrixcloud.crawls import CrawlOps
+from btrixcloud.operator.crawls import CRAWL_FINISHED_TASK, CrawlOperator
+from btrixcloud.operator.models import CrawlStatus
+from btrixcloud.operator.outbox import OperatorOutbox
+from btrixcloud.orgs import OrgOps
+from btrixcloud.utils import dt_now
+
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+
+pytestmark = pytest.mark.skipif(
+    not MONGO_TEST_URL, reason="MONGO_TEST_URL not set, mongodb not available"
+)
+
+
+async def run_outbox(test):
+    client = AsyncIOMotorClient(MONGO_TEST_URL, uuidRepresentation="standard")
+    mdb = client[f"btrix-test-{uuid4().hex}"]
+    outbox = OperatorOutbox(mdb)
+    outbox.retry_secs = 0
+    outbox.poll_secs = 0.1
+    try:
+        return await test(outbox)
+    finally:
+        await outbox.stop()
+        await client.drop_database(mdb.name)
+        client.close()
+
+
+async def wait_for_tasks(outbox, state, count):
+    for _ in range(50):
+        if await outbox.tasks.count_documents({"state": state}) == count:
+            return
+        await asyncio.sleep(0.1)
+
+
+def test_outbox_retry_and_final_step():
+    steps_run = []
+    failures = {"b": 2}
+
+    async def handler(step, oid):
+        assert oid
+        if failures.get(step):
+            failures[step] -= 1
+            raise ValueError("failed")
+        steps_run.append(step)
+
+    async def test(outbox):
+        outbox.register("test", handler)
+        await outbox.start()
+
+        for _ in range(2):
+            await outbox.enqueue(
+                "test", "group", ["a", "b", "c"], {"oid": uuid4()}, final_step="z"
+            )
+
+        await wait_for_tasks(outbox, "done", 4)
+        return await outbox.tasks.find_one({"_id": "group:b"})
+
+    task_b = asyncio.run(run_outbox(test))
+
+    # each step run once, final step last
+    assert sorted(steps_run[:3]) == ["a", "b", "c"]
+    assert steps_run[3:] == ["z"]
+    assert task_b["attempts"] == 3
+
+
+def test_outbox_expired_lease_rerun():
+    steps_run = []
+
+    async def handler(step):
+        steps_run.append(step)
+
+    async def test(outbox):
+        outbox.register("test", handler)
+        await outbox.enqueue("test", "group", ["a"], {})
+
+        # claimed by a worker that exited before finishing
+        await outbox.tasks.update_one(
+            {"_id": "group:a"},
+            {
+                "$set": {
+                    "state": "running",
+                    "attempts": 1,
+                    "leaseUntil": dt_now() - timedelta(seconds=1),
+                }
+            },
+        )
+
+        await outbox.start()
+        await wait_for_tasks(outbox, "done", 1)
+
+    asyncio.run(run_outbox(test))
+
+    assert steps_run == ["a"]
+
+
+def test_outbox_lease_renewed_while_running():
+    steps_run = []
+
+    async def handler(step):
+        steps_run.append(step)
+        await asyncio.sleep(3)
+
+    async def test(outbox):
+        outbox.lease_secs = 1
+        outbox.register("test", handler)
+        await outbox.start()
+        await outbox.enqueue("test", "group", ["a"], {})
+
+        await wait_for_tasks(outbox, "done", 1)
+        return await outbox.tasks.find_one({"_id": "group:a"})
+
+    task_a = asyncio.run(run_outbox(test))
+
+    # not re-run by other workers while running, past initial lease
+    assert steps_run == ["a"]
+    assert task_a["attempts"] == 1
+
+
+class Recorder:
+    """records calls to webhook and k8s ops"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create_crawl_finished_notification(self, crawl_id, oid, state):
+        self.calls.append(("webhook", crawl_id))
+
+    async def delete_crawl_job(self, crawl_id):
+        self.calls.append(("delete_job", crawl_id))
+
+
+def get_crawl_operator(mdb, outbox):
+    crawl_ops = object.__new__(CrawlOps)
+    crawl_ops.crawls = mdb["crawls"]
+
+    crawl_config_ops = object.__new__(CrawlConfigOps)
+    crawl_config_ops.crawls = mdb["crawls"]
+    crawl_config_ops.crawl_configs = mdb["crawl_configs"]
+
+    operator = object.__new__(CrawlOperator)
+    operator.crawl_ops = crawl_ops
+    operator.crawl_config_ops = crawl_config_ops
+    operator.org_ops = OrgOps(mdb, None)
+    operator.event_webhook_ops = operator.k8s = Recorder()
+    operator.init_outbox(outbox)
+    return operator
+
+
+def test_crawl_finished_steps_applied_once():
+    async def test(outbox):
+        mdb = outbox.tasks.database
+        operator = get_crawl_operator(mdb, outbox)
+
+        oid = uuid4()
+        cid = uuid4()
+        await mdb["organizations"].insert_one({"_id": oid, "bytesStored": 0})
+        await mdb["crawl_configs"].insert_one({"_id": cid, "totalSize": 0})
+        await mdb["crawls"].insert_one({"_id": "crawl", "cid": cid})
+
+        params = {
+            "crawl_id": "crawl",
+            "cid": cid,
+            "oid": oid,
+            "files_added_size": 100,
+            "state": "complete",
+        }
+
+        # each step retried, eg. after failing to mark task as done
+        for step in ("config_stats", "org_bytes_stored", "webhook"):
+            for _ in range(2):
+                await operator.do_crawl_finished_step(step, **params)
+
+        org = await mdb["organizations"].find_one({"_id": oid})
+        config = await mdb["crawl_configs"].find_one({"_id": cid})
+        assert org["bytesStored"] == org["bytesStoredCrawls"] == 100
+        assert config["totalSize"] == 100
+        assert config["crawlCount"] == 1
+        assert operator.k8s.calls == [("webhook", "crawl")]
+
+        # markers removed once job deleted
+        await operator.do_crawl_finished_step("delete_job", **params)
+
+        org = await mdb["organizations"].find_one({"_id": oid})
+        config = await mdb["crawl_configs"].find_one({"_id": cid})
+        assert org["appliedSteps"] == config["appliedSteps"] == []
+
+    asyncio.run(run_outbox(test))
+
+
+def test_crawl_finished_tasks_requeued():
+    async def test(outbox):
+        mdb = outbox.tasks.database
+        operator = get_crawl_operator(mdb, outbox)
+
+        cid = uuid4()
+        oid = uuid4()
+
+        # marked finished in db, but operator exited before enqueuing tasks
+        await mdb["crawls"].insert_one(
+            {
+                "_id": "crawl",
+                "state": "complete",
+                "finished": dt_now(),
+                "finishedTasksPending": True,
+            }
+        )
+
+        status = CrawlStatus(state="complete", finished="2024-01-01T00:00:00Z")
+        for _ in range(2):
+            await operator.requeue_crawl_finished_tasks("crawl", cid, oid, status)
+            assert status.finishedTasksQueued
+
+        tasks = await outbox.tasks.find({"type": CRAWL_FINISHED_TASK}).to_list(None)
+        assert sorted(task["_id"] for task in tasks) == [
+            "crawl-log-index:log_index",
+            "crawl:auto_add_collections",
+            "crawl:config_stats",
+            "crawl:delete_job",
+            "crawl:org_bytes_stored",
+            "crawl:webhook",
+        ]
+        crawl = await mdb["crawls"].find_one({"_id": "crawl"})
+        assert "finishedTasksPending" not in crawl
+
+        # finished before upgrade, tasks already applied, no tasks
+        await mdb["crawls"].insert_one(
+            {"_id": "old", "state": "complete", "finished": dt_now()}
+        )
+        status = CrawlStatus(state="complete", finished="2024-01-01T00:00:00Z")
+        await operator.requeue_crawl_finished_tasks("old", cid, oid, status)
+        assert status.finishedTasksQueued
+        assert await outbox.tasks.count_documents({"group": "old"}) == 0
+
+        # not yet finished in db, no tasks
+        status = CrawlStatus(state="running", finished="2024-01-01T00:00:00Z")
+        await operator.requeue_crawl_finished_tasks("other", cid, oid, status)
+        assert await outbox.tasks.count_documents({"group": "other"}) == 0
+
+    asyncio.run(run_outbox(test))
+
+
+def test_outbox_stop():
+    async def test(outbox):
+        await outbox.start()
+        workers = outbox.workers
+
+        await outbox.stop()
+        assert not outbox.workers
+        assert all(worker.done() for worker in workers)
+
+    asyncio.run(run_outbox(test))
@@ -0,0 +1,82 @@
+"""adaptive crawl resync interval tests"""
+
+from uuid import uuid4
+
+from btrixcloud.models import StorageRef
+from btrixcloud.operator.crawls import CrawlOperator
+from btrixcloud.operator.models import CrawlSpec, CrawlStatus
+from btrixcloud.utils import dt_now, to_k8s_date
+
+
+def get_operator():
+    operator = object.__new__(CrawlOperator)
+    operator.fast_retry_secs = 3
+    operator.resync_secs = 10
+    operator.max_resync_secs = 60
+    return operator
+
+
+def get_crawl(**kwargs):
+    return CrawlSpec(
+        id="crawl",
+        cid=uuid4(),
+        oid=uuid4(),
+        storage=StorageRef(name="default"),
+        started=to_k8s_date(dt_now()),
+        crawler_channel="default",
+        **kwargs,
+    )
+
+
+def test_waiting_backoff():
+    operator = get_operator()
+    status = CrawlStatus(state="waiting_org_limit")
+
+    intervals = [operator.get_resync_after(status) for _ in range(6)]
+    assert intervals == [10, 20, 40, 60, 60, 60]
+
+    # reset once crawl is active
+    status.state = "running"
+    status.drained = 5
+    assert operator.get_resync_after(status, get_crawl()) == 10
+    assert status.idleSyncs == 0
+
+
+def test_idle_running_backoff_and_pending_data():
+    operator = get_operator()
+    crawl = get_crawl()
+    status = CrawlStatus(state="running", drained=0)
+
+    assert operator.get_resync_after(status, crawl) == 10
+    assert operator.get_resync_after(status, crawl) == 20
+
+    # more data pending in redis
+    status.resync_after = operator.fast_retry_secs
+    assert operator.get_resync_after(status, crawl) == 3
+    assert status.idleSyncs == 0
+
+    # no backoff when stopping
+    status = CrawlStatus(state="running", drained=0, stopping=True, idleSyncs=3)
+    assert operator.get_resync_after(status, crawl) == 10
+
+    # no backoff while live log viewers are waiting for new lines
+    status = CrawlStatus(state="running", drained=0, idleSyncs=3)
+    status.liveLogViewers = True
+    assert operator.get_resync_after(status, crawl) == 10
+    assert status.idleSyncs == 0
+    assert "liveLogViewers" not in status.dict(exclude_none=True)
+
+
+def test_limits_close():
+    operator = get_operator()
+    status = CrawlStatus(
+        state="running",
+        drained=0,
+        idleSyncs=3,
+        elapsedCrawlTime=95,
+        lastUpdatedTime=to_k8s_date(dt_now()),
+    )
+    assert operator.get_resync_after(status, get_crawl(timeout=100)) <= 6
+
+    status = CrawlStatus(state="running", drained=0, idleSyncs=3, size=95)
+    assert operator.get_resync_after(status, get_crawl(max_crawl_size=100)) == 10
@@ -0,0 +1,99 @@
+"""org execution time accounting tests, run directly against mongodb
+
+Set MONGO_TEST_URL (eg. mongodb://localhost:27017) to run
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from btrixcloud.orgs import OrgOps
+
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+
+pytestmark = pytest.mark.skipif(
+    not MONGO_TEST_URL, reason="MONGO_TEST_URL not set, mongodb not available"
+)
+
+
+async def run_concurrent_increments(org_doc, num_increments, duration):
+    client = AsyncIOMotorClient(MONGO_TEST_URL, uuidRepresentation="standard")
+    mdb = client[f"btrix-test-{uuid4().hex}"]
+    try:
+        oid = uuid4()
+        org_doc["_id"] = oid
+        await mdb["organizations"].insert_one(org_doc)
+
+        # use separate ops (and quota caches) per task, as with multiple processes
+        await asyncio.gather(
+            *[
+                OrgOps(mdb, None).inc_org_time_stats(oid, duration, True)
+                for _ in range(num_increments)
+            ]
+        )
+
+        return await mdb["organizations"].find_one({"_id": oid})
+    finally:
+        await client.drop_database(mdb.name)
+        client.close()
+
+
+def test_concurrent_exec_time_split_exact():
+    yymm = datetime.utcnow().strftime("%Y-%m")
+
+    org = asyncio.run(
+        run_concurrent_increments(
+            {
+                "quotas": {"maxExecMinutesPerMonth": 10},
+                "giftedExecSecondsAvailable": 300,
+                "extraExecSecondsAvailable": 600,
+            },
+            200,
+            7,
+        )
+    )
+
+    # 1400 secs total: 600 monthly quota, then 300 gifted, then 500 extra
+    assert org["crawlExecSeconds"][yymm] == 1400
+    assert org["monthlyExecSeconds"][yymm] == 600
+    assert org["giftedExecSeconds"][yymm] == 300
+    assert org["giftedExecSecondsAvailable"] == 0
+    assert org["extraExecSeconds"][yymm] == 500
+    assert org["extraExecSecondsAvailable"] == 100
+
+
+def test_concurrent_exec_time_over_all_quotas():
+    yymm = datetime.utcnow().strftime("%Y-%m")
+
+    org = asyncio.run(
+        run_concurrent_increments(
+            {
+                "quotas": {"maxExecMinutesPerMonth": 1},
+                "monthlyExecSeconds": {yymm: 30},
+                "giftedExecSecondsAvailable": 45,
+            },
+            100,
+            3,
+        )
+    )
+
+    # overage only tracked in crawlExecSeconds
+    assert org["crawlExecSeconds"][yymm] == 300
+    assert org["monthlyExecSeconds"][yymm] == 60
+    assert org["giftedExecSeconds"][yymm] == 45
+    assert org["giftedExecSecondsAvailable"] == 0
+    assert "extraExecSeconds" not in org
+
+
+def test_concurrent_exec_time_no_quotas():
+    yymm = datetime.utcnow().strftime("%Y-%m")
+
+    org = asyncio.run(run_concurrent_increments({}, 50, 11))
+
+    assert org["crawlExecSeconds"][yymm] == 550
+    assert yymm not in org.get("monthlyExecSeconds", {})
@@ -0,0 +1,125 @@
+"""cached org quota snapshot tests"""
+
+import asyncio
+from uuid import uuid4
+
+from btrixcloud.models import Organization, OrgQuotas, StorageRef
+from btrixcloud.orgs import OrgOps
+
+
+class OrgsCollection:
+    """in-memory orgs collection supporting $inc and $set, counting reads"""
+
+    def __init__(self, org):
+        self.org = org
+        self.num_reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.num_reads += 1
+        if query["_id"] != self.org["_id"]:
+            return None
+        return dict(self.org)
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        for key, value in update.get("$inc", {}).items():
+            self.org[key] = self.org.get(key, 0) + value
+        self.org.update(update.get("$set", {}))
+
+
+def get_org_ops(storage_quota=100):
+    oid = uuid4()
+    org_ops = object.__new__(OrgOps)
+    org_ops.orgs = OrgsCollection(
+        {"_id": oid, "bytesStored": 0, "quotas": {"storageQuota": storage_quota}}
+    )
+    org_ops.quota_cache_secs = 5
+    org_ops._quota_cache = {}
+    return org_ops, oid
+
+
+def test_quota_snapshot_cache_hit_and_expiry():
+    org_ops, oid = get_org_ops()
+
+    async def run():
+        snapshot = await org_ops.get_org_quota_snapshot(oid)
+        assert snapshot.quotas.storageQuota == 100
+
+        # quota checks within cache interval read from cache
+        assert not await org_ops.storage_quota_reached(oid)
+        assert await org_ops.get_org_storage_quota(oid) == 100
+        assert org_ops.orgs.num_reads == 1
+
+        # change made outside of org ops only seen once cache expires
+        org_ops.orgs.org["bytesStored"] = 100
+        assert not await org_ops.storage_quota_reached(oid)
+
+        loaded, snapshot = org_ops._quota_cache[oid]
+        org_ops._quota_cache[oid] = (loaded - org_ops.quota_cache_secs, snapshot)
+
+        assert await org_ops.storage_quota_reached(oid)
+        assert org_ops.orgs.num_reads == 2
+
+        # unknown org not cached
+        missing = uuid4()
+        assert not await org_ops.storage_quota_reached(missing)
+        assert not await org_ops.storage_quota_reached(missing)
+        assert org_ops.orgs.num_reads == 4
+
+    asyncio.run(run())
+
+
+def test_quota_snapshot_disabled():
+    org_ops, oid = get_org_ops()
+    org_ops.quota_cache_secs = 0
+
+    async def run():
+        await org_ops.get_org_quota_snapshot(oid)
+        await org_ops.get_org_quota_snapshot(oid)
+        assert org_ops.orgs.num_reads == 2
+        assert not org_ops._quota_cache
+
+    asyncio.run(run())
+
+
+def test_quota_snapshot_invalidated_on_bytes_stored():
+    org_ops, oid = get_org_ops()
+
+    async def run():
+        assert not await org_ops.storage_quota_reached(oid)
+
+        # reloaded after usage update, reflecting new size
+        assert not await org_ops.inc_org_bytes_stored(oid, 60, "crawl")
+        assert await org_ops.inc_org_bytes_stored(oid, 40, "upload")
+        assert org_ops.orgs.num_reads == 3
+
+        assert await org_ops.storage_quota_reached(oid)
+        assert org_ops.orgs.num_reads == 3
+
+        assert not await org_ops.inc_org_bytes_stored(oid, -50, "crawl")
+        assert (await org_ops.get_org_quota_snapshot(oid)).bytesStored == 50
+
+    asyncio.run(run())
+
+
+def test_quota_snapshot_invalidated_on_quota_update():
+    org_ops, oid = get_org_ops()
+    org = Organization(
+        id=oid,
+        name="org",
+        slug="org",
+        users={},
+        storage=StorageRef(name="default"),
+        quotas=OrgQuotas(storageQuota=100),
+    )
+
+    async def run():
+        org_ops.orgs.org["bytesStored"] = 80
+        assert not await org_ops.storage_quota_reached(oid)
+
+        await org_ops.update_quotas(org, OrgQuotas(storageQuota=50))
+
+        assert await org_ops.storage_quota_reached(oid)
+        assert await org_ops.get_org_storage_quota(oid) == 50
+        assert org_ops.orgs.num_reads == 2
+
+    asyncio.run(run())
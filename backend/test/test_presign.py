@@ -0,0 +1,148 @@
+"""offline presigning tests"""
+
+import asyncio
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import aiobotocore.session
+
+from btrixcloud.basecrawls import BaseCrawlOps
+from btrixcloud.models import CrawlFile, S3Storage, StorageRef
+from btrixcloud.storages import StorageOps
+
+
+class LocalStorageOps(StorageOps):
+    def __init__(self, storage):
+        self.default_storages = {"default": storage}
+        self.presigners = {}
+
+
+def get_botocore_url(storage, endpoint_url, filename):
+    parts = urlsplit(endpoint_url)
+    bucket, key = parts.path[1:].split("/", 1)
+
+    async def presign():
+        session = aiobotocore.session.get_session()
+        async with session.create_client(
+            "s3",
+            region_name=storage.region,
+            endpoint_url=parts.scheme + "://" + parts.netloc,
+            aws_access_key_id=storage.access_key,
+            aws_secret_access_key=storage.secret_key,
+        ) as client:
+            return await client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": bucket, "Key": key + filename},
+                ExpiresIn=3600,
+            )
+
+    return asyncio.run(presign())
+
+
+def test_presign_same_as_botocore():
+    minio = S3Storage(
+        access_key="ADMIN",
+        secret_key="PASSW0RD",
+        region="",
+        endpoint_url="http://local-minio.default:9000/btrix-data/",
+        endpoint_no_bucket_url="http://local-minio.default:9000/",
+        access_endpoint_url="/data/",
+        use_access_for_presign=False,
+    )
+    custom = S3Storage(
+        access_key="KEY/+",
+        secret_key="SECRET",
+        region="nyc3",
+        endpoint_url="https://internal.example.com:9000/bucket/prefix/",
+        endpoint_no_bucket_url="https://internal.example.com:9000/",
+        access_endpoint_url="https://s3.example.com:443/bucket/prefix/",
+        use_access_for_presign=True,
+    )
+
+    for storage in (minio, custom):
+        storage_ops = LocalStorageOps(storage)
+        for filename in ("crawl-1.wacz", "org/crawl ü+~x,y=z.wacz"):
+            crawl_file = CrawlFile(
+                filename=filename,
+                hash="",
+                size=0,
+                storage=StorageRef(name="default"),
+            )
+
+            signing_url = storage.endpoint_url
+            if storage.use_access_for_presign:
+                signing_url = storage.access_endpoint_url
+
+            expected = get_botocore_url(storage, signing_url, filename)
+            amz_date = parse_qs(urlsplit(expected).query)["X-Amz-Date"][0]
+            now = datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ")
+
+            if not storage.use_access_for_presign:
+                expected = expected.replace(
+                    storage.endpoint_url, storage.access_endpoint_url
+                )
+
+            urls = storage_ops.get_presigned_urls(None, [crawl_file], 3600, now)
+            assert urls == [expected]
+
+    assert urls[0].startswith("https://s3.example.com:443/bucket/prefix/org/")
+
+
+class BulkWriteCollection:
+    def __init__(self):
+        self.writes = []
+
+    async def bulk_write(self, requests, ordered=True):
+        await asyncio.sleep(0.1)
+        self.writes.append(requests)
+
+
+class CountingStorageOps:
+    def __init__(self):
+        self.num_signed = 0
+
+    def get_presigned_urls(self, org, crawlfiles, duration=3600, now=None):
+        self.num_signed += len(crawlfiles)
+        return [f"https://example.com/{file_.filename}" for file_ in crawlfiles]
+
+
+def test_refresh_bulk_write_and_coalesce():
+    ops = object.__new__(BaseCrawlOps)
+    ops.crawls = BulkWriteCollection()
+    ops.storage_ops = CountingStorageOps()
+    ops.presign_duration_seconds = 3600
+    ops.presign_refreshes = {}
+
+    def get_files_by_crawl():
+        return {
+            f"crawl-{crawl}": [
+                CrawlFile(
+                    filename=f"crawl-{crawl}-{i}.wacz",
+                    hash="",
+                    size=0,
+                    storage=StorageRef(name="default"),
+                )
+                for i in range(3)
+            ]
+            for crawl in range(100)
+        }
+
+    async def run():
+        return await asyncio.gather(
+            ops._resolve_signed_urls(get_files_by_crawl(), None),
+            ops._resolve_signed_urls(get_files_by_crawl(), None),
+        )
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert first["crawl-5"][2].path == "https://example.com/crawl-5-2.wacz"
+
+    # signed and written once, in one bulk write
+    assert ops.storage_ops.num_signed == 300
+    assert len(ops.crawls.writes) == 1
+    assert len(ops.crawls.writes[0]) == 300
+    assert ops.crawls.writes[0][0]._filter == {
+        "_id": "crawl-0",
+        "files.filename": "crawl-0-0.wacz",
+    }
+    assert not ops.presign_refreshes
@@ -0,0 +1,41 @@
+"""pooled s3 client registry tests"""
+
+import asyncio
+
+from btrixcloud.storages import S3ClientRegistry
+
+
+def test_s3_client_registry():
+    creds = ("http://minio:9000", "", "access", "secret")
+    other_creds = ("http://minio:9000", "", "access", "other-secret")
+
+    async def run():
+        # created in running loop, for python 3.9
+        registry = S3ClientRegistry()
+
+        async with registry.get_client(*creds) as client:
+            async with registry.get_client(*creds) as client2:
+                assert client is client2
+
+            async with registry.get_client(*other_creds) as other_client:
+                assert other_client is not client
+
+            assert registry.get_stats()["active"] == 1
+
+            # evicted while in use, still usable until released
+            await registry.evict("access", "secret")
+            assert len(registry.clients) == 1
+            assert client.meta.endpoint_url == "http://minio:9000"
+
+        async with registry.get_client(*creds) as client3:
+            assert client3 is not client
+
+        stats = registry.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 3
+        assert stats["evictions"] == 1
+
+        await registry.close_all()
+        assert not registry.clients
+
+    asyncio.run(run())
@@ -0,0 +1,105 @@
+"""upload digest and crc32 tests"""
+
+import asyncio
+import hashlib
+import random
+import tempfile
+import time
+import zlib
+
+from btrixcloud.models import StorageRef
+from btrixcloud.uploads import FilePreparer
+
+
+def check_crawl_file(crawl_file, data):
+    assert crawl_file.hash == hashlib.sha256(data).hexdigest()
+    assert crawl_file.crc32 == zlib.crc32(data)
+    assert crawl_file.size == len(data)
+
+
+def test_stream_and_file_hashing():
+    data = random.Random(0).randbytes(5_000_000)
+    storage = StorageRef(name="default")
+
+    async def hash_stream():
+        file_prep = FilePreparer("uploads/", "test.wacz")
+        for i in range(0, len(data), 65536):
+            await file_prep.add_chunk(data[i : i + 65536])
+        return await file_prep.get_crawl_file(storage)
+
+    async def hash_file():
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as fh:
+            fh.write(data)
+            fh.seek(0)
+            file_prep = FilePreparer("uploads/", "test.wacz")
+            reader = file_prep.wrap_file(fh)
+            assert reader.read() == data
+            return await file_prep.get_crawl_file(storage)
+
+    for crawl_file in (asyncio.run(hash_stream()), asyncio.run(hash_file())):
+        check_crawl_file(crawl_file, data)
+        assert crawl_file.filename.startswith("uploads/test-")
+
+
+def test_file_hashed_while_uploaded():
+    data = random.Random(1).randbytes(20_000_000)
+    storage = StorageRef(name="default")
+
+    async def upload(reader):
+        """read body in executor, as http client does, then retry"""
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            reader.seek(0)
+            while await loop.run_in_executor(None, reader.read, 65536):
+                pass
+
+    async def ticker(gaps, done):
+        last = time.monotonic()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+
+    async def run():
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as fh:
+            fh.write(data)
+            fh.seek(0)
+
+            gaps = []
+            done = asyncio.Event()
+            ticks = asyncio.create_task(ticker(gaps, done))
+
+            file_prep = FilePreparer("uploads/", "test.wacz")
+            await upload(file_prep.wrap_file(fh))
+            crawl_file = await file_prep.get_crawl_file(storage)
+
+            done.set()
+            await ticks
+
+        # data hashed once, event loop not blocked while hashing
+        check_crawl_file(crawl_file, data)
+        assert max(gaps) < 0.1
+
+    asyncio.run(run())
+
+
+def test_file_partially_read():
+    data = random.Random(2).randbytes(3_000_000)
+    storage = StorageRef(name="default")
+
+    async def run():
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as fh:
+            fh.write(data)
+            fh.seek(0)
+            file_prep = FilePreparer("uploads/", "test.wacz")
+            reader = file_prep.wrap_file(fh)
+
+            # skipped data hashed before data read after it
+            reader.seek(1000)
+            assert reader.read(500_000) == data[1000:501000]
+
+            # rest of file not read by upload hashed at end
+            return await file_prep.get_crawl_file(storage)
+
+    check_crawl_file(asyncio.run(run()), data)
@@ -1,8 +1,10 @@
 """utils tests"""
 
+import asyncio
+
 import pytest
 
-from btrixcloud.utils import slug_from_name
+from btrixcloud.utils import merge_sorted_async, read_ahead_async, slug_from_name
 
 
 @pytest.mark.parametrize(
@@ -18,3 +20,61 @@ from btrixcloud.utils import slug_from_name
 )
 def test_slug_from_name(name: str, expected_slug: str):
     assert slug_from_name(name) == expected_slug
+
+
+def test_merge_sorted_async():
+    async def iter_items(items):
+        for item in items:
+            yield item
+
+    async def merge():
+        iterators = [iter_items([1, 4, 7]), iter_items([]), iter_items([2, 3, 9])]
+        return [item async for item in merge_sorted_async(iterators, key=abs)]
+
+    assert asyncio.run(merge()) == [1, 2, 3, 4, 7, 9]
+
+
+def test_read_ahead_async():
+    produced = []
+
+    async def iter_items():
+        for item in range(10):
+            produced.append(item)
+            yield item
+        raise ValueError("read failed")
+
+    async def read():
+        items = []
+        with pytest.raises(ValueError):
+            async for item in read_ahead_async(iter_items(), 3):
+                # at most 3 items queued, plus one waiting to be queued
+                await asyncio.sleep(0.01)
+                assert len(produced) <= item + 5
+                items.append(item)
+        return items
+
+    assert asyncio.run(read()) == list(range(10))
+
+
+def test_read_ahead_async_closed_early():
+    reading = []
+
+    async def iter_items():
+        for item in range(10):
+            reading.append(item)
+            try:
+                await asyncio.sleep(0.01)
+            finally:
+                reading.pop()
+            yield item
+
+    async def read():
+        stream = read_ahead_async(iter_items(), 3)
+        async for _ in stream:
+            break
+        await stream.aclose()
+
+        # read-ahead stopped once stream is closed
+        assert not reading
+
+    asyncio.run(read())
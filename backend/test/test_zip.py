@@ -0,0 +1,195 @@
+"""zip/WACZ member streaming tests"""
+
+import asyncio
+import io
+import json
+import random
+import stat
+import zipfile
+import zlib
+from datetime import datetime
+
+from btrixcloud.models import ZipIndex
+from btrixcloud.zip import (
+    fetch_zip_index,
+    get_filestream,
+    get_json_records,
+    get_zip_file,
+    get_zip_file_by_parts,
+    get_zip_index,
+    inflate_chunks,
+    iter_lines,
+    iter_member,
+    stream_stored_zip,
+)
+
+from .fakes import RangeClient
+
+
+def make_lines(num):
+    rng = random.Random(0)
+    return [
+        json.dumps({"id": i, "url": f"https://example.com/{rng.random()}"}).encode()
+        + b"\n"
+        for i in range(num)
+    ]
+
+
+def split_chunks(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+async def iter_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(async_iter):
+    async def to_list():
+        return [item async for item in async_iter]
+
+    return asyncio.run(to_list())
+
+
+def test_stream_deflated_member():
+    lines = make_lines(50000)
+
+    buff = io.BytesIO()
+    with zipfile.ZipFile(buff, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("datapackage.json", b"{}")
+        zip_file.writestr("logs/crawl.log", b"".join(lines))
+        zip_file.writestr("pages/pages.jsonl", b"")
+
+    client = RangeClient(buff.getvalue())
+
+    zip_index = asyncio.run(fetch_zip_index(client, "bucket", "test.wacz"))
+    assert [entry.name for entry in zip_index.entries] == [
+        "datapackage.json",
+        "logs/crawl.log",
+        "pages/pages.jsonl",
+    ]
+
+    # index can be stored and reloaded
+    zip_index = ZipIndex(**zip_index.dict())
+    log_entry = zip_index.entries[1]
+    assert log_entry.compressSize > 2 * 256 * 1024
+
+    client.num_requests = 0
+    stream = get_filestream(client, "bucket", "test.wacz", zip_index, log_entry)
+    assert collect(stream) == lines
+    assert client.num_requests == 1
+
+    records = get_json_records(client, "bucket", "test.wacz", zip_index, log_entry)
+    assert collect(records) == [json.loads(line) for line in lines]
+
+    page_entry = zip_index.entries[2]
+    stream = get_filestream(client, "bucket", "test.wacz", zip_index, page_entry)
+    assert collect(stream) == []
+
+
+def test_inflate_bounded_output():
+    data = b"a" * 10_000_000
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+
+    # highly compressible, all in single input chunk
+    outputs = collect(inflate_chunks(iter_chunks([deflated]), max_length=65536))
+    assert b"".join(outputs) == data
+    assert max(len(output) for output in outputs) <= 65536
+
+
+def test_iter_lines_split_across_chunks():
+    data = b"first line\r\nsecond " + b"long " * 1000 + b"line\nthird\rfourth"
+
+    for size in (1, 2, 7, 100, len(data)):
+        chunks = split_chunks(data, size)
+        lines = collect(iter_lines(iter_chunks(chunks)))
+        assert lines == data.splitlines(True)
+        lines = collect(iter_lines(iter_chunks(chunks), keepends=False))
+        assert lines == data.splitlines()
+
+
+def make_wacz(comment=b"", zip64=False, num_members=3):
+    buff = io.BytesIO()
+    with zipfile.ZipFile(buff, "w", compression=zipfile.ZIP_STORED) as zip_file:
+        for i in range(num_members):
+            zip_file.writestr(f"archive/data-{i}.warc.gz", b"x" * 1000)
+        zip_file.comment = comment
+
+        if zip64:
+            # force zip64 end of central directory records
+            limit = zipfile.ZIP_FILECOUNT_LIMIT
+            zipfile.ZIP_FILECOUNT_LIMIT = 1
+            try:
+                zip_file.close()
+            finally:
+                zipfile.ZIP_FILECOUNT_LIMIT = limit
+
+    return buff.getvalue()
+
+
+def test_zip_index_tail_read():
+    for comment, zip64, tail_size, num_requests in (
+        (b"", False, 65536, 1),
+        (b"wacz comment", False, 65536, 1),
+        (b"", True, 65536, 1),
+        (b"", True, 200, 2),
+        (b"", False, 100, 2),
+    ):
+        data = make_wacz(comment, zip64, num_members=10)
+        assert (b"PK\x06\x06" in data) == zip64
+
+        client = RangeClient(data)
+        cd_start, zip_file = asyncio.run(
+            get_zip_file(client, "bucket", "test.wacz", tail_size)
+        )
+        assert client.num_requests == num_requests
+
+        zip_index = get_zip_index(cd_start, zip_file)
+        assert len(zip_index.entries) == 10
+
+        # same as reading each record, if no comment
+        if not comment:
+            assert zip_index == get_zip_index(
+                *asyncio.run(get_zip_file_by_parts(client, "bucket", "test.wacz"))
+            )
+
+        for entry in zip_index.entries:
+            stream = get_filestream(client, "bucket", "test.wacz", zip_index, entry)
+            assert b"".join(collect(stream)) == b"x" * 1000
+
+
+def test_stream_stored_zip():
+    members = {
+        "crawl-1.wacz": random.Random(0).randbytes(700_000),
+        "crawl-ü.wacz": b"",
+        "datapackage.json": b"{}",
+    }
+
+    async def member_files():
+        for name, data in members.items():
+            yield (
+                name,
+                datetime(year=1980, month=1, day=1),
+                0o664,
+                len(data),
+                zlib.crc32(data),
+                iter_chunks(split_chunks(data, 256 * 1024)),
+            )
+
+    data = b"".join(collect(stream_stored_zip(member_files())))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.testzip() is None
+        for name, member_data in members.items():
+            assert zip_file.read(name) == member_data
+            zipinfo = zip_file.getinfo(name)
+            assert zipinfo.compress_type == zipfile.ZIP_STORED
+            assert zipinfo.external_attr >> 16 == stat.S_IFREG | 0o664
+
+    # members can be read back with range requests
+    client = RangeClient(data)
+    zip_index = asyncio.run(fetch_zip_index(client, "bucket", "test.wacz"))
+    for entry in zip_index.entries:
+        stream = iter_member(client, "bucket", "test.wacz", zip_index, entry)
+        assert b"".join(collect(stream)) == members[entry.name]